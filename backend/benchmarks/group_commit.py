@@ -0,0 +1,143 @@
+"""Sustained contact-submission ingestion with and without group commit.
+
+Offers submissions at a fixed rate (open loop, so a slow database queues
+work instead of slowing the generator down) and reports achieved
+throughput and latency measured from each submission's scheduled start.
+Runs once with one insert per submission and once through GroupCommitter.
+Run from ``backend/``:
+
+    python -m benchmarks.group_commit --rate 2000 --seconds 5
+    python -m benchmarks.group_commit --storage sqlite --rate 5000 --rtt-ms 2
+
+``--rtt-ms`` adds a simulated network round trip (with ``--pool-size``
+connections, like Motor's maxPoolSize) on top of the chosen backend, to
+approximate a remote database when only SQLite is at hand.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from benchmarks.loadtest import _contact_payload
+
+
+class RoundTripRepository:
+    """Delay every write by one simulated round trip over a bounded pool"""
+
+    def __init__(self, repository, rtt: float, pool_size: int):
+        self.repository = repository
+        self.rtt = rtt
+        self._pool = asyncio.Semaphore(pool_size)
+
+    async def insert(self, doc):
+        async with self._pool:
+            await asyncio.sleep(self.rtt)
+            await self.repository.insert(doc)
+
+    async def insert_many(self, docs):
+        async with self._pool:
+            await asyncio.sleep(self.rtt)
+            return await self.repository.insert_many(docs)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def offer(insert, rate: int, seconds: float) -> dict:
+    from models.blog import ContactSubmission
+
+    total = int(rate * seconds)
+    latencies = []
+    errors = 0
+
+    async def one(i: int, scheduled: float):
+        nonlocal errors
+        doc = ContactSubmission(**_contact_payload(i)).dict()
+        try:
+            await insert(doc)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - scheduled)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+        "errors": errors,
+    }
+
+
+async def main_async(args) -> int:
+    scratch_dir = None
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    if args.storage == "sqlite" and "SQLITE_PATH" not in os.environ:
+        scratch_dir = tempfile.mkdtemp(prefix="group-commit-")
+        os.environ["SQLITE_PATH"] = os.path.join(scratch_dir, "bench.db")
+    os.environ["STORAGE_BACKEND"] = args.storage
+
+    from database import storage
+    from services.batching import GroupCommitter
+
+    await storage.migrate()
+    repository = storage.submissions
+    if args.rtt_ms:
+        repository = RoundTripRepository(repository, args.rtt_ms / 1000, args.pool_size)
+    try:
+        direct = await offer(repository.insert, args.rate, args.seconds)
+        batcher = GroupCommitter(repository, max_batch=args.batch_size, max_delay=args.delay_ms / 1000)
+        batched = await offer(batcher.submit, args.rate, args.seconds)
+        await batcher.close()
+    finally:
+        await storage.drop()
+        storage.close()
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    simulated = f" + {args.rtt_ms}ms simulated RTT x{args.pool_size} connections" if args.rtt_ms else ""
+    print(f"{args.storage}{simulated}, offered {args.rate} req/s for {args.seconds}s")
+    print(f"{'mode':<14}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for name, result in (("insert_one", direct), ("group commit", batched)):
+        print(
+            f"{name:<14}{result['throughput_rps']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}"
+            f"{result['max_ms']:>10}{result['errors']:>8}"
+        )
+    print(f"avg batch size {batcher.stats()['avg_batch_size']}")
+    return 1 if direct["errors"] or batched["errors"] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--storage", choices=["mongo", "sqlite"], default="mongo")
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    parser.add_argument("--rate", type=int, default=2000, help="Offered submissions per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated round trip added to every write")
+    parser.add_argument("--pool-size", type=int, default=10, help="Concurrent writes allowed with --rtt-ms")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
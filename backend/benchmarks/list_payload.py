@@ -0,0 +1,78 @@
+"""Compare full-post and summary list responses.
+
+Builds synthetic posts with long bodies and times the same work a list
+endpoint does per request: model validation from the Mongo document plus
+FastAPI's JSON encoding. Run from ``backend/``:
+
+    python -m benchmarks.list_payload --posts 20 --content-kb 30
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from models.blog import BlogPost, BlogPostSummary
+
+
+def make_post_docs(count: int, content_kb: int):
+    paragraph = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8 + "</p>\n"
+    content = paragraph * max(1, (content_kb * 1024) // len(paragraph))
+    now = datetime.utcnow()
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Post {i}",
+            "excerpt": "A short excerpt shown on the listing page.",
+            "content": content,
+            "author": "Aagam Shah",
+            "publish_date": now,
+            "tags": ["Data Analytics", "SQL"],
+            "read_time": "5 min read",
+            "image": "https://images.unsplash.com/photo-1551288049-bebda4e38f71?w=800",
+            "is_published": True,
+            "created_at": now,
+            "updated_at": now,
+            "version": 1,
+        }
+        for i in range(count)
+    ]
+
+
+def render(model, docs):
+    return json.dumps(jsonable_encoder([model(**doc) for doc in docs])).encode()
+
+
+def measure(model, docs, rounds: int):
+    body = render(model, docs)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(model, docs)
+    return len(body), (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--content-kb", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = make_post_docs(args.posts, args.content_kb)
+    # Mongo applies the projection server side, so summaries never see content
+    summary_docs = [{k: v for k, v in doc.items() if k != "content"} for doc in docs]
+
+    full_bytes, full_ms = measure(BlogPost, docs, args.rounds)
+    summary_bytes, summary_ms = measure(BlogPostSummary, summary_docs, args.rounds)
+
+    print(f"{args.posts} posts, ~{args.content_kb} KB content each")
+    print(f"{'shape':<10}{'bytes':>12}{'ms/request':>14}")
+    print(f"{'full':<10}{full_bytes:>12}{full_ms:>14.3f}")
+    print(f"{'summary':<10}{summary_bytes:>12}{summary_ms:>14.3f}")
+    print(f"payload x{full_bytes / summary_bytes:.1f} smaller, CPU x{full_ms / summary_ms:.1f} faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Latency and throughput benchmark for every blog and contact API route.
+
+Boots ``server.app`` in-process (no sockets) against a throwaway database,
+seeds it, then drives each route at fixed concurrency levels and reports
+throughput, p50/p95/p99 latency and per-request peak allocations. Results
+are written as JSON; with ``--baseline`` the run fails when any scenario is
+slower than the stored baseline by more than ``--tolerance``.
+
+Run from ``backend/``:
+
+    python -m benchmarks.loadtest --output bench.json
+    python -m benchmarks.loadtest --in-memory --submissions 10000
+    python -m benchmarks.loadtest --storage sqlite
+    python -m benchmarks.loadtest --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.list_payload import make_post_docs
+
+# (path, request kwargs) for the i-th request of a scenario
+RequestFactory = Callable[[int, dict], Tuple[str, dict]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    request: RequestFactory
+    setup: Optional[Callable[[httpx.AsyncClient, dict], Awaitable[None]]] = None
+    # Heavy routes (full exports) run fewer requests
+    requests: Optional[int] = None
+    state: dict = field(default_factory=dict)
+
+
+def _contact_payload(i: int) -> dict:
+    return {
+        "name": f"Load Test {i}",
+        "email": f"load{i}@example.com",
+        "subject": "Benchmark",
+        "message": "Hello from the load test. " * 10,
+        "company": "Bench Inc" if i % 2 else None,
+    }
+
+
+def _post_payload(i: int, content_kb: int) -> dict:
+    doc = make_post_docs(1, content_kb)[0]
+    return {
+        "title": f"Load test post {i}",
+        "excerpt": doc["excerpt"],
+        "content": doc["content"],
+        "tags": ["Benchmark", f"Tag {i % 5}"],
+        "read_time": "5 min read",
+        "image": doc["image"],
+    }
+
+
+def _ndjson(records: List[dict]) -> bytes:
+    return b"".join(json.dumps(record).encode() + b"\n" for record in records)
+
+
+def build_scenarios(ctx: dict) -> List[Scenario]:
+    post_ids = ctx["post_ids"]
+    submission_ids = ctx["submission_ids"]
+    tags = ctx["tags"]
+    content_kb = ctx["content_kb"]
+
+    async def second_page(client, state):
+        response = await client.get("/api/blog/posts", params={"limit": 10})
+        state["cursor"] = response.headers.get("x-next-cursor")
+
+    async def list_validator(client, state):
+        response = await client.get("/api/blog/posts")
+        state["etag"] = response.headers["etag"]
+
+    async def second_submissions_page(client, state):
+        response = await client.get("/api/contact/submissions", params={"limit": 50})
+        state["cursor"] = response.headers.get("x-next-cursor")
+
+    async def deletable_posts(client, state):
+        state["ids"] = []
+        for i in range(ctx["requests"]):
+            response = await client.post("/api/blog/posts", json=_post_payload(i, 1))
+            state["ids"].append(response.json()["id"])
+
+    def import_posts(i, state):
+        records = [dict(_post_payload(i, 1), id=str(uuid.uuid4())) for _ in range(10)]
+        for record in records:
+            record["read_time"] = "1 min read"
+        return "/api/blog/import", {"content": _ndjson(records)}
+
+    def update_status(i, state):
+        # Setting the current status again is not an update, so never repeat one
+        state["updates"] = state.get("updates", 0) + 1
+        status = f"reviewed-{state['updates']}"
+        return f"/api/contact/submissions/{submission_ids[i % len(submission_ids)]}/status", {"params": {"status": status}}
+
+    def import_submissions(i, state):
+        return "/api/contact/import", {"content": _ndjson([_contact_payload(i * 100 + j) for j in range(100)])}
+
+    return [
+        Scenario("blog.list", "GET", lambda i, s: ("/api/blog/posts", {})),
+        Scenario("blog.list_304", "GET", lambda i, s: ("/api/blog/posts", {"headers": {"If-None-Match": s["etag"]}}), setup=list_validator),
+        Scenario("blog.list_all", "GET", lambda i, s: ("/api/blog/posts", {"params": {"published_only": "false", "limit": 50}})),
+        Scenario("blog.list_cursor", "GET", lambda i, s: ("/api/blog/posts", {"params": {"limit": 10, "cursor": s["cursor"]}}), setup=second_page),
+        Scenario("blog.get", "GET", lambda i, s: (f"/api/blog/posts/{post_ids[i % len(post_ids)]}", {})),
+        Scenario("blog.by_tag", "GET", lambda i, s: (f"/api/blog/posts/tag/{tags[i % len(tags)]}", {})),
+        Scenario("blog.tags", "GET", lambda i, s: ("/api/blog/tags", {})),
+        Scenario("blog.search", "GET", lambda i, s: ("/api/blog/search", {"params": {"q": ["data analy", "sql index", "dashboard"][i % 3]}})),
+        Scenario("blog.related", "GET", lambda i, s: (f"/api/blog/posts/{post_ids[i % len(post_ids)]}/related", {})),
+        Scenario("blog.cache_stats", "GET", lambda i, s: ("/api/blog/cache/stats", {})),
+        Scenario("blog.create", "POST", lambda i, s: ("/api/blog/posts", {"json": _post_payload(i, content_kb)})),
+        Scenario("blog.update", "PUT", lambda i, s: (f"/api/blog/posts/{post_ids[i % len(post_ids)]}", {"json": {"excerpt": f"Updated excerpt {i}"}})),
+        Scenario("blog.delete", "DELETE", lambda i, s: (f"/api/blog/posts/{s['ids'][i]}", {}), setup=deletable_posts),
+        Scenario("blog.seed", "POST", lambda i, s: ("/api/blog/seed", {})),
+        Scenario("blog.export", "GET", lambda i, s: ("/api/blog/export", {}), requests=5),
+        Scenario("blog.import", "POST", import_posts, requests=10),
+        Scenario("contact.submit", "POST", lambda i, s: ("/api/contact/submit", {"json": _contact_payload(i)})),
+        Scenario("contact.submit_replay", "POST", lambda i, s: ("/api/contact/submit", {"json": _contact_payload(0), "headers": {"Idempotency-Key": "loadtest-replay"}})),
+        Scenario("contact.list", "GET", lambda i, s: ("/api/contact/submissions", {})),
+        Scenario("contact.list_cursor", "GET", lambda i, s: ("/api/contact/submissions", {"params": {"cursor": s["cursor"]}}), setup=second_submissions_page),
+        Scenario("contact.get", "GET", lambda i, s: (f"/api/contact/submissions/{submission_ids[i % len(submission_ids)]}", {})),
+        Scenario("contact.update_status", "PUT", update_status),
+        Scenario("contact.outbox_stats", "GET", lambda i, s: ("/api/contact/outbox/stats", {})),
+        Scenario("contact.stats", "GET", lambda i, s: ("/api/contact/stats", {"params": {"start": (datetime.utcnow() - timedelta(days=365)).isoformat()}})),
+        Scenario("contact.stats_hourly", "GET", lambda i, s: ("/api/contact/stats", {"params": {"granularity": "hour"}})),
+        Scenario("contact.export", "GET", lambda i, s: ("/api/contact/export", {}), requests=2),
+        Scenario("contact.import", "POST", import_submissions, requests=10),
+    ]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            path, kwargs = scenario.request(i, scenario.state)
+            start = time.perf_counter()
+            response = await client.request(scenario.method, path, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+    }
+
+
+async def measure_allocations(client: httpx.AsyncClient, scenario: Scenario, samples: int) -> float:
+    """Median peak traced allocation per request, in KiB"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(samples):
+            path, kwargs = scenario.request(i, scenario.state)
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            response = await client.request(scenario.method, path, **kwargs)
+            await response.aread()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+    finally:
+        tracemalloc.stop()
+    return round(statistics.median(peaks) / 1024, 2) if peaks else 0.0
+
+
+async def seed(storage, posts: int, content_kb: int, submissions: int) -> dict:
+    from models.blog import ContactSubmission
+
+    docs = make_post_docs(posts, content_kb)
+    tag_pool = ["Data Analytics", "SQL", "BI", "Dashboards", "Machine Learning", "Performance"]
+    now = datetime.utcnow()
+    for i, doc in enumerate(docs):
+        doc["title"] = f"Benchmark post {i} about data analytics and SQL"
+        doc["tags"] = [tag_pool[i % len(tag_pool)], tag_pool[(i + 1) % len(tag_pool)]]
+        doc["publish_date"] = now - timedelta(minutes=i)
+    if docs:
+        await storage.posts.insert_many(docs)
+
+    submission_ids = []
+    batch = []
+    for i in range(submissions):
+        contact = ContactSubmission(**_contact_payload(i), submitted_at=now - timedelta(seconds=i)).dict()
+        batch.append(contact)
+        if len(submission_ids) < 1000:
+            submission_ids.append(contact["id"])
+        if len(batch) == 5000:
+            await storage.submissions.insert_many(batch)
+            batch = []
+    if batch:
+        await storage.submissions.insert_many(batch)
+
+    return {
+        "post_ids": [doc["id"] for doc in docs],
+        "submission_ids": submission_ids,
+        "tags": tag_pool,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Scenarios that regressed against ``baseline`` beyond ``tolerance``"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+async def main_async(args) -> int:
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    scratch_db = None
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    if args.in_memory:
+        # Throwaway embedded database; nothing touches disk
+        args.storage = "sqlite"
+        os.environ["SQLITE_PATH"] = ":memory:"
+    elif args.storage == "sqlite" and "SQLITE_PATH" not in os.environ:
+        scratch_db = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "bench.db")
+        os.environ["SQLITE_PATH"] = scratch_db
+    os.environ["STORAGE_BACKEND"] = args.storage
+    # Every benchmark request comes from one client; measure the route, not the limiter
+    os.environ.setdefault("CONTACT_RATE_PER_MINUTE", "0")
+
+    import database
+    from server import create_app
+
+    app = create_app()
+    # Per-request client logging would dominate the measurements
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    lifespan = app.router.lifespan_context(app)
+    await lifespan.__aenter__()
+    try:
+        ctx = await seed(database.storage, args.posts, args.content_kb, args.submissions)
+        ctx.update(content_kb=args.content_kb, requests=args.requests)
+        from routes import blog
+
+        await blog._on_posts_reloaded()
+
+        transport = httpx.ASGITransport(app=app)
+        results: Dict[str, dict] = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for scenario in build_scenarios(ctx):
+                if args.only and not any(scenario.name.startswith(prefix) for prefix in args.only):
+                    continue
+                if scenario.setup:
+                    await scenario.setup(client, scenario.state)
+                requests = min(args.requests, scenario.requests or args.requests)
+                for concurrency in args.concurrency:
+                    if scenario.name == "blog.delete":
+                        # Every level needs fresh posts to delete
+                        await scenario.setup(client, scenario.state)
+                    result = await run_scenario(client, scenario, requests, concurrency)
+                    results[f"{scenario.name}@{concurrency}"] = result
+                    print(
+                        f"{scenario.name:<24}c={concurrency:<4}{result['throughput_rps']:>10.1f} rps"
+                        f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f} ms"
+                        f"{'  errors=' + str(result['errors']) if result['errors'] else ''}"
+                    )
+                if args.alloc_samples and scenario.method == "GET":
+                    alloc = await measure_allocations(client, scenario, args.alloc_samples)
+                    for concurrency in args.concurrency:
+                        results[f"{scenario.name}@{concurrency}"]["alloc_peak_kib"] = alloc
+    finally:
+        await database.storage.drop()
+        await lifespan.__aexit__(None, None, None)
+        if scratch_db:
+            shutil.rmtree(os.path.dirname(scratch_db), ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "storage": "in-memory" if args.in_memory else args.storage,
+            "posts": args.posts,
+            "content_kb": args.content_kb,
+            "submissions": args.submissions,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+    errors = sum(result["errors"] for result in results.values())
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="MongoDB to benchmark against (default: MONGO_URL)")
+    parser.add_argument("--storage", choices=["mongo", "sqlite"], default="mongo", help="Storage backend to benchmark")
+    parser.add_argument("--in-memory", action="store_true", help="Use an in-memory SQLite database")
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--content-kb", type=int, default=20, help="Approximate body size per post")
+    parser.add_argument("--submissions", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Sequential requests traced for allocations")
+    parser.add_argument("--only", nargs="+", help="Only run scenarios starting with these names")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Fail if results regress against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
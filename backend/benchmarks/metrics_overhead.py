@@ -0,0 +1,99 @@
+"""Measure the per-request cost of the metrics instrumentation.
+
+Drives a minimal FastAPI app straight through its ASGI callable (no HTTP
+client, no sockets) with and without ``MetricsMiddleware``, then times the
+Mongo command listener on synthetic events. Run from ``backend/``:
+
+    python -m benchmarks.metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+
+from services.command_metrics import CommandMetricsListener
+from services.metrics import MetricsMiddleware, MetricsRegistry
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Mean microseconds per request through ``app``"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/items/{i}", "raw_path": f"/items/{i}".encode(),
+            "root_path": "", "query_string": b"", "headers": [], "server": ("bench", 80),
+        }
+
+    for i in range(200):
+        await app(scope(i), receive, send)
+    start = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def time_listener(events: int) -> float:
+    """Mean microseconds per started/succeeded command pair"""
+    listener = CommandMetricsListener(MetricsRegistry(), slow_query_ms=100)
+    started = SimpleNamespace(connection_id=("db", 27017), request_id=0, command={"find": "blog_posts"})
+    succeeded = SimpleNamespace(
+        connection_id=("db", 27017), request_id=0, command_name="find",
+        database_name="portfolio", duration_micros=850,
+    )
+    start = time.perf_counter()
+    for i in range(events):
+        started.request_id = succeeded.request_id = i
+        listener.started(started)
+        listener.succeeded(succeeded)
+    return (time.perf_counter() - start) / events * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5, help="Alternating runs; the median is reported")
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    bare = make_app()
+    instrumented = MetricsMiddleware(make_app(), MetricsRegistry())
+
+    async def run():
+        bare_us, instrumented_us = [], []
+        for _ in range(args.rounds):
+            bare_us.append(await drive(bare, args.requests))
+            instrumented_us.append(await drive(instrumented, args.requests))
+        return statistics.median(bare_us), statistics.median(instrumented_us)
+
+    bare_us, instrumented_us = asyncio.run(run())
+    overhead = instrumented_us - bare_us
+    listener_us = time_listener(args.events)
+
+    print(f"{'app':<14}{'us/request':>12}")
+    print(f"{'bare':<14}{bare_us:>12.2f}")
+    print(f"{'instrumented':<14}{instrumented_us:>12.2f}")
+    print(f"middleware overhead {overhead:.2f} us/request ({overhead / bare_us * 100:.1f}% of a trivial route)")
+    print(f"command listener {listener_us:.2f} us per command")
+
+
+if __name__ == "__main__":
+    main()
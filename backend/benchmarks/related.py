@@ -0,0 +1,106 @@
+"""Related-posts index: full build, per-write update and lookup cost.
+
+Builds synthetic posts with overlapping vocabularies and tags, then times
+a full ``rebuild``, the incremental ``update`` a create, edit or delete
+pays, and a lookup. "rescore all" is what an update would cost if every
+post's neighbours were recomputed, and "score on read" what an endpoint
+without the index would spend per request. Run from ``backend/``:
+
+    python -m benchmarks.related --posts 2000 --updates 200
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from services.related import RelatedIndex
+
+TOPICS = [
+    "data analytics warehouse pipeline etl batch stream kafka spark",
+    "sql query index join partition optimizer plan postgres",
+    "dashboard chart visualization kpi metric tableau report stakeholder",
+    "machine learning model feature training forecast regression classifier",
+    "python pandas numpy notebook script automation testing",
+    "cloud aws storage cost scaling serverless container deploy",
+]
+# Long tail of rarer words, so the vocabulary is closer to real posts
+RARE_WORDS = [f"term{n}" for n in range(20000)]
+TAGS = ["Data Analytics", "SQL", "BI", "Dashboards", "Machine Learning", "Python", "Cloud", "Performance"]
+
+
+def make_post(rng: random.Random, i: int) -> dict:
+    words = [word for topic in rng.sample(TOPICS, 2) for word in topic.split()]
+    rare = [RARE_WORDS[min(int(rng.paretovariate(0.8)), len(RARE_WORDS)) - 1] for _ in range(100)]
+    text = " ".join(rng.choices(words, k=300) + rare)
+    return {
+        "id": str(uuid.uuid4()),
+        "title": " ".join(rng.sample(words, 5)),
+        "excerpt": " ".join(rng.sample(words, 12)),
+        "plain_text": text,
+        "tags": rng.sample(TAGS, rng.randint(1, 3)),
+        "read_time": "5 min read",
+        "image": "https://images.unsplash.com/photo-1551288049-bebda4e38f71?w=800",
+        "publish_date": datetime.utcnow(),
+        "is_published": True,
+    }
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=200, help="Incremental writes to time")
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    posts = [make_post(rng, i) for i in range(args.posts)]
+    index = RelatedIndex(k=args.k)
+    for post in posts:
+        index.ingest(post)
+    build_ms = timed(index.rebuild)
+    rescore_ms = timed(lambda: index._rescore(list(index._ids)))
+    # Scoring one post against the corpus, as a request would without the index
+    score_ms = statistics.median(timed(lambda: index._rescore([post["id"]])) for post in posts[:50])
+
+    # A mix of edits, creates and deletes, timed one write at a time
+    by_kind = {"update": [], "create": [], "delete": []}
+    for i in range(args.updates):
+        kind = ("update", "update", "create", "delete")[i % 4]
+        if kind == "update":
+            before = rng.choice(posts)
+            after = dict(make_post(rng, i), id=before["id"])
+            posts[posts.index(before)] = after
+        elif kind == "create":
+            before, after = None, make_post(rng, args.posts + i)
+            posts.append(after)
+        else:
+            before, after = posts.pop(rng.randrange(len(posts))), None
+        by_kind[kind].append(timed(lambda: index.update(before, after)))
+
+    ids = [post["id"] for post in posts]
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        index.related(ids[i % len(ids)], limit=5)
+    lookup_us = (time.perf_counter() - start) / args.lookups * 1e6
+
+    print(f"{args.posts} posts, k={args.k}, {len(index._vocabulary)} terms")
+    print(f"{'full rebuild':<22}{build_ms:>10.1f} ms")
+    print(f"{'rescore all':<22}{rescore_ms:>10.1f} ms")
+    for kind, samples in by_kind.items():
+        if samples:
+            print(f"{kind + ' (median)':<22}{statistics.median(samples):>10.2f} ms")
+    print(f"{'score on read':<22}{score_ms:>10.2f} ms")
+    print(f"{'lookup':<22}{lookup_us:>10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Search latency: pruned top-k against scoring every matching post.
+
+Builds synthetic posts whose words follow a Zipf distribution, so a few
+terms appear in most posts and the rest in a handful, then times queries
+of each kind. "search" is the whole ``SearchIndex.search`` call, snippets
+and highlighting included; "pruned" is its scoring alone, and
+"exhaustive" the same scoring over every posting of every query term, as
+the index did before postings were walked in impact order. Both must
+return the same top scores. Run from ``backend/``:
+
+    python -m benchmarks.search --posts 20000
+"""
+import argparse
+import heapq
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime
+from operator import itemgetter
+
+from services.search import SearchIndex, tokenize
+
+VOCABULARY = [f"word{n}" for n in range(30000)]
+
+
+def make_post(rng: random.Random) -> dict:
+    words = [VOCABULARY[min(int(rng.paretovariate(0.7)), len(VOCABULARY)) - 1] for _ in range(400)]
+    return {
+        "id": str(uuid.uuid4()),
+        "title": " ".join(rng.sample(words, 6)),
+        "excerpt": " ".join(rng.sample(words, 20)),
+        "content": "<p>" + " ".join(words) + "</p>",
+        "tags": rng.sample(["SQL", "BI", "Python", "Cloud", "Dashboards", "Machine Learning"], 2),
+        "read_time": "5 min read",
+        "image": "https://images.unsplash.com/photo-1551288049-bebda4e38f71?w=800",
+        "publish_date": datetime.utcnow(),
+        "is_published": True,
+    }
+
+
+def exhaustive(index: SearchIndex, query: str, limit: int, prefix: bool = True) -> list:
+    """Top scores from scoring every posting of every query term"""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    n_docs = len(index._docs)
+    scores = {}
+    for i, token in enumerate(tokens):
+        expansions = index._expand(token) if prefix and i == len(tokens) - 1 else [token]
+        best = {}
+        for term in (t for t in expansions if t in index._postings):
+            postings = index._postings[term]
+            idf = index._idf(n_docs, len(postings))
+            for post_id, impact in postings.items():
+                best[post_id] = max(best.get(post_id, 0.0), idf * impact)
+        for post_id, score in best.items():
+            scores[post_id] = scores.get(post_id, 0.0) + score
+    return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+
+def queries(index: SearchIndex, rng: random.Random, n: int) -> dict:
+    by_df = sorted(index._postings, key=lambda term: len(index._postings[term]), reverse=True)
+    common, mid, rare = by_df[:20], by_df[200:2000], by_df[-5000:]
+    return {
+        "common term": [rng.choice(common) for _ in range(n)],
+        "rare term": [rng.choice(rare) for _ in range(n)],
+        "two terms": [f"{rng.choice(common)} {rng.choice(mid)}" for _ in range(n)],
+        "three terms": [f"{rng.choice(common)} {rng.choice(common)} {rng.choice(mid)}" for _ in range(n)],
+        "prefix": [rng.choice(common)[:5] for _ in range(n)],
+    }
+
+
+def pruned(index: SearchIndex, query: str, limit: int, prefix: bool = True) -> list:
+    groups, _ = index._groups(list(dict.fromkeys(tokenize(query))), prefix)
+    return heapq.nlargest(limit, index._top_scores(groups, limit).items(), key=itemgetter(1))
+
+
+def timed_us(fn, batch) -> str:
+    samples = []
+    for query in batch:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return f"{statistics.median(samples):>8.0f}{samples[int(len(samples) * 0.99)]:>7.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = SearchIndex()
+    for _ in range(args.posts):
+        index.add(make_post(rng))
+    index._reweight()
+    for term in index._postings:
+        index._ranked(term)
+
+    print(f"{args.posts} posts, {len(index._postings)} terms, top {args.limit}; p50 and p99 in us")
+    print(f"{'query':<14}{'search':>15}{'pruned':>15}{'exhaustive':>15}")
+    for kind, batch in queries(index, rng, args.queries).items():
+        for query in batch:
+            found = [round(score, 4) for _, score in pruned(index, query, args.limit)]
+            expected = [round(score, 4) for _, score in exhaustive(index, query, args.limit)]
+            assert found == expected, (query, found, expected)
+        print(f"{kind:<14}"
+              f"{timed_us(lambda q: index.search(q, args.limit), batch)}"
+              f"{timed_us(lambda q: pruned(index, q, args.limit), batch)}"
+              f"{timed_us(lambda q: exhaustive(index, q, args.limit), batch)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare the old and new response serialization paths for list endpoints.
+
+old: ``BlogPost(**doc)`` per document, then FastAPI validates and serializes
+     the list again through ``response_model`` and renders it with JSONResponse.
+new: documents projected without ``_id`` are encoded straight to bytes.
+
+Run from ``backend/``:
+
+    python -m benchmarks.serialization
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from benchmarks.list_payload import make_post_docs
+from models.blog import BlogPost
+from services.serialization import dumps
+
+
+async def old_path(field, docs):
+    models = [BlogPost(**doc) for doc in docs]
+    content = await serialize_response(field=field, response_content=models)
+    return JSONResponse(content).body
+
+
+async def new_path(field, docs):
+    return dumps(docs)
+
+
+async def measure(path, field, docs, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await path(field, docs)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def run(sizes: List[int], content_kb: int, rounds: int):
+    field = create_response_field(name="response", type_=List[BlogPost])
+    print(f"{'items':>6}{'old ms':>10}{'new ms':>10}{'speedup':>10}")
+    for size in sizes:
+        docs = make_post_docs(size, content_kb)
+        # What Mongo returns without a projection
+        raw_docs = [dict(doc, _id=ObjectId()) for doc in docs]
+        old_ms = await measure(old_path, field, raw_docs, rounds)
+        new_ms = await measure(new_path, field, docs, rounds)
+        print(f"{size:>6}{old_ms:>10.3f}{new_ms:>10.3f}{old_ms / new_ms:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument("--content-kb", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.content_kb, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Worker cold-start time: import, app construction and lifespan startup.
+
+Each boot runs in a fresh interpreter, as a new uvicorn worker would, and
+reports time to import ``server``, build the app and finish the lifespan
+startup, plus the MongoDB commands startup issued. "first" boots see every
+migration pending, which is what each boot paid before migrations were
+recorded; "repeat" boots find them applied. Run from ``backend/``:
+
+    python -m benchmarks.startup --storage sqlite --posts 200
+    python -m benchmarks.startup --mongo-url mongodb://localhost:27017 --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def child():
+    """One boot, timed from a cold interpreter; prints a JSON line"""
+    start = time.perf_counter()
+    import server
+    imported = time.perf_counter()
+    app = server.create_app()
+    built = time.perf_counter()
+
+    async def boot():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+
+    ready = asyncio.run(boot())
+    from services.metrics import registry
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "create_app_ms": (built - imported) * 1000,
+        "lifespan_ms": (ready - built) * 1000,
+        "total_ms": (ready - start) * 1000,
+        "db_commands": sum(histogram.count for histogram in registry.db_latency.values()),
+    }))
+
+
+def boot_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+async def seed(posts: int):
+    from benchmarks.list_payload import make_post_docs
+    from database import storage
+
+    if posts:
+        await storage.posts.insert_many(make_post_docs(posts, 4))
+    storage.close()
+
+
+async def forget_migrations(storage_kind: str, scratch_dir):
+    """Make the next boot see every migration as pending again"""
+    if storage_kind == "sqlite":
+        shutil.copy(os.path.join(scratch_dir, "seed.db"), os.environ["SQLITE_PATH"])
+        return
+    from database import storage
+    await storage.db.schema_migrations.delete_many({})
+    storage.close()
+
+
+async def drop():
+    from database import storage
+    await storage.drop()
+    storage.close()
+
+
+def summarize(runs):
+    return {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--storage", choices=["mongo", "sqlite"], default="mongo")
+    parser.add_argument("--mongo-url", help="MongoDB to boot against (default: MONGO_URL)")
+    parser.add_argument("--posts", type=int, default=50, help="Posts to seed before booting")
+    parser.add_argument("--runs", type=int, default=5, help="Boots of each kind")
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    scratch_dir = tempfile.mkdtemp(prefix="startup-")
+    os.environ["DB_NAME"] = f"bench_{uuid.uuid4().hex[:8]}"
+    os.environ["STORAGE_BACKEND"] = args.storage
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    if args.storage == "sqlite":
+        os.environ["SQLITE_PATH"] = os.path.join(scratch_dir, "seed.db")
+        asyncio.run(seed(args.posts))
+        os.environ["SQLITE_PATH"] = os.path.join(scratch_dir, "bench.db")
+    else:
+        asyncio.run(seed(args.posts))
+
+    try:
+        first = []
+        for _ in range(args.runs):
+            asyncio.run(forget_migrations(args.storage, scratch_dir))
+            first.append(boot_once())
+        repeat = [boot_once() for _ in range(args.runs)]
+    finally:
+        if args.storage == "mongo":
+            asyncio.run(drop())
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print(f"{args.storage}, {args.posts} posts, median of {args.runs} boots")
+    print(f"{'boot':<10}{'import ms':>12}{'app ms':>10}{'lifespan ms':>14}{'total ms':>11}{'db cmds':>9}")
+    for name, runs in (("first", first), ("repeat", repeat)):
+        result = summarize(runs)
+        print(
+            f"{name:<10}{result['import_ms']:>12}{result['create_app_ms']:>10}{result['lifespan_ms']:>14}"
+            f"{result['total_ms']:>11}{result['db_commands']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
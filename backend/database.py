@@ -1,12 +1,69 @@
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import Callable, Optional
+
+from services.metrics import registry
+from storage.base import Storage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
\ No newline at end of file
+def create_storage() -> Storage:
+    """Build the storage backend selected by STORAGE_BACKEND ("mongo" or "sqlite")"""
+    backend = os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+    if backend == 'sqlite':
+        # Embedded backend for single-node deployments; ":memory:" for throwaway runs
+        from storage.sqlite import SQLiteStorage
+        return SQLiteStorage(os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'portfolio.db')))
+    if backend == 'mongo':
+        from services.command_metrics import CommandMetricsListener
+        from storage.mongo import MongoStorage
+        # Command timings feed /api/metrics; SLOW_QUERY_MS=0 turns the slow-query log off
+        listener = CommandMetricsListener(registry, float(os.environ.get('SLOW_QUERY_MS', '100')))
+        return MongoStorage(os.environ['MONGO_URL'], os.environ['DB_NAME'], event_listeners=[listener])
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+class _LazyRepository:
+    """Stand-in for one of the backend's repositories, resolved on each use"""
+    __slots__ = ("_handle", "_name")
+
+    def __init__(self, handle: "LazyStorage", name: str):
+        self._handle = handle
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(getattr(self._handle.backend, self._name), attr)
+
+class LazyStorage:
+    """The process's storage backend, built on first use instead of at import.
+
+    Route modules bind ``storage`` and its repositories at import time, so
+    importing the app opens no connection and loads no data; the app's
+    lifespan (or a CLI command) is what first touches the backend. ``close``
+    drops it, and a later use builds a new one.
+    """
+
+    def __init__(self, factory: Callable[[], Storage]):
+        self._factory = factory
+        self._backend: Optional[Storage] = None
+        self.posts = _LazyRepository(self, "posts")
+        self.submissions = _LazyRepository(self, "submissions")
+        self.outbox = _LazyRepository(self, "outbox")
+        self.admission = _LazyRepository(self, "admission")
+
+    @property
+    def backend(self) -> Storage:
+        if self._backend is None:
+            self._backend = self._factory()
+        return self._backend
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+
+storage = LazyStorage(create_storage)
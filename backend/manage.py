@@ -0,0 +1,131 @@
+"""Maintenance commands for the portfolio backend.
+
+Run from ``backend/``:
+
+    python manage.py --help
+"""
+import asyncio
+import json
+import sys
+from enum import Enum
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from database import storage
+from models.blog import BlogPost, ContactSubmission
+from services.bulk import export_ndjson, import_ndjson
+from services.contact_stats import rebuild_rollups
+from services.snapshots import build_snapshot
+from services.tag_stats import rebuild_tag_stats
+
+app = typer.Typer(help="Portfolio backend maintenance commands")
+
+
+class Collection(str, Enum):
+    blog_posts = "blog_posts"
+    contact_submissions = "contact_submissions"
+
+
+BULK_MODELS = {
+    Collection.blog_posts: BlogPost,
+    Collection.contact_submissions: ContactSubmission,
+}
+
+
+def repository(collection: Collection):
+    return storage.posts if collection is Collection.blog_posts else storage.submissions
+
+
+def run(coro):
+    """Run a coroutine and close the storage backend afterwards"""
+    try:
+        return asyncio.run(coro)
+    finally:
+        storage.close()
+
+
+@app.command("rebuild-tag-stats")
+def rebuild_tag_stats_command(
+    verify_only: bool = typer.Option(False, "--verify-only", help="Report drift without repairing it"),
+):
+    """Recompute the materialized tag counts from blog_posts"""
+    report = run(rebuild_tag_stats(storage.posts, verify_only=verify_only))
+    typer.echo(json.dumps(report, indent=2))
+    if report["drift"] and verify_only:
+        raise typer.Exit(code=1)
+
+
+@app.command("rebuild-contact-rollups")
+def rebuild_contact_rollups_command(
+    verify_only: bool = typer.Option(False, "--verify-only", help="Report drift without repairing it"),
+):
+    """Recompute the hourly and daily contact submission rollups from contact_submissions"""
+    report = run(rebuild_rollups(storage.submissions, verify_only=verify_only))
+    typer.echo(json.dumps(report, indent=2))
+    if report["drift"] and verify_only:
+        raise typer.Exit(code=1)
+
+
+async def _export(collection: Collection, output):
+    async for chunk in export_ndjson(repository(collection).iter_all()):
+        output.write(chunk)
+
+
+async def _read_lines(path: Path):
+    with path.open("rb") as f:
+        for line in f:
+            yield line
+
+
+@app.command("export")
+def export_command(
+    collection: Collection,
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="File to write (default: stdout)"),
+):
+    """Stream a collection to NDJSON"""
+    if output is None:
+        run(_export(collection, sys.stdout.buffer))
+    else:
+        with output.open("wb") as f:
+            run(_export(collection, f))
+
+
+@app.command("import")
+def import_command(
+    collection: Collection,
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="NDJSON file to import"),
+    batch_size: int = typer.Option(1000, help="Documents per insert_many batch"),
+):
+    """Validate and bulk insert NDJSON records into a collection"""
+    async def _import():
+        report = await import_ndjson(_read_lines(path), BULK_MODELS[collection], repository(collection), batch_size)
+        if collection is Collection.blog_posts and report["inserted"]:
+            await rebuild_tag_stats(storage.posts)
+        return report
+
+    report = run(_import())
+    typer.echo(json.dumps(report, indent=2))
+    if report["failed"]:
+        raise typer.Exit(code=1)
+
+
+@app.command("build-snapshot")
+def build_snapshot_command(
+    output: Path = typer.Argument(..., file_okay=False, help="Directory to write the snapshot to"),
+    full: bool = typer.Option(False, "--full", help="Re-render everything instead of what changed since the last build"),
+    page_size: int = typer.Option(20, help="Posts per list page (the API's default limit)"),
+    tag_limit: int = typer.Option(10, help="Posts per tag listing (the API's default limit)"),
+):
+    """Pre-render the public blog read API to static, pre-compressed JSON files.
+
+    Serve the directory from a CDN or static host, or set
+    BLOG_SNAPSHOT_DIR to have the API serve it from memory-mapped files.
+    """
+    report = run(build_snapshot(storage.posts, output, page_size=page_size, tag_limit=tag_limit, full=full))
+    typer.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    app()
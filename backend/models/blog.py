@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 import uuid
 
@@ -12,26 +12,67 @@ class BlogPost(BaseModel):
     publish_date: datetime = Field(default_factory=datetime.utcnow)
     tags: List[str] = []
     read_time: str
+    word_count: int = 0
     image: str
     is_published: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped by every write; the post's ETag for If-Match preconditions
+    version: int = 1
 
-class BlogPostCreate(BaseModel):
+class BlogPostSummary(BaseModel):
+    """Listing shape of a blog post; the full body is only served by id"""
+    id: str
     title: str
     excerpt: str
-    content: str
+    author: str = "Aagam Shah"
+    publish_date: datetime
     tags: List[str] = []
     read_time: str
     image: str
     is_published: bool = True
+    created_at: datetime
+    updated_at: datetime
+
+class BlogSearchResult(BaseModel):
+    """A ranked search hit; highlighted fields wrap matches in <mark>"""
+    id: str
+    title: str
+    excerpt: str
+    tags: List[str] = []
+    read_time: str
+    image: str
+    publish_date: datetime
+    score: float
+    highlighted_title: str
+    snippet: str
+
+class RelatedPost(BaseModel):
+    """A post similar to another by shared tags and text"""
+    id: str
+    title: str
+    excerpt: str
+    tags: List[str] = []
+    read_time: str
+    image: str
+    publish_date: datetime
+    score: float
+
+class BlogPostCreate(BaseModel):
+    """New post; read_time and word_count are computed from content"""
+    title: str
+    # Defaults to the opening of the post's text
+    excerpt: Optional[str] = None
+    content: str
+    tags: List[str] = []
+    image: str
+    is_published: bool = True
 
 class BlogPostUpdate(BaseModel):
     title: Optional[str] = None
     excerpt: Optional[str] = None
     content: Optional[str] = None
     tags: Optional[List[str]] = None
-    read_time: Optional[str] = None
     image: Optional[str] = None
     is_published: Optional[bool] = None
 
@@ -52,4 +93,21 @@ class ContactSubmissionCreate(BaseModel):
     subject: str
     message: str
     company: Optional[str] = None
-    phone: Optional[str] = None
\ No newline at end of file
+    phone: Optional[str] = None
+
+class ContactStatsCounts(BaseModel):
+    """Submission counts for a bucket or a whole range"""
+    submissions: int
+    with_company: int
+    by_status: Dict[str, int] = {}
+
+class ContactStatsBucket(ContactStatsCounts):
+    start: datetime
+
+class ContactStats(BaseModel):
+    """Per-bucket submission counts over ``[start, end)``"""
+    granularity: str
+    start: datetime
+    end: datetime
+    totals: ContactStatsCounts
+    buckets: List[ContactStatsBucket]
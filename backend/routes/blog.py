@@ -1,43 +1,256 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+import asyncio
+import logging
 import os
 from datetime import datetime
 
-from models.blog import BlogPost, BlogPostCreate, BlogPostUpdate
-from database import db
+from models.blog import BlogPost, BlogPostCreate, BlogPostSummary, BlogPostUpdate, BlogSearchResult, RelatedPost
+from database import storage
+from storage.base import VersionConflict
+from services.bulk import NDJSON_MEDIA_TYPE, export_ndjson, import_ndjson, iter_lines
+from services.cache import ReadCache
+from services.content import derive_content, excerpt_from
+from services.conditional import (
+    collection_etag,
+    is_not_modified,
+    not_modified,
+    parse_if_match,
+    post_etag,
+    validator_headers,
+)
+from services.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from services.payloads import ENCODINGS, build_payload, negotiate
+from services.related import RelatedIndex
+from services.revalidation import ChangeWatcher
+from services.search import SearchIndex
+from services.serialization import JSONBytesResponse, dumps, fields_for
+from services.snapshots import SnapshotStore
+from services.tag_stats import apply_tag_diff, rebuild_tag_stats
 
 router = APIRouter(prefix="/api/blog", tags=["blog"])
+logger = logging.getLogger(__name__)
 
-@router.get("/posts", response_model=List[BlogPost])
+# Reads fetch exactly the response fields and encode them without
+# revalidating; list endpoints never read post bodies from storage
+POST_FIELDS = fields_for(BlogPost)
+SUMMARY_FIELDS = fields_for(BlogPostSummary)
+
+# Reads dominate traffic and posts change rarely, so read endpoints go through
+# an in-process cache that the write routes below invalidate explicitly.
+post_cache = ReadCache(
+    max_entries=int(os.environ.get("BLOG_CACHE_MAX_ENTRIES", "512")),
+    ttl=float(os.environ.get("BLOG_CACHE_TTL_SECONDS", "300")),
+)
+
+# Full-text and related-posts indexes over published posts, built at startup
+# by build_post_indexes() and kept current by the write routes, and by
+# post_watcher for writes made by other workers
+RELATED_POSTS_K = int(os.environ.get("RELATED_POSTS_K", "10"))
+search_index = SearchIndex()
+related_index = RelatedIndex(k=RELATED_POSTS_K)
+# Version of each post the indexes above hold (None once deleted); replaced
+# with them, so a write applied to indexes a rebuild discards is re-applied
+indexed_versions: Dict[str, Optional[int]] = {}
+
+# Optional pre-rendered snapshot (manage.py build-snapshot) that server.py
+# serves ahead of these routes; writes here hand reads back to the routes
+snapshot_store = SnapshotStore(os.environ["BLOG_SNAPSHOT_DIR"]) if os.environ.get("BLOG_SNAPSHOT_DIR") else None
+
+async def build_post_indexes():
+    """(Re)build the search and related-posts indexes in one pass over the published posts.
+
+    New indexes are filled and then swapped in, so reads keep using the old
+    ones until the new ones are complete.
+    """
+    global search_index, related_index, indexed_versions
+    version = await storage.posts.change_version()
+    search, related, versions = SearchIndex(), RelatedIndex(k=RELATED_POSTS_K), {}
+
+    async def posts():
+        async for post in storage.posts.iter_all(published_only=True):
+            yield post
+            # Resumed once the search index has added the post, so its term
+            # counts are reused instead of tokenizing the text twice
+            related.ingest(post, search.term_counts(post["id"]))
+            versions[post["id"]] = post.get("version")
+
+    await search.build(posts())
+    # Scoring every pair is NumPy work; the new index isn't shared until the swap
+    await asyncio.to_thread(related.rebuild)
+    search_index, related_index, indexed_versions = search, related, versions
+    post_watcher.synced(version)
+
+def _index_post(post_id: str, post: Optional[dict]):
+    """Apply a post's current state (None if deleted) to the indexes"""
+    indexed = indexed_versions.get(post_id)
+    if post is not None and indexed is not None and post.get("version", 0) < indexed:
+        # A concurrent write's hook got here first with a newer version
+        return
+    search_index.update({"id": post_id}, post)
+    related_index.update({"id": post_id}, post, search_index.term_counts(post_id))
+    indexed_versions[post_id] = post.get("version") if post is not None else None
+
+async def _apply_post_changes(post_ids: List[str]):
+    """Catch up with posts written since the last sync, by any process"""
+    applied = False
+    for post_id in dict.fromkeys(post_ids):
+        post = await storage.posts.get(post_id)
+        version = post.get("version") if post is not None else None
+        if post_id in indexed_versions and indexed_versions[post_id] == version:
+            # Written by this process and already applied
+            continue
+        _index_post(post_id, post)
+        post_cache.invalidate(("post", post_id))
+        applied = True
+    if applied:
+        post_cache.invalidate_prefix(("posts",))
+        post_cache.invalidate_prefix(("tag",))
+        post_cache.invalidate(("tags",))
+
+async def _on_posts_changed_elsewhere():
+    """Reload after writes the storage change log can't itemize"""
+    await build_post_indexes()
+    post_cache.clear()
+
+# The indexes and the read cache are per process; reads first check the
+# storage change counter (at most every BLOG_REVALIDATE_SECONDS) and apply
+# the posts other workers wrote, or rebuild in the background after bulk
+# writes. The version it has caught up to is the collection ETag.
+post_watcher = ChangeWatcher(
+    lambda: storage.posts.change_version(),
+    lambda version: storage.posts.changes_since(version),
+    _apply_post_changes,
+    _on_posts_changed_elsewhere,
+    interval=float(os.environ.get("BLOG_REVALIDATE_SECONDS", "1")),
+)
+
+def _invalidate_post(before: Optional[dict], after: Optional[dict]):
+    """Drop cached reads affected by a post going from ``before`` to ``after``"""
+    post = after or before
+    if snapshot_store is not None:
+        snapshot_store.invalidate()
+    post_cache.invalidate(("post", post["id"]))
+    post_cache.invalidate_prefix(("posts", False))
+
+    published = [p for p in (before, after) if p and p.get("is_published")]
+    if published:
+        post_cache.invalidate_prefix(("posts", True))
+        post_cache.invalidate(("tags",))
+        for tag in {tag for p in published for tag in p.get("tags", [])}:
+            post_cache.invalidate_prefix(("tag", tag))
+
+async def _on_post_changed(before: Optional[dict], after: Optional[dict]):
+    """Keep derived state in sync after a post is created, updated or deleted.
+
+    The write has already committed, so a failure here is logged rather
+    than failing the request: the next read re-applies the post to the
+    indexes from the storage change log, and a missing payload is built on
+    the first read of the post.
+    """
+    try:
+        await apply_tag_diff(storage.posts, before, after)
+        _index_post((after or before)["id"], after)
+        if after is not None:
+            # Encode and compress once here, off the loop, so reads only copy stored bytes
+            payload = await asyncio.to_thread(build_payload, after, POST_FIELDS)
+            await storage.posts.put_payload(payload)
+    except Exception as e:
+        logger.error(f"Updating derived state for post {(after or before)['id']} failed: {e}")
+    finally:
+        _invalidate_post(before, after)
+        post_watcher.record_local()
+
+async def _on_posts_reloaded():
+    """Rebuild all derived state after posts change in bulk"""
+    await rebuild_tag_stats(storage.posts)
+    await build_post_indexes()
+    post_cache.clear()
+    if snapshot_store is not None:
+        snapshot_store.invalidate()
+
+def _new_post(fields: dict):
+    """Build a post through the write-time content pipeline; returns ``(model, stored doc)``"""
+    fields = dict(fields, **derive_content(fields["content"]))
+    if not fields.get("excerpt"):
+        fields["excerpt"] = excerpt_from(fields["plain_text"])
+    blog_post = BlogPost(**fields)
+    return blog_post, dict(blog_post.dict(), plain_text=fields["plain_text"])
+
+@router.get("/posts", response_model=List[BlogPostSummary])
 async def get_blog_posts(
+    request: Request,
     published_only: bool = True,
     limit: int = 20,
-    skip: int = 0
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True)
 ):
-    """Get all blog posts with optional filtering"""
-    try:
-        query = {}
-        if published_only:
-            query["is_published"] = True
-            
-        cursor = db.blog_posts.find(query).sort("publish_date", -1).skip(skip).limit(limit)
-        posts = await cursor.to_list(length=limit)
+    """Get blog post summaries with optional filtering.
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; ``skip`` is only honoured when no cursor is given.
+    """
+    await post_watcher.check()
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        skip = 0
+
+    etag = collection_etag(post_watcher.version_tag())
+    headers = validator_headers(etag, None)
+    if is_not_modified(request.headers, etag, None):
+        return not_modified(headers)
+
+    async def load():
+        posts = await storage.posts.list(
+            published_only=published_only, after=after, skip=skip, limit=limit, fields=SUMMARY_FIELDS
+        )
         
-        return [BlogPost(**post) for post in posts]
+        return dumps(posts), next_cursor(posts, "publish_date", limit)
+
+    try:
+        body, token = await post_cache.get_or_load(("posts", published_only, limit, cursor, skip), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching blog posts: {str(e)}")
 
+    if token:
+        headers[NEXT_CURSOR_HEADER] = token
+    return JSONBytesResponse(body, headers=headers)
+
 @router.get("/posts/{post_id}", response_model=BlogPost)
-async def get_blog_post(post_id: str):
+async def get_blog_post(post_id: str, request: Request):
     """Get a specific blog post by ID"""
+    await post_watcher.check()
+    async def load():
+        payload = await storage.posts.get_payload(post_id)
+        if payload is None:
+            # Posts stored without a payload (bulk imports) get one on first read
+            post = await storage.posts.get(post_id, POST_FIELDS)
+            if not post:
+                raise HTTPException(status_code=404, detail="Blog post not found")
+            payload = await asyncio.to_thread(build_payload, post, POST_FIELDS)
+            await storage.posts.put_payload(payload)
+        
+        return payload
+
     try:
-        post = await db.blog_posts.find_one({"id": post_id})
-        if not post:
-            raise HTTPException(status_code=404, detail="Blog post not found")
+        # Payloads carry their validators and every encoding, so hot posts are
+        # served without a fetch, serialization or compression
+        payload = await post_cache.get_or_load(("post", post_id), load)
+        etag, last_modified = post_etag(payload), payload["updated_at"]
+        headers = validator_headers(etag, last_modified)
+        headers["Vary"] = "Accept-Encoding"
+        if is_not_modified(request.headers, etag, last_modified):
+            return not_modified(headers)
         
-        return BlogPost(**post)
+        encoding = negotiate(request.headers.get("accept-encoding"), [e for e in ENCODINGS if e in payload])
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return JSONBytesResponse(payload[encoding], headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -47,41 +260,60 @@ async def get_blog_post(post_id: str):
 async def create_blog_post(post_data: BlogPostCreate):
     """Create a new blog post"""
     try:
-        blog_post = BlogPost(**post_data.dict())
-        
-        post_dict = blog_post.dict()
-        result = await db.blog_posts.insert_one(post_dict)
+        blog_post, post_dict = _new_post(post_data.dict())
+        await storage.posts.insert(post_dict)
         
-        if result.inserted_id:
-            return blog_post
-        else:
-            raise HTTPException(status_code=500, detail="Failed to create blog post")
+        await _on_post_changed(None, post_dict)
+        return blog_post
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating blog post: {str(e)}")
 
 @router.put("/posts/{post_id}", response_model=BlogPost)
-async def update_blog_post(post_id: str, post_data: BlogPostUpdate):
-    """Update an existing blog post"""
+async def update_blog_post(post_id: str, post_data: BlogPostUpdate, if_match: Optional[str] = Header(None)):
+    """Update an existing blog post.
+
+    Send the post's ``ETag`` as ``If-Match`` to reject the write with 412 if
+    someone else changed the post in the meantime. ``If-Match: *`` only
+    requires the post to exist.
+    """
+    accepted_tags = None
+    if if_match is not None:
+        try:
+            accepted_tags = parse_if_match(if_match)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        # Check if post exists
-        existing_post = await db.blog_posts.find_one({"id": post_id})
-        if not existing_post:
-            raise HTTPException(status_code=404, detail="Blog post not found")
-        
+        expected_version = None
+        if accepted_tags is not None:
+            current = await storage.posts.get(post_id, ["id", "version", "updated_at"])
+            if not current:
+                raise HTTPException(status_code=404, detail="Blog post not found")
+            if post_etag(current) not in accepted_tags:
+                raise VersionConflict(current)
+            # Still the version the client saw, or the update is refused
+            expected_version = current["version"]
+
         # Update only provided fields
         update_data = {k: v for k, v in post_data.dict().items() if v is not None}
-        update_data["updated_at"] = datetime.utcnow()
+        if "content" in update_data:
+            update_data.update(derive_content(update_data["content"]))
         
-        result = await db.blog_posts.update_one(
-            {"id": post_id},
-            {"$set": update_data}
-        )
+        result = await storage.posts.update(post_id, update_data, datetime.utcnow(), expected_version)
+        if not result:
+            raise HTTPException(status_code=404, detail="Blog post not found")
         
-        if result.modified_count:
-            updated_post = await db.blog_posts.find_one({"id": post_id})
-            return BlogPost(**updated_post)
-        else:
-            raise HTTPException(status_code=500, detail="Failed to update blog post")
+        existing_post, updated_post = result
+        if updated_post["version"] != existing_post["version"]:
+            await _on_post_changed(existing_post, updated_post)
+        body = dumps({name: updated_post[name] for name in POST_FIELDS if name in updated_post})
+        return JSONBytesResponse(body, headers={"ETag": post_etag(updated_post)})
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=412,
+            detail="Blog post was modified by another request",
+            headers={"ETag": post_etag(e.current)},
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -91,9 +323,10 @@ async def update_blog_post(post_id: str, post_data: BlogPostUpdate):
 async def delete_blog_post(post_id: str):
     """Delete a blog post"""
     try:
-        result = await db.blog_posts.delete_one({"id": post_id})
+        deleted_post = await storage.posts.delete(post_id)
         
-        if result.deleted_count:
+        if deleted_post:
+            await _on_post_changed(deleted_post, None)
             return {"message": "Blog post deleted successfully"}
         else:
             raise HTTPException(status_code=404, detail="Blog post not found")
@@ -102,43 +335,117 @@ async def delete_blog_post(post_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting blog post: {str(e)}")
 
-@router.get("/posts/tag/{tag}")
-async def get_posts_by_tag(tag: str, limit: int = 10):
-    """Get blog posts filtered by tag"""
+@router.get("/posts/tag/{tag}", response_model=List[BlogPostSummary])
+async def get_posts_by_tag(tag: str, request: Request, limit: int = 10):
+    """Get blog post summaries filtered by tag"""
+    await post_watcher.check()
+    etag = collection_etag(post_watcher.version_tag())
+    headers = validator_headers(etag, None)
+    if is_not_modified(request.headers, etag, None):
+        return not_modified(headers)
+
+    async def load():
+        posts = await storage.posts.list(tag=tag, limit=limit, fields=SUMMARY_FIELDS)
+        return dumps(posts)
+
     try:
-        cursor = db.blog_posts.find(
-            {"tags": {"$in": [tag]}, "is_published": True}
-        ).sort("publish_date", -1).limit(limit)
-        
-        posts = await cursor.to_list(length=limit)
-        return [BlogPost(**post) for post in posts]
+        return JSONBytesResponse(await post_cache.get_or_load(("tag", tag, limit), load), headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching posts by tag: {str(e)}")
 
 @router.get("/tags")
-async def get_all_tags():
+async def get_all_tags(request: Request):
     """Get all unique tags from published blog posts"""
+    await post_watcher.check()
+    etag = collection_etag(post_watcher.version_tag())
+    headers = validator_headers(etag, None)
+    if is_not_modified(request.headers, etag, None):
+        return not_modified(headers)
+
     try:
-        pipeline = [
-            {"$match": {"is_published": True}},
-            {"$unwind": "$tags"},
-            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        
-        result = await db.blog_posts.aggregate(pipeline).to_list(length=None)
-        tags = [{"tag": item["_id"], "count": item["count"]} for item in result]
-        
-        return tags
+        # tag_stats is maintained by the write routes, so this is one indexed read
+        async def load():
+            return dumps(await storage.posts.tag_counts())
+
+        return JSONBytesResponse(await post_cache.get_or_load(("tags",), load), headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching tags: {str(e)}")
 
+@router.get("/search", response_model=List[BlogSearchResult])
+async def search_blog_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    prefix: bool = True
+):
+    """Full-text search over published posts, ranked with BM25.
+
+    With ``prefix`` the last query word also matches longer words, for
+    search-as-you-type.
+    """
+    await post_watcher.check()
+    try:
+        return JSONBytesResponse(dumps(search_index.search(q, limit=limit, prefix=prefix)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching blog posts: {str(e)}")
+
+@router.get("/posts/{post_id}/related", response_model=List[RelatedPost])
+async def get_related_posts(post_id: str, request: Request, limit: int = Query(5, ge=1, le=RELATED_POSTS_K)):
+    """Get published posts similar to a post, best match first"""
+    await post_watcher.check()
+    etag = collection_etag(post_watcher.version_tag())
+    headers = validator_headers(etag, None)
+    if is_not_modified(request.headers, etag, None):
+        return not_modified(headers)
+
+    try:
+        # Neighbours are precomputed on write, so this is a dictionary lookup
+        related = related_index.related(post_id, limit=limit)
+        if related is None:
+            raise HTTPException(status_code=404, detail="Blog post not found")
+        return JSONBytesResponse(dumps(related), headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching related posts: {str(e)}")
+
+@router.get("/export")
+async def export_blog_posts(published_only: bool = False):
+    """Stream every blog post as NDJSON"""
+    return StreamingResponse(
+        export_ndjson(storage.posts.iter_all(published_only=published_only)),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="blog_posts.ndjson"'},
+    )
+
+@router.post("/import")
+async def import_blog_posts(request: Request):
+    """Bulk import blog posts from an NDJSON request body"""
+    try:
+        report = await import_ndjson(iter_lines(request.stream()), BlogPost, storage.posts)
+        if report["inserted"]:
+            await _on_posts_reloaded()
+        return report
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing blog posts: {str(e)}")
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the blog read cache"""
+    return post_cache.stats()
+
+@router.get("/snapshot/stats")
+async def get_snapshot_stats():
+    """Get the state of the pre-rendered snapshot, if one is configured"""
+    if snapshot_store is None:
+        return {"enabled": False}
+    return snapshot_store.stats()
+
 @router.post("/seed")
 async def seed_blog_posts():
     """Seed the database with initial blog posts"""
     try:
         # Check if posts already exist
-        existing_count = await db.blog_posts.count_documents({})
+        existing_count = await storage.posts.count()
         if existing_count > 0:
             return {"message": f"Database already has {existing_count} blog posts"}
         
@@ -220,12 +527,10 @@ async def seed_blog_posts():
             }
         ]
         
-        # Create BlogPost objects and insert them
-        for post_data in seed_posts:
-            blog_post = BlogPost(**post_data)
-            post_dict = blog_post.dict()
-            await db.blog_posts.insert_one(post_dict)
+        # Build posts through the content pipeline and insert them in one round trip
+        await storage.posts.insert_many([_new_post(post_data)[1] for post_data in seed_posts])
         
+        await _on_posts_reloaded()
         return {"message": f"Successfully seeded {len(seed_posts)} blog posts"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error seeding blog posts: {str(e)}")
\ No newline at end of file
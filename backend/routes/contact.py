@@ -1,133 +1,346 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
+import hashlib
+import logging
+import math
 import os
-from datetime import datetime
+import time
 
-from models.blog import ContactSubmission, ContactSubmissionCreate
-from database import db
+from models.blog import ContactStats, ContactSubmission, ContactSubmissionCreate
+from database import storage
+from services.admission import ConcurrencyLimiter, MemoryAdmissionStore, Overloaded, RateLimiter, client_address
+from services.batching import GroupCommitter, QueueFull
+from services.contact_stats import BUCKET_WIDTHS, bucket_range, submission_stats
+from services.bulk import NDJSON_MEDIA_TYPE, export_ndjson, import_ndjson, iter_lines
+from services.outbox import EmailOutbox, smtp_enabled
+from services.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from services.serialization import JSONBytesResponse, dumps, fields_for
 
 router = APIRouter(prefix="/api/contact", tags=["contact"])
+logger = logging.getLogger(__name__)
+
+# Reads fetch exactly the response fields and encode them without revalidating
+SUBMISSION_FIELDS = fields_for(ContactSubmission)
+
+# Notification emails are written to a durable outbox and delivered by
+# background workers, so SMTP latency never blocks a submission.
+email_outbox = EmailOutbox(
+    storage.outbox,
+    workers=int(os.getenv("EMAIL_OUTBOX_WORKERS", "2")),
+    batch_size=int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20")),
+    max_attempts=int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8")),
+)
+
+# Opt-in group commit: under bursts, concurrent submissions share one
+# insert_many round trip; each request still waits for its batch's ack.
+submission_batcher = None
+if os.getenv("CONTACT_GROUP_COMMIT", "").lower() in ("1", "true", "yes"):
+    submission_batcher = GroupCommitter(
+        storage.submissions,
+        max_batch=int(os.getenv("CONTACT_BATCH_SIZE", "64")),
+        max_delay=float(os.getenv("CONTACT_BATCH_DELAY_MS", "5")) / 1000,
+        max_queue=int(os.getenv("CONTACT_QUEUE_LIMIT", "10000")),
+    )
+
+# Admission control. Buckets and idempotency keys live in this process,
+# bounded by ADMISSION_MAX_KEYS; with several workers set
+# ADMISSION_STORE=shared to keep them in the database instead.
+if os.getenv("ADMISSION_STORE", "memory").lower() == "shared":
+    admission_store = storage.admission
+else:
+    admission_store = MemoryAdmissionStore(max_keys=int(os.getenv("ADMISSION_MAX_KEYS", "10000")))
+
+# Per client IP and per sender email, off unless CONTACT_RATE_PER_MINUTE is
+# set. Behind a proxy every client has the proxy's address: set
+# TRUSTED_PROXY_HEADER (e.g. X-Forwarded-For) to the header it sets, or the
+# whole site shares one bucket.
+submission_limiter = RateLimiter(
+    admission_store,
+    per_minute=float(os.getenv("CONTACT_RATE_PER_MINUTE", "0")),
+    burst=int(os.getenv("CONTACT_RATE_BURST", "5")),
+)
+TRUSTED_PROXY_HEADER = os.getenv("TRUSTED_PROXY_HEADER") or None
+submission_slots = ConcurrencyLimiter(int(os.getenv("CONTACT_MAX_CONCURRENCY", "64")))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Range served by /stats when no start is given, and the most buckets one request may span
+STATS_DEFAULT_BUCKETS = {"hour": 48, "day": 30}
+STATS_MAX_BUCKETS = int(os.getenv("CONTACT_STATS_MAX_BUCKETS", "10000"))
+
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+
+def _fingerprint(contact_data: ContactSubmissionCreate) -> str:
+    """Hash of a submission request, stored with its Idempotency-Key"""
+    return hashlib.sha256(dumps(contact_data.dict())).hexdigest()
+
+
+# A replay only confirms which submission the key created; the key alone
+# must not reveal what was submitted
+REPLAY_FIELDS = ["id", "status", "submitted_at"]
+
+
+async def _replay_submission(submission_id: str):
+    """Response for a repeated Idempotency-Key: the submission it created, without its contents"""
+    submission = await storage.submissions.get(submission_id, REPLAY_FIELDS)
+    if submission is None:
+        # The first request holding this key hasn't stored its submission yet
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers=_retry_after(1),
+        )
+    return JSONBytesResponse(content=dumps(submission), headers={"Idempotent-Replayed": "true"})
+
 
 @router.post("/submit", response_model=ContactSubmission)
-async def submit_contact_form(contact_data: ContactSubmissionCreate):
-    """Submit a contact form and optionally send email"""
+async def submit_contact_form(contact_data: ContactSubmissionCreate, request: Request,
+                              idempotency_key: Optional[str] = Header(None)):
+    """Submit a contact form and optionally send email.
+
+    Send a unique ``Idempotency-Key`` to make retries safe: repeating it
+    with the same form returns the original submission's id and status
+    instead of storing another one; reusing it for a different form is a 422.
+    """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=400, detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
     try:
-        # Create contact submission record
-        contact = ContactSubmission(**contact_data.dict())
-        
-        # Save to database
-        contact_dict = contact.dict()
-        result = await db.contact_submissions.insert_one(contact_dict)
-        
-        # Send email notification (in real implementation, you'd use proper email service)
-        try:
-            await send_contact_email(contact)
-        except Exception as email_error:
-            print(f"Email sending failed: {email_error}")
-            # Continue execution even if email fails
-        
-        if result.inserted_id:
+        with submission_slots.slot():
+            # Create contact submission record
+            contact = ContactSubmission(**contact_data.dict())
+
+            if idempotency_key:
+                fingerprint = _fingerprint(contact_data)
+                claim = await admission_store.reserve_idempotency_key(
+                    idempotency_key, contact.id, fingerprint, time.time(), IDEMPOTENCY_TTL
+                )
+                if claim is not None:
+                    original_id, original_fingerprint = claim
+                    if original_fingerprint and original_fingerprint != fingerprint:
+                        raise HTTPException(
+                            status_code=422,
+                            detail="Idempotency-Key was already used for a different submission",
+                        )
+                    return await _replay_submission(original_id)
+
+            try:
+                address = client_address(request.client, request.headers, TRUSTED_PROXY_HEADER)
+                wait = await submission_limiter.check(f"ip:{address}", f"email:{contact.email.lower()}")
+                if wait:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Too many submissions, please try again later",
+                        headers=_retry_after(wait),
+                    )
+
+                # Save to database
+                contact_dict = contact.dict()
+                if submission_batcher is not None:
+                    await submission_batcher.submit(contact_dict)
+                else:
+                    await storage.submissions.insert(contact_dict)
+            except BaseException:
+                # Nothing was stored, so a retry with the same key must be able to proceed
+                if idempotency_key:
+                    await admission_store.release_idempotency_key(idempotency_key, contact.id)
+                raise
+
+            # Queue email notification; delivery happens in the background
+            try:
+                await queue_contact_email(contact)
+            except Exception as email_error:
+                logger.error(f"Email queueing failed for submission {contact.id}: {email_error}")
+                # Continue execution even if email fails
+
             return contact
-        else:
-            raise HTTPException(status_code=500, detail="Failed to submit contact form")
+    except HTTPException:
+        raise
+    except (Overloaded, QueueFull):
+        raise HTTPException(
+            status_code=503,
+            detail="Too many submissions right now, please try again shortly",
+            headers=_retry_after(1),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting contact form: {str(e)}")
 
-async def send_contact_email(contact: ContactSubmission):
-    """Send email notification for contact form submission"""
+async def queue_contact_email(contact: ContactSubmission):
+    """Queue an email notification for a contact form submission"""
+    from_email = os.getenv("FROM_EMAIL", "noreply@aagamshah.com")
+    to_email = "snaagam@gmail.com"
+    
+    # Create email content
+    subject = f"New Contact Form Submission: {contact.subject}"
+    
+    if not smtp_enabled():
+        logger.info(f"Email not sent - SMTP not configured. Would send: {subject}")
+        return
+    
+    html_body = f"""
+    <html>
+    <body>
+        <h2>New Contact Form Submission</h2>
+        <p><strong>Name:</strong> {contact.name}</p>
+        <p><strong>Email:</strong> {contact.email}</p>
+        <p><strong>Company:</strong> {contact.company or 'Not provided'}</p>
+        <p><strong>Phone:</strong> {contact.phone or 'Not provided'}</p>
+        <p><strong>Subject:</strong> {contact.subject}</p>
+        <p><strong>Message:</strong></p>
+        <p>{contact.message}</p>
+        <hr>
+        <p><small>Submitted at: {contact.submitted_at}</small></p>
+    </body>
+    </html>
+    """
+    
+    text_body = f"""
+    New Contact Form Submission
+    
+    Name: {contact.name}
+    Email: {contact.email}
+    Company: {contact.company or 'Not provided'}
+    Phone: {contact.phone or 'Not provided'}
+    Subject: {contact.subject}
+    
+    Message:
+    {contact.message}
+    
+    Submitted at: {contact.submitted_at}
+    """
+    
+    await email_outbox.enqueue(
+        submission_id=contact.id,
+        subject=subject,
+        from_email=from_email,
+        to_email=to_email,
+        text_body=text_body,
+        html_body=html_body,
+    )
+
+@router.get("/outbox/stats")
+async def get_outbox_stats():
+    """Get email outbox entry counts by delivery status"""
     try:
-        # Email configuration (in production, use proper email service like SendGrid)
-        smtp_server = os.getenv("SMTP_SERVER", "localhost")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        smtp_username = os.getenv("SMTP_USERNAME", "")
-        smtp_password = os.getenv("SMTP_PASSWORD", "")
-        from_email = os.getenv("FROM_EMAIL", "noreply@aagamshah.com")
-        to_email = "snaagam@gmail.com"
-        
-        # Create email content
-        subject = f"New Contact Form Submission: {contact.subject}"
-        
-        html_body = f"""
-        <html>
-        <body>
-            <h2>New Contact Form Submission</h2>
-            <p><strong>Name:</strong> {contact.name}</p>
-            <p><strong>Email:</strong> {contact.email}</p>
-            <p><strong>Company:</strong> {contact.company or 'Not provided'}</p>
-            <p><strong>Phone:</strong> {contact.phone or 'Not provided'}</p>
-            <p><strong>Subject:</strong> {contact.subject}</p>
-            <p><strong>Message:</strong></p>
-            <p>{contact.message}</p>
-            <hr>
-            <p><small>Submitted at: {contact.submitted_at}</small></p>
-        </body>
-        </html>
-        """
-        
-        text_body = f"""
-        New Contact Form Submission
-        
-        Name: {contact.name}
-        Email: {contact.email}
-        Company: {contact.company or 'Not provided'}
-        Phone: {contact.phone or 'Not provided'}
-        Subject: {contact.subject}
-        
-        Message:
-        {contact.message}
-        
-        Submitted at: {contact.submitted_at}
-        """
-        
-        # Create message
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = from_email
-        msg["To"] = to_email
-        
-        # Add text and HTML parts
-        text_part = MIMEText(text_body, "plain")
-        html_part = MIMEText(html_body, "html")
-        
-        msg.attach(text_part)
-        msg.attach(html_part)
-        
-        # Send email (only if SMTP is configured)
-        if smtp_username and smtp_password:
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-        else:
-            print(f"Email not sent - SMTP not configured. Would send: {subject}")
-            
+        return await email_outbox.stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching outbox stats: {str(e)}")
+
+@router.get("/ingest/stats")
+async def get_ingest_stats():
+    """Get group-commit batching counters for contact submissions"""
+    if submission_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **submission_batcher.stats()}
+
+@router.get("/admission/stats")
+async def get_admission_stats():
+    """Get rate-limit and load-shedding counters for contact submissions"""
+    stats = {"rate_limited": submission_limiter.limited, **submission_slots.stats()}
+    if isinstance(admission_store, MemoryAdmissionStore):
+        stats.update(admission_store.stats())
+    return stats
+
+def _utc(value: datetime) -> datetime:
+    # Stored timestamps are naive UTC
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/stats", response_model=ContactStats)
+async def get_contact_stats(
+    granularity: Literal["hour", "day"] = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    status: Optional[str] = None
+):
+    """Get submission counts per hour or day, by status and company presence.
+
+    Counts come from rollups maintained as submissions are written, so a
+    range costs the same however many submissions it covers. ``end``
+    defaults to now and ``start`` to 48 hours or 30 days before it; both are
+    UTC and widened to whole buckets.
+    """
+    width = BUCKET_WIDTHS[granularity]
+    try:
+        end = _utc(end) if end is not None else datetime.utcnow()
+        start = _utc(start) if start is not None else end - STATS_DEFAULT_BUCKETS[granularity] * width
+        first, last = bucket_range(granularity, start, end)
+    except OverflowError:
+        # Widening to whole buckets (or the default start) left the datetime range
+        raise HTTPException(status_code=400, detail="start and end must fall within supported dates")
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (last - first) / width > STATS_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400, detail=f"Range spans more than {STATS_MAX_BUCKETS} {granularity} buckets"
+        )
+
+    try:
+        return JSONBytesResponse(dumps(await submission_stats(storage.submissions, granularity, start, end, status)))
     except Exception as e:
-        print(f"Error sending email: {e}")
-        # Don't raise exception - we don't want email failures to break contact form
+        raise HTTPException(status_code=500, detail=f"Error fetching contact stats: {str(e)}")
 
 @router.get("/submissions", response_model=List[ContactSubmission])
-async def get_contact_submissions(limit: int = 50, skip: int = 0):
-    """Get contact form submissions (admin only in production)"""
+async def get_contact_submissions(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True)
+):
+    """Get contact form submissions (admin only in production).
+
+    Pass the ``X-Next-Cursor`` response header back as ``cursor`` to fetch the
+    next page; ``skip`` is only honoured when no cursor is given.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        skip = 0
+
     try:
-        cursor = db.contact_submissions.find().sort("submitted_at", -1).skip(skip).limit(limit)
-        submissions = await cursor.to_list(length=limit)
-        
-        return [ContactSubmission(**submission) for submission in submissions]
+        submissions = await storage.submissions.list(after=after, skip=skip, limit=limit, fields=SUBMISSION_FIELDS)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching contact submissions: {str(e)}")
 
+    token = next_cursor(submissions, "submitted_at", limit)
+    headers = {NEXT_CURSOR_HEADER: token} if token else None
+    return JSONBytesResponse(dumps(submissions), headers=headers)
+
+@router.get("/export")
+async def export_contact_submissions():
+    """Stream every contact submission as NDJSON"""
+    return StreamingResponse(
+        export_ndjson(storage.submissions.iter_all()),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="contact_submissions.ndjson"'},
+    )
+
+@router.post("/import")
+async def import_contact_submissions(request: Request):
+    """Bulk import contact submissions from an NDJSON request body"""
+    try:
+        return await import_ndjson(iter_lines(request.stream()), ContactSubmission, storage.submissions)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing contact submissions: {str(e)}")
+
 @router.get("/submissions/{submission_id}", response_model=ContactSubmission)
 async def get_contact_submission(submission_id: str):
     """Get a specific contact submission"""
     try:
-        submission = await db.contact_submissions.find_one({"id": submission_id})
+        submission = await storage.submissions.get(submission_id, SUBMISSION_FIELDS)
         if not submission:
             raise HTTPException(status_code=404, detail="Contact submission not found")
         
-        return ContactSubmission(**submission)
+        return JSONBytesResponse(dumps(submission))
     except HTTPException:
         raise
     except Exception as e:
@@ -137,12 +350,7 @@ async def get_contact_submission(submission_id: str):
 async def update_submission_status(submission_id: str, status: str):
     """Update the status of a contact submission"""
     try:
-        result = await db.contact_submissions.update_one(
-            {"id": submission_id},
-            {"$set": {"status": status}}
-        )
-        
-        if result.modified_count:
+        if await storage.submissions.set_status(submission_id, status):
             return {"message": "Status updated successfully"}
         else:
             raise HTTPException(status_code=404, detail="Contact submission not found")
@@ -1,46 +1,22 @@
-from fastapi import FastAPI, APIRouter
-from dotenv import load_dotenv
-from starlette.middleware.cors import CORSMiddleware
-import os
-import logging
-from pathlib import Path
-
-# Import route modules
-from routes import blog, contact
-from database import db, client
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-# Create the main app without a prefix
-app = FastAPI(title="Aagam Shah Portfolio API", version="1.0.0")
-
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
-
-# Basic health check route
-@api_router.get("/")
-async def root():
-    return {"message": "Aagam Shah Portfolio API", "version": "1.0.0", "status": "active"}
-
-@api_router.get("/health")
-async def health_check():
-    return {"status": "healthy", "database": "connected"}
+"""ASGI entry point.
 
-# Include route modules
-app.include_router(blog.router)
-app.include_router(contact.router)
+Run with ``uvicorn server:create_app --factory`` (``uvicorn server:app``
+still works). Importing this module is cheap: routers are imported when
+the app is built, and storage is only opened by the lifespan.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
 
-# Include the basic API router
-app.include_router(api_router)
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse, Response
+from starlette.middleware.cors import CORSMiddleware
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Loads .env before any route module reads its settings
+from database import storage
+from services.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, registry
+from services.pagination import NEXT_CURSOR_HEADER
 
 # Configure logging
 logging.basicConfig(
@@ -49,28 +25,111 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
-async def startup_db_client():
-    """Initialize database connection and create indexes"""
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open storage, bring derived state up to date, and close it all on shutdown"""
+    from routes import blog, contact
+    from services.outbox import smtp_enabled
+    from services.tag_stats import rebuild_tag_stats
+
     try:
         # Test database connection
-        await db.command("ping")
+        await storage.ping()
         logger.info("Database connection established")
-        
-        # Create indexes for better performance
-        await db.blog_posts.create_index([("id", 1)], unique=True)
-        await db.blog_posts.create_index([("publish_date", -1)])
-        await db.blog_posts.create_index([("tags", 1)])
-        await db.blog_posts.create_index([("is_published", 1)])
-        
-        await db.contact_submissions.create_index([("id", 1)], unique=True)
-        await db.contact_submissions.create_index([("submitted_at", -1)])
-        
-        logger.info("Database indexes created")
-        
+
+        # Index and data migrations run once per database and are skipped afterwards
+        applied = await storage.migrate()
+        if applied:
+            logger.info(f"Applied schema migrations {applied}")
+
+        # Materialize tag counts on first boot against an existing collection
+        if not await storage.posts.tag_counts():
+            await rebuild_tag_stats(storage.posts)
+
+        await blog.build_post_indexes()
+        logger.info(f"Search and related-posts indexes built with {len(blog.search_index)} posts")
+
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if smtp_enabled():
+        contact.email_outbox.start()
+        logger.info("Email outbox workers started")
+
+    try:
+        yield
+    finally:
+        if contact.submission_batcher is not None:
+            await contact.submission_batcher.close()
+        await contact.email_outbox.stop()
+        await blog.post_watcher.stop()
+        storage.close()
+
+def create_app() -> FastAPI:
+    """Build the application; route modules are imported here, not at module import"""
+    from routes import blog, contact
+    from services.snapshots import SnapshotMiddleware
+
+    # Create the main app without a prefix
+    app = FastAPI(title="Aagam Shah Portfolio API", version="1.0.0", lifespan=lifespan)
+
+    # Create a router with the /api prefix
+    api_router = APIRouter(prefix="/api")
+
+    # Basic health check route
+    @api_router.get("/")
+    async def root():
+        return {"message": "Aagam Shah Portfolio API", "version": "1.0.0", "status": "active"}
+
+    @api_router.get("/health")
+    async def health_check():
+        """Report whether the database answers a ping within HEALTH_CHECK_TIMEOUT_SECONDS"""
+        try:
+            await asyncio.wait_for(storage.ping(), timeout=HEALTH_TIMEOUT)
+        except Exception as e:
+            detail = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unhealthy", "database": "unreachable", "error": detail},
+            )
+        return {"status": "healthy", "database": "connected"}
+
+    @api_router.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Request and database metrics in Prometheus text format"""
+        return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    # Include route modules
+    app.include_router(blog.router)
+    app.include_router(contact.router)
+
+    # Include the basic API router
+    app.include_router(api_router)
+
+    # Inside CORS, so snapshot responses carry the same CORS headers
+    if blog.snapshot_store is not None:
+        app.add_middleware(SnapshotMiddleware, store=blog.snapshot_store)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
+    )
+
+    # Outermost, so latency covers CORS and every other middleware
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    return app
+
+def __getattr__(name):
+    # ``server:app`` builds the app on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional, Tuple
+
+from storage.base import AdmissionRepository
+
+
+class Overloaded(Exception):
+    """Every admission slot is taken; the caller should retry later"""
+
+
+class MemoryAdmissionStore(AdmissionRepository):
+    """Per-process buckets and idempotency keys in bounded LRU maps.
+
+    At most ``max_keys`` of each are kept; the least recently used is
+    evicted first. An evicted bucket starts over full, so the bound trades
+    a little leniency towards clients nobody has seen in a while for a
+    fixed memory ceiling. With several workers each keeps its own counts.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._idempotency: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+
+    def _remember(self, entries: OrderedDict, key: str, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_keys:
+            entries.popitem(last=False)
+
+    async def take_tokens(self, keys, rate, burst, now):
+        levels = {}
+        for key in keys:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            levels[key] = min(burst, tokens + (now - updated) * rate)
+        wait = max(((1 - tokens) / rate for tokens in levels.values() if tokens < 1), default=0.0)
+        for key, tokens in levels.items():
+            self._remember(self._buckets, key, (tokens if wait else tokens - 1, now))
+        return wait
+
+    async def reserve_idempotency_key(self, key, submission_id, fingerprint, now, ttl):
+        existing = self._idempotency.get(key)
+        if existing is not None and existing[2] > now:
+            self._idempotency.move_to_end(key)
+            return existing[0], existing[1]
+        self._remember(self._idempotency, key, (submission_id, fingerprint, now + ttl))
+        return None
+
+    async def release_idempotency_key(self, key, submission_id):
+        existing = self._idempotency.get(key)
+        if existing is not None and existing[0] == submission_id:
+            del self._idempotency[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"buckets": len(self._buckets), "idempotency_keys": len(self._idempotency)}
+
+
+class RateLimiter:
+    """Token buckets refilled at ``per_minute`` and holding up to ``burst`` tokens"""
+
+    def __init__(self, store: AdmissionRepository, per_minute: float, burst: int):
+        self.store = store
+        self.rate = per_minute / 60
+        self.burst = max(1, burst)
+        self.limited = 0
+
+    async def check(self, *keys: str) -> float:
+        """Spend a token from every key's bucket; seconds to wait if any is empty, else 0.0.
+
+        A rejected request spends nothing, so a client limited by one key
+        doesn't drain its other buckets by retrying.
+        """
+        if self.rate <= 0:
+            return 0.0
+        wait = await self.store.take_tokens(keys, self.rate, self.burst, time.time())
+        if wait:
+            self.limited += 1
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Shed work beyond ``limit`` concurrent holders instead of queueing it"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.shed = 0
+
+    @contextmanager
+    def slot(self):
+        if self.limit > 0 and self.active >= self.limit:
+            self.shed += 1
+            raise Overloaded(f"{self.active} requests already in progress")
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "limit": self.limit, "shed": self.shed}
+
+
+def client_address(scope_client: Optional[Tuple[str, int]], headers: Optional[Mapping[str, str]] = None,
+                   trusted_header: Optional[str] = None) -> str:
+    """Rate-limit identity for a connection.
+
+    Behind a proxy, every client shares the proxy's address. Name the
+    header the proxy sets as ``trusted_header`` (say ``X-Forwarded-For``)
+    to use the last address in it, the one the proxy saw; only do so when
+    every request passes through that proxy, since clients can send the
+    header themselves.
+    """
+    if trusted_header and headers is not None:
+        forwarded = headers.get(trusted_header)
+        if forwarded and forwarded.split(",")[-1].strip():
+            return forwarded.split(",")[-1].strip()
+    return scope_client[0] if scope_client else "unknown"
@@ -0,0 +1,115 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from storage.base import ContactSubmissionRepository
+
+
+class QueueFull(Exception):
+    """The ingestion queue is at capacity; the caller should retry later"""
+
+
+class WriteRejected(Exception):
+    """The database rejected this document within an otherwise committed batch"""
+
+
+class GroupCommitter:
+    """Coalesce concurrent single-document inserts into ``insert_many`` batches.
+
+    ``submit`` queues a document and waits until the batch containing it has
+    been acknowledged, so a caller only sees success once its document is as
+    durable as a plain ``insert`` would have made it.
+
+    When nothing is being written a document is flushed immediately, so an
+    idle system pays no extra latency. While a batch is in flight, new
+    documents accumulate and are flushed when it completes, when
+    ``max_batch`` is reached, or ``max_delay`` seconds after the first one
+    arrived. Batch size therefore grows with load and database latency. At
+    most ``max_inflight`` batches are written concurrently, and
+    ``max_queue`` bounds the documents held in memory; beyond it ``submit``
+    raises QueueFull.
+    """
+
+    def __init__(self, repository: ContactSubmissionRepository, max_batch: int = 64, max_delay: float = 0.005,
+                 max_queue: int = 10000, max_inflight: int = 4):
+        self.repository = repository
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._queued = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._commits = set()
+        self.batches = 0
+        self.documents = 0
+        self.rejected = 0
+
+    async def submit(self, doc: dict) -> None:
+        """Insert ``doc`` as part of the next batch; raises once it is known to have failed"""
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(f"{self._queued} documents already waiting to be written")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((doc, future))
+        self._queued += 1
+        if len(self._pending) >= self.max_batch or not self._commits:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.create_task(self._commit(batch))
+            self._commits.add(task)
+            task.add_done_callback(self._committed)
+
+    def _committed(self, task: asyncio.Task):
+        self._commits.discard(task)
+        # Whatever queued up behind this batch goes out now
+        if self._pending:
+            self._flush()
+
+    async def _commit(self, batch: List[Tuple[dict, asyncio.Future]]):
+        async with self._slots:
+            try:
+                _, errors = await self.repository.insert_many([doc for doc, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            finally:
+                self._queued -= len(batch)
+
+        self.batches += 1
+        self.documents += len(batch)
+        failed = dict(errors)
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                # The caller went away (cancelled request); its document was still written
+                continue
+            if index in failed:
+                future.set_exception(WriteRejected(failed[index]))
+            else:
+                future.set_result(None)
+
+    async def close(self):
+        """Write everything still queued and wait for in-flight batches"""
+        self._flush()
+        if self._commits:
+            await asyncio.gather(*self._commits, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queued,
+            "batches": self.batches,
+            "documents": self.documents,
+            "avg_batch_size": round(self.documents / self.batches, 1) if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Type
+
+from pydantic import BaseModel, ValidationError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Per-record errors kept in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def export_ndjson(docs: AsyncIterator[dict], chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Stream documents as NDJSON in roughly ``chunk_size`` byte chunks"""
+    buffer = []
+    size = 0
+    async for doc in docs:
+        line = json.dumps(doc, default=_json_default, separators=(",", ":")).encode() + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a stream of byte chunks into lines without buffering the whole body"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def dict(self) -> dict:
+        return {"inserted": self.inserted, "failed": self.failed, "errors": self.errors}
+
+
+async def _flush(repository, batch: list, report: ImportReport):
+    inserted, errors = await repository.insert_many([doc for _, doc in batch])
+    report.inserted += inserted
+    for index, message in errors:
+        report.error(batch[index][0], message)
+    batch.clear()
+
+
+async def import_ndjson(lines: AsyncIterator[bytes], model: Type[BaseModel], repository,
+                        batch_size: int = 1000) -> dict:
+    """Validate NDJSON records against ``model`` and insert them in unordered batches.
+
+    Memory is bounded by ``batch_size``; invalid or rejected records are
+    reported by line number and don't stop the import.
+    """
+    report = ImportReport()
+    batch = []
+    line_number = 0
+    async for raw in lines:
+        line_number += 1
+        if not raw.strip():
+            continue
+        try:
+            record = model(**json.loads(raw))
+        except ValidationError as e:
+            report.error(line_number, "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        except (ValueError, TypeError) as e:
+            report.error(line_number, str(e))
+            continue
+        batch.append((line_number, record.dict()))
+        if len(batch) >= batch_size:
+            await _flush(repository, batch, report)
+    if batch:
+        await _flush(repository, batch, report)
+    return report.dict()
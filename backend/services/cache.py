@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class ReadCache:
+    """Bounded in-process read-through cache with LRU + TTL eviction.
+
+    Keys are tuples so related entries can be dropped together with
+    ``invalidate_prefix``. Concurrent misses on the same key share a single
+    loader call (single-flight). The cache is per process, so with several
+    workers the TTL bounds how stale another worker's copy can get.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_load(self, key: Tuple[Hashable, ...], loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # An invalidation during the load detaches the future; don't store stale data
+            if self._inflight.get(key) is future:
+                self._store(key, value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _store(self, key: Tuple, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Tuple) -> None:
+        """Drop a single key"""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+        self._inflight.pop(key, None)
+
+    def invalidate_prefix(self, prefix: Tuple) -> None:
+        """Drop every key starting with ``prefix``"""
+        size = len(prefix)
+        for key in [k for k in self._entries if k[:size] == prefix]:
+            del self._entries[key]
+            self.invalidations += 1
+        for key in [k for k in self._inflight if k[:size] == prefix]:
+            del self._inflight[key]
+
+    def clear(self) -> None:
+        """Drop everything"""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
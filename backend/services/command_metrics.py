@@ -0,0 +1,44 @@
+import logging
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from services.metrics import MetricsRegistry, current_request
+
+slow_query_logger = logging.getLogger("metrics.slow_query")
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Feed MongoDB command timings into the registry and the slow-query log"""
+
+    def __init__(self, registry: MetricsRegistry, slow_query_ms: float = 100.0):
+        self.registry = registry
+        self.slow_query_seconds = slow_query_ms / 1000 if slow_query_ms > 0 else None
+        # Started commands, kept only to describe slow ones
+        self._pending: Dict[Tuple, dict] = {}
+
+    def started(self, event):
+        if self.slow_query_seconds is not None:
+            self._pending[(event.connection_id, event.request_id)] = event.command
+
+    def _finish(self, event, failed: bool):
+        seconds = event.duration_micros / 1_000_000
+        self.registry.observe_command(event.command_name, seconds, failed)
+        if self.slow_query_seconds is None:
+            return
+        command = self._pending.pop((event.connection_id, event.request_id), None)
+        if seconds >= self.slow_query_seconds:
+            with self.registry._db_lock:
+                self.registry.slow_queries += 1
+            ctx = current_request.get()
+            slow_query_logger.warning(
+                "Slow MongoDB %s on %s took %.1f ms (request %s): %.500s",
+                event.command_name, event.database_name, seconds * 1000,
+                ctx.path if ctx else "-", command,
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
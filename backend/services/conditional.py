@@ -0,0 +1,96 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Mapping, Optional
+
+from fastapi.responses import Response
+
+
+def post_etag(post: Mapping) -> str:
+    """Strong ETag for a post as stored; needs its id, version and updated_at.
+
+    Versions restart at 1 when a post is deleted and created again under
+    the same id, so the tag also hashes the id and the update time, at the
+    millisecond precision both backends store.
+    """
+    updated_at = post.get("updated_at")
+    stamp = updated_at.isoformat(timespec="milliseconds") if updated_at is not None else ""
+    digest = hashlib.blake2b(f"{post['id']}|{post['version']}|{stamp}".encode(), digest_size=8).hexdigest()
+    return f'"{post["version"]}-{digest}"'
+
+
+def parse_if_match(header: str) -> Optional[List[str]]:
+    """Entity tags an ``If-Match`` header accepts; None for ``*`` (any current representation).
+
+    If-Match uses the strong comparison, so weak tags could never match;
+    they are rejected like anything malformed, with a ValueError whose
+    message is safe to return to the client.
+    """
+    value = header.strip()
+    if value == "*":
+        return None
+    tags = []
+    for candidate in value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            raise ValueError("If-Match requires strong entity tags")
+        if len(candidate) < 2 or candidate[0] != '"' or candidate[-1] != '"' or '"' in candidate[1:-1]:
+            raise ValueError("Malformed If-Match header")
+        tags.append(candidate)
+    return tags
+
+
+def collection_etag(version_tag: str) -> str:
+    """Strong ETag for list, tag and related reads served at a storage change version.
+
+    Every worker synced to the same version issues the same tag, so any of
+    them can answer a revalidation. No Last-Modified goes with it: workers
+    learn of a write at different moments, and none of those is a time they
+    would all agree on.
+    """
+    return f'"c{version_tag}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the request's validators still match the current representation"""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since is ignored whenever If-None-Match is present
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    """Validator headers for a 200 or 304; caches must revalidate before reuse"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
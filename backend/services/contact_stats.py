@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from storage.base import ROLLUP_GRANULARITIES, ContactSubmissionRepository, rollup_bucket
+
+BUCKET_WIDTHS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def bucket_range(granularity: str, start: datetime, end: datetime) -> tuple:
+    """``[start, end)`` widened to whole buckets"""
+    aligned_end = rollup_bucket(end, granularity)
+    if aligned_end < end:
+        aligned_end += BUCKET_WIDTHS[granularity]
+    return rollup_bucket(start, granularity), aligned_end
+
+
+def _counts() -> dict:
+    return {"submissions": 0, "with_company": 0, "by_status": {}}
+
+
+async def submission_stats(submissions: ContactSubmissionRepository, granularity: str, start: datetime,
+                           end: datetime, status: Optional[str] = None) -> dict:
+    """Submission counts per bucket over ``[start, end)``, read from the rollups.
+
+    Every bucket in the range is listed, empty ones included, so the cost
+    depends on the number of buckets and never on the number of submissions.
+    """
+    start, end = bucket_range(granularity, start, end)
+    width = BUCKET_WIDTHS[granularity]
+    buckets = {}
+    bucket = start
+    while bucket < end:
+        buckets[bucket] = dict(_counts(), start=bucket)
+        bucket += width
+
+    totals = _counts()
+    for row in await submissions.rollups(granularity, start, end):
+        if status is not None and row["status"] != status:
+            continue
+        for counts in (buckets[row["bucket"]], totals):
+            counts["submissions"] += row["count"]
+            if row["has_company"]:
+                counts["with_company"] += row["count"]
+            counts["by_status"][row["status"]] = counts["by_status"].get(row["status"], 0) + row["count"]
+
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "buckets": list(buckets.values()),
+    }
+
+
+async def rebuild_rollups(submissions: ContactSubmissionRepository, verify_only: bool = False,
+                          sample_size: int = 20) -> dict:
+    """Recompute the rollups from the submissions and report (and fix) any drift"""
+    expected = await submissions.compute_rollups()
+    actual = {}
+    for granularity in ROLLUP_GRANULARITIES:
+        for row in await submissions.rollups(granularity, datetime.min, datetime.max):
+            actual[(granularity, row["bucket"], row["status"], row["has_company"])] = row["count"]
+
+    drift = [
+        {
+            "granularity": key[0], "bucket": key[1].isoformat(), "status": key[2], "has_company": key[3],
+            "expected": expected.get(key, 0), "actual": actual.get(key, 0),
+        }
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+    if drift and not verify_only:
+        await submissions.replace_rollups(expected)
+
+    return {
+        "counters": len(expected),
+        "submissions": sum(count for key, count in expected.items() if key[0] == ROLLUP_GRANULARITIES[0]),
+        "drift": len(drift),
+        "sample": drift[:sample_size],
+        "repaired": bool(drift) and not verify_only,
+    }
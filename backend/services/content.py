@@ -0,0 +1,65 @@
+import math
+import re
+
+from services.search import strip_html
+
+WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+
+# Whitespace inside these elements is significant, so they are copied verbatim
+PRESERVE_RE = re.compile(r"<(pre|textarea|script|style)\b.*?</\1\s*>", re.S | re.I)
+COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.S)
+SPACE_RE = re.compile(r"\s+")
+# Whitespace next to block-level tags never renders
+BLOCK_TAG_RE = re.compile(
+    r"\s*(</?(?:address|article|aside|blockquote|br|dd|div|dl|dt|figcaption|figure|footer|h[1-6]|header|hr"
+    r"|li|main|nav|ol|p|section|table|tbody|td|tfoot|th|thead|tr|ul)\b[^>]*>)\s*",
+    re.I,
+)
+
+
+def _minify_fragment(markup: str) -> str:
+    markup = COMMENT_RE.sub("", markup)
+    markup = SPACE_RE.sub(" ", markup)
+    return BLOCK_TAG_RE.sub(r"\1", markup)
+
+
+def minify_html(markup: str) -> str:
+    """Collapse insignificant whitespace and comments, leaving <pre> and friends intact"""
+    parts = []
+    pos = 0
+    for match in PRESERVE_RE.finditer(markup):
+        parts.append(_minify_fragment(markup[pos:match.start()]))
+        parts.append(match.group(0))
+        pos = match.end()
+    parts.append(_minify_fragment(markup[pos:]))
+    return "".join(parts).strip()
+
+
+def read_time(word_count: int) -> str:
+    return f"{max(1, math.ceil(word_count / WORDS_PER_MINUTE))} min read"
+
+
+def excerpt_from(text: str, length: int = EXCERPT_LENGTH) -> str:
+    """Opening of ``text`` cut at a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(" ", 1)[0]
+    return cut.rstrip(",.;:") + "…"
+
+
+def derive_content(content: str) -> dict:
+    """Stored fields derived from a post body at write time.
+
+    ``plain_text`` is kept next to the post for excerpts and the search
+    index; it is not part of any response model.
+    """
+    content = minify_html(content)
+    text = strip_html(content)
+    word_count = len(text.split())
+    return {
+        "content": content,
+        "plain_text": text,
+        "word_count": word_count,
+        "read_time": read_time(word_count),
+    }
@@ -0,0 +1,209 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        # Counts are per bucket; they are accumulated only when rendering
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> Iterable[str]:
+        sep = "," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.total}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class RouteStats:
+    __slots__ = ("latency", "size", "statuses", "db_commands", "db_seconds")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.statuses: Dict[int, int] = {}
+        self.db_commands = 0
+        self.db_seconds = 0.0
+
+
+class RequestContext:
+    """Database work attributed to the request currently being served"""
+    __slots__ = ("db_commands", "db_seconds", "path")
+
+    def __init__(self, path: str):
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self.path = path
+
+
+# Motor copies the caller's context into its executor threads, so command
+# events raised there still see the request that issued them
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Process-wide request and database metrics"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        self.db_latency: Dict[str, Histogram] = {}
+        self.db_failures: Dict[str, int] = {}
+        self.slow_queries = 0
+        # Command events arrive from driver threads
+        self._db_lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, size: int, ctx: RequestContext):
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats()
+        stats.latency.observe(seconds)
+        stats.size.observe(size)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.db_commands += ctx.db_commands
+        stats.db_seconds += ctx.db_seconds
+
+    def observe_command(self, command: str, seconds: float, failed: bool = False):
+        with self._db_lock:
+            histogram = self.db_latency.get(command)
+            if histogram is None:
+                histogram = self.db_latency[command] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            if failed:
+                self.db_failures[command] = self.db_failures.get(command, 0) + 1
+        ctx = current_request.get()
+        if ctx is not None:
+            ctx.db_commands += 1
+            ctx.db_seconds += seconds
+
+    def render(self) -> str:
+        """Prometheus text exposition of everything recorded so far"""
+        lines: List[str] = []
+        routes = sorted(self.routes.items())
+
+        lines.append("# HELP http_requests_in_flight Requests currently being served")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        lines.append("# HELP http_requests_total Requests served by route and status")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}'
+                )
+
+        lines.append("# HELP http_request_duration_seconds Request latency by route")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), stats in routes:
+            lines.extend(stats.latency.render("http_request_duration_seconds", f'method="{method}",route="{_escape(route)}"'))
+
+        lines.append("# HELP http_response_size_bytes Response body size by route")
+        lines.append("# TYPE http_response_size_bytes histogram")
+        for (method, route), stats in routes:
+            lines.extend(stats.size.render("http_response_size_bytes", f'method="{method}",route="{_escape(route)}"'))
+
+        lines.append("# HELP http_request_db_commands_total Database commands issued while serving a route")
+        lines.append("# TYPE http_request_db_commands_total counter")
+        for (method, route), stats in routes:
+            lines.append(f'http_request_db_commands_total{{method="{method}",route="{_escape(route)}"}} {stats.db_commands}')
+
+        lines.append("# HELP http_request_db_seconds_total Database time spent while serving a route")
+        lines.append("# TYPE http_request_db_seconds_total counter")
+        for (method, route), stats in routes:
+            lines.append(f'http_request_db_seconds_total{{method="{method}",route="{_escape(route)}"}} {stats.db_seconds}')
+
+        with self._db_lock:
+            db_latency = sorted(self.db_latency.items())
+            db_failures = sorted(self.db_failures.items())
+            slow_queries = self.slow_queries
+
+        lines.append("# HELP mongodb_command_duration_seconds MongoDB command latency by command name")
+        lines.append("# TYPE mongodb_command_duration_seconds histogram")
+        for command, histogram in db_latency:
+            lines.extend(histogram.render("mongodb_command_duration_seconds", f'command="{_escape(command)}"'))
+
+        lines.append("# HELP mongodb_command_failures_total Failed MongoDB commands by command name")
+        lines.append("# TYPE mongodb_command_failures_total counter")
+        for command, count in db_failures:
+            lines.append(f'mongodb_command_failures_total{{command="{_escape(command)}"}} {count}')
+
+        lines.append("# HELP mongodb_slow_commands_total Commands slower than SLOW_QUERY_MS")
+        lines.append("# TYPE mongodb_slow_commands_total counter")
+        lines.append(f"mongodb_slow_commands_total {slow_queries}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and size per route.
+
+    Routes are labelled by their path template (``/api/blog/posts/{post_id}``)
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        ctx = RequestContext(scope["path"])
+        token = current_request.set(ctx)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.in_flight -= 1
+            current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            registry.observe_request(scope["method"], path, status, elapsed, size, ctx)
+
+
+# Shared by the Mongo client's command listener and the ASGI middleware
+registry = MetricsRegistry()
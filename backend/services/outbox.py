@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import random
+import smtplib
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, List, Optional
+
+from storage.base import EmailOutboxRepository
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+DEAD = "dead"
+
+
+def smtp_enabled() -> bool:
+    """Delivery runs when credentials are set, or explicitly for unauthenticated relays"""
+    if os.getenv("SMTP_ENABLED", "").lower() in ("1", "true", "yes"):
+        return True
+    return bool(os.getenv("SMTP_USERNAME") and os.getenv("SMTP_PASSWORD"))
+
+
+class SmtpTransport:
+    """A single reusable SMTP connection; not thread safe, one per worker"""
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 use_tls: bool = True, timeout: float = 30.0, max_idle: float = 60.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SmtpTransport":
+        return cls(
+            host=os.getenv("SMTP_SERVER", "localhost"),
+            port=int(os.getenv("SMTP_PORT", "587")),
+            username=os.getenv("SMTP_USERNAME", ""),
+            password=os.getenv("SMTP_PASSWORD", ""),
+            use_tls=os.getenv("SMTP_USE_TLS", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > self.max_idle:
+            # Servers drop idle sessions; probe before reusing a quiet connection
+            try:
+                self._server.noop()
+            except smtplib.SMTPException:
+                self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send_batch(self, messages: List[MIMEMultipart]) -> List[Optional[Exception]]:
+        """Send messages over the shared connection; returns one error (or None) per message"""
+        results: List[Optional[Exception]] = []
+        for msg in messages:
+            try:
+                try:
+                    self._connection().send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    self.close()
+                    self._connection().send_message(msg)
+                results.append(None)
+            except Exception as e:
+                if not isinstance(e, smtplib.SMTPResponseException):
+                    self.close()
+                results.append(e)
+            self._last_used = time.monotonic()
+        return results
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+def build_message(entry: dict) -> MIMEMultipart:
+    """Render an outbox entry as a MIME message"""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = entry["subject"]
+    msg["From"] = entry["from_email"]
+    msg["To"] = entry["to_email"]
+    msg.attach(MIMEText(entry["text_body"], "plain"))
+    msg.attach(MIMEText(entry["html_body"], "html"))
+    return msg
+
+
+class EmailOutbox:
+    """Durable email queue drained by a pool of background workers.
+
+    Entries are claimed atomically with a lease, so several workers (and
+    several processes) can share one queue. Failed sends are retried
+    with exponential backoff and parked as ``dead`` after ``max_attempts``.
+    """
+
+    def __init__(self, repository: EmailOutboxRepository, transport_factory: Callable[[], SmtpTransport] = SmtpTransport.from_env,
+                 workers: int = 2, batch_size: int = 20, max_attempts: int = 8,
+                 backoff_base: float = 5.0, backoff_max: float = 3600.0,
+                 lease_seconds: float = 300.0, poll_interval: float = 5.0):
+        self.repository = repository
+        self.transport_factory = transport_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def enqueue(self, submission_id: str, subject: str, from_email: str, to_email: str,
+                      text_body: str, html_body: str) -> dict:
+        """Persist a message for delivery and wake a worker"""
+        now = datetime.utcnow()
+        entry = {
+            "id": str(uuid.uuid4()),
+            "submission_id": submission_id,
+            "subject": subject,
+            "from_email": from_email,
+            "to_email": to_email,
+            "text_body": text_body,
+            "html_body": html_body,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.repository.insert(entry)
+        self._wakeup.set()
+        return entry
+
+    def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.repository.claim(now, now + timedelta(seconds=self.lease_seconds))
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _record(self, entry: dict, error: Optional[Exception]):
+        now = datetime.utcnow()
+        attempts = entry["attempts"] + 1
+        update = {"attempts": attempts, "updated_at": now, "locked_until": None}
+        if error is None:
+            update.update(status=SENT, sent_at=now, last_error=None)
+        elif attempts >= self.max_attempts:
+            update.update(status=DEAD, last_error=str(error))
+            logger.error(f"Email {entry['id']} dead-lettered after {attempts} attempts: {error}")
+        else:
+            update.update(
+                status=PENDING,
+                last_error=str(error),
+                next_attempt_at=now + timedelta(seconds=self._backoff(attempts)),
+            )
+            logger.warning(f"Email {entry['id']} attempt {attempts} failed: {error}")
+        await self.repository.update(entry["id"], update)
+
+    async def _run(self):
+        transport = self.transport_factory()
+        try:
+            while not self._stopping:
+                try:
+                    await self._drain_once(transport)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Email outbox worker error: {e}")
+                    await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await asyncio.to_thread(transport.close)
+
+    async def _drain_once(self, transport: SmtpTransport):
+        # Clear before claiming so an enqueue racing with an empty claim still wakes us
+        self._wakeup.clear()
+        batch = []
+        while len(batch) < self.batch_size:
+            entry = await self._claim()
+            if entry is None:
+                break
+            batch.append(entry)
+
+        if not batch:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        messages = [build_message(entry) for entry in batch]
+        try:
+            # smtplib blocks, so the shared connection is driven from a worker thread
+            errors = await asyncio.to_thread(transport.send_batch, messages)
+        except Exception as e:
+            errors = [e] * len(batch)
+        for entry, error in zip(batch, errors):
+            await self._record(entry, error)
+
+    async def stats(self) -> dict:
+        return await self.repository.status_counts()
@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Response header carrying the opaque token for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: datetime, doc_id: str) -> str:
+    """Encode the last ``(sort_value, id)`` of a page as an opaque token"""
+    payload = json.dumps([sort_value.isoformat(), doc_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a token produced by ``encode_cursor``; raises ValueError if malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), str(doc_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def next_cursor(docs: list, field: str, limit: int) -> Optional[str]:
+    """Cursor for the page after ``docs``, or None when this was the last page"""
+    if limit <= 0 or len(docs) < limit:
+        return None
+    last = docs[-1]
+    return encode_cursor(last[field], last["id"])
@@ -0,0 +1,55 @@
+import gzip
+from typing import Dict, Optional, Sequence
+
+from services.serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+# Preferred first when the client weighs encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def encode_variants(body: bytes) -> Dict[str, bytes]:
+    """Every stored encoding of ``body``, compressed once at maximum effort"""
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+    return variants
+
+
+def build_payload(post: dict, fields: Sequence[str]) -> dict:
+    """Serialized and pre-compressed response body for ``post``"""
+    body = dumps({name: post[name] for name in fields if name in post})
+    return {
+        "id": post["id"],
+        "version": post["version"],
+        "updated_at": post["updated_at"],
+        **encode_variants(body),
+    }
+
+
+def negotiate(accept_encoding: Optional[str], available: Sequence[str]) -> str:
+    """Best of ``available`` for an Accept-Encoding header, else ``identity``"""
+    if not accept_encoding:
+        return "identity"
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = q
+
+    best, best_q = "identity", 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
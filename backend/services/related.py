@@ -0,0 +1,272 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.search import strip_html, tokenize
+
+# Fields of a neighbour returned with its score
+SUMMARY_FIELDS = ("id", "title", "excerpt", "tags", "read_time", "image", "publish_date")
+
+
+class RelatedIndex:
+    """Precomputed top-k related posts over published posts.
+
+    Two posts score ``tag_weight * jaccard(tags) + text_weight *
+    cosine(tf-idf)``, with TF-IDF over title, excerpt and text (or term
+    counts handed in, such as the search index's). ``rebuild``
+    fixes the vocabulary (terms in at least two posts, the
+    ``max_features`` most common) and idf weights, then scores every pair
+    in row batches of ``batch_size`` with NumPy. After that a changed post
+    costs one matrix-vector product against the corpus, and only the rows
+    that listed it are rescored; rows it now outranks just insert it.
+    Like the search index's average length, the idf snapshot is refreshed
+    by a full rebuild once the number of posts drifts by ``max_drift``.
+    Terms first shared by two posts after a rebuild don't count towards
+    text similarity until the next one, so a rebuild also runs once such
+    terms number more than ``max_drift`` of the vocabulary; a burst of
+    posts on a new topic is then matched on its own words. Lookups return
+    the stored neighbours.
+    """
+
+    def __init__(self, k: int = 10, tag_weight: float = 0.4, text_weight: float = 0.6,
+                 max_features: int = 4096, batch_size: int = 256, max_drift: float = 0.1):
+        self.k = k
+        self.tag_weight = tag_weight
+        self.text_weight = text_weight
+        self.max_features = max_features
+        self.batch_size = batch_size
+        self.max_drift = max_drift
+        self.clear()
+
+    def __len__(self):
+        return len(self._features)
+
+    def clear(self):
+        self._features: Dict[str, Tuple[Counter, frozenset]] = {}
+        self._docs: Dict[str, dict] = {}
+        self._neighbours: Dict[str, List[Tuple[str, float]]] = {}
+        # Which posts list a post among their neighbours
+        self._referrers: Dict[str, Set[str]] = {}
+        self._vocabulary: Dict[str, int] = {}
+        # Posts containing each term, and terms in two or more posts missing from the vocabulary
+        self._doc_freq: Counter = Counter()
+        self._unindexed: Set[str] = set()
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._tag_columns: Dict[str, int] = {}
+        self._snapshot_size = 0
+        # Row storage, grown by doubling and compacted on removal
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._text = np.zeros((0, 0), dtype=np.float32)
+        self._tags = np.zeros((0, 0), dtype=np.float32)
+        # Score a newcomer must beat to enter each row's list
+        self._floor = np.zeros(0, dtype=np.float32)
+
+    def ingest(self, post: dict, terms: Optional[Counter] = None):
+        """Load a post's features without scoring it; call ``rebuild`` afterwards"""
+        if not post.get("is_published"):
+            return
+        if terms is None:
+            text = post.get("plain_text") or strip_html(post.get("content", ""))
+            terms = Counter(tokenize(" ".join((post.get("title", ""), post.get("excerpt", ""), text))))
+        self._forget_terms(post["id"])
+        self._doc_freq.update(terms.keys())
+        for term in terms:
+            if self._doc_freq[term] == 2 and term not in self._vocabulary:
+                self._unindexed.add(term)
+        self._features[post["id"]] = (terms, frozenset(post.get("tags") or []))
+        self._docs[post["id"]] = {name: post.get(name) for name in SUMMARY_FIELDS}
+
+    def _forget_terms(self, post_id: str):
+        if post_id not in self._features:
+            return
+        terms = self._features[post_id][0]
+        self._doc_freq.subtract(terms.keys())
+        for term in terms:
+            if self._doc_freq[term] < 2:
+                self._unindexed.discard(term)
+                if self._doc_freq[term] <= 0:
+                    del self._doc_freq[term]
+
+    async def build(self, cursor):
+        """Replace the index with the posts from an async cursor"""
+        self.clear()
+        async for post in cursor:
+            self.ingest(post)
+        self.rebuild()
+
+    def rebuild(self):
+        """Refit the vocabulary and idf weights and rescore every post"""
+        ids = list(self._features)
+        n = len(ids)
+        doc_freq = self._doc_freq
+        # A term in a single post adds nothing to any pair's similarity
+        common = [term for term, df in doc_freq.most_common(self.max_features) if df > 1]
+        self._vocabulary = {term: column for column, term in enumerate(common)}
+        self._unindexed = set()
+        self._idf = np.array([math.log((1 + n) / (1 + doc_freq[term])) + 1 for term in common], dtype=np.float32)
+        tags = sorted({tag for _, post_tags in self._features.values() for tag in post_tags})
+        self._tag_columns = {tag: column for column, tag in enumerate(tags)}
+
+        capacity = max(16, n)
+        self._ids = ids
+        self._rows = {post_id: row for row, post_id in enumerate(ids)}
+        self._text = np.zeros((capacity, len(common)), dtype=np.float32)
+        self._tags = np.zeros((capacity, max(1, len(tags))), dtype=np.float32)
+        self._floor = np.zeros(capacity, dtype=np.float32)
+        for row, post_id in enumerate(ids):
+            self._fill_row(row, post_id)
+
+        self._neighbours = {}
+        self._referrers = {}
+        self._snapshot_size = n
+        self._rescore(ids)
+
+    def _fill_row(self, row: int, post_id: str):
+        terms, post_tags = self._features[post_id]
+        vector = self._text[row]
+        vector[:] = 0
+        for term, tf in terms.items():
+            column = self._vocabulary.get(term)
+            if column is not None:
+                vector[column] = (1 + math.log(tf)) * self._idf[column]
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+
+        self._tags[row] = 0
+        for tag in post_tags:
+            column = self._tag_columns.get(tag)
+            if column is None:
+                column = self._tag_columns[tag] = len(self._tag_columns)
+                if column >= self._tags.shape[1]:
+                    self._tags = np.pad(self._tags, ((0, 0), (0, self._tags.shape[1])))
+            self._tags[row, column] = 1
+
+    def _scores(self, rows: np.ndarray) -> np.ndarray:
+        """Similarity of each of ``rows`` to every post, itself excluded"""
+        n = len(self._ids)
+        tags = self._tags[:n]
+        sizes = tags.sum(axis=1)
+        overlap = self._tags[rows] @ tags.T
+        union = sizes[rows][:, None] + sizes[None, :] - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+        scores = self.text_weight * (self._text[rows] @ self._text[:n].T) + self.tag_weight * jaccard
+        scores[np.arange(len(rows)), rows] = -1.0
+        return scores
+
+    def _set_neighbours(self, post_id: str, neighbours: List[Tuple[str, float]]):
+        for other, _ in self._neighbours.get(post_id, ()):
+            referrers = self._referrers.get(other)
+            if referrers is not None:
+                referrers.discard(post_id)
+                if not referrers:
+                    del self._referrers[other]
+        self._neighbours[post_id] = neighbours
+        for other, _ in neighbours:
+            self._referrers.setdefault(other, set()).add(post_id)
+        self._floor[self._rows[post_id]] = neighbours[-1][1] if len(neighbours) >= self.k else 0.0
+
+    def _ranked(self, scores: np.ndarray, top: np.ndarray) -> List[Tuple[str, float]]:
+        ranked = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[j], float(scores[j])) for j in ranked if scores[j] > 0]
+
+    def _top(self, scores: np.ndarray) -> np.ndarray:
+        """Column indices of the ``k`` best scores in each row, unordered"""
+        k = min(self.k, scores.shape[1])
+        if k < scores.shape[1]:
+            return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+    def _rescore(self, post_ids: Iterable[str]):
+        """Recompute the neighbour lists of ``post_ids`` from scratch"""
+        rows = np.array([self._rows[post_id] for post_id in post_ids], dtype=np.intp)
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            scores = self._scores(batch)
+            top = self._top(scores)
+            for i, row in enumerate(batch):
+                self._set_neighbours(self._ids[row], self._ranked(scores[i], top[i]))
+
+    def _add_row(self, post_id: str) -> int:
+        row = len(self._ids)
+        if row >= self._text.shape[0]:
+            grow = max(16, row)
+            self._text = np.pad(self._text, ((0, grow), (0, 0)))
+            self._tags = np.pad(self._tags, ((0, grow), (0, 0)))
+            self._floor = np.pad(self._floor, (0, grow))
+        self._ids.append(post_id)
+        self._rows[post_id] = row
+        self._fill_row(row, post_id)
+        return row
+
+    def _remove(self, post_id: str):
+        if post_id not in self._features:
+            return
+        self._forget_terms(post_id)
+        del self._features[post_id]
+        del self._docs[post_id]
+        self._set_neighbours(post_id, [])
+        del self._neighbours[post_id]
+        # Move the last row into the hole so rows stay contiguous
+        row = self._rows.pop(post_id)
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._text[row] = self._text[last]
+            self._tags[row] = self._tags[last]
+            self._floor[row] = self._floor[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+        self._ids.pop()
+
+    def _drifted(self) -> bool:
+        if abs(len(self._features) - self._snapshot_size) > self.max_drift * max(self._snapshot_size, 1):
+            return True
+        return len(self._unindexed) > self.max_drift * max(len(self._vocabulary), 1)
+
+    def update(self, before: Optional[dict], after: Optional[dict], terms: Optional[Counter] = None):
+        """Apply a post going from ``before`` to ``after``, with ``after``'s term counts if known"""
+        post = after or before
+        if post is None:
+            return
+        post_id = post["id"]
+        # Rows that listed the post may rank it lower now, or not at all
+        stale = set(self._referrers.get(post_id, ()))
+        self._remove(post_id)
+
+        if after is not None and after.get("is_published"):
+            self.ingest(after, terms)
+            if self._drifted():
+                self.rebuild()
+                return
+            row = self._add_row(post_id)
+            scores = self._scores(np.array([row], dtype=np.intp))
+            self._set_neighbours(post_id, self._ranked(scores[0], self._top(scores)[0]))
+            scores = scores[0]
+            n = len(self._ids)
+            for j in np.nonzero(scores > self._floor[:n])[0]:
+                other = self._ids[j]
+                if other not in stale:
+                    self._insert(other, post_id, float(scores[j]))
+        elif self._drifted():
+            self.rebuild()
+            return
+
+        self._rescore([other for other in stale if other in self._rows])
+        if post_id not in self._features:
+            self._referrers.pop(post_id, None)
+
+    def _insert(self, post_id: str, other: str, score: float):
+        neighbours = self._neighbours[post_id] + [(other, score)]
+        neighbours.sort(key=lambda item: -item[1])
+        self._set_neighbours(post_id, neighbours[:self.k])
+
+    def related(self, post_id: str, limit: int = 5) -> Optional[List[dict]]:
+        """Stored neighbours of a published post, best first; None if it isn't indexed"""
+        neighbours = self._neighbours.get(post_id)
+        if neighbours is None:
+            return None
+        return [dict(self._docs[other], score=round(score, 4)) for other, score in neighbours[:limit]]
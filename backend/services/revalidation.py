@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeWatcher:
+    """Keeps state derived from storage in step with writes from every process.
+
+    Storage keeps a change counter that every write bumps once, and a log
+    of which records the latest writes touched. When a ``check`` finds the
+    counter moved, ``apply`` gets the ids written since the last sync and
+    updates the derived state from their current versions. This process's
+    own writes come back through the log too; ``apply`` skips those it
+    already has, and re-applies those that landed in state a rebuild has
+    since replaced.
+
+    If the log can't say what changed (it was trimmed, or a bulk write is in
+    it) or more than ``max_changes`` records changed, ``rebuild`` reloads
+    everything in a background task while reads keep the previous state.
+    ``rebuild`` must end with ``synced(version)`` for a version read before
+    it started reading storage.
+
+    Checks cost one counter read and run at most every ``interval``
+    seconds, so another worker's writes show up within about that long;
+    the first read after a local write checks at once.
+    """
+
+    def __init__(self, read_version: Callable[[], Awaitable[int]],
+                 read_changes: Callable[[int], Awaitable[Tuple[int, Optional[List[str]]]]],
+                 apply: Callable[[List[str]], Awaitable[None]], rebuild: Callable[[], Awaitable[None]],
+                 interval: float = 1.0, max_changes: int = 100):
+        self.read_version = read_version
+        self.read_changes = read_changes
+        self.apply = apply
+        self.rebuild = rebuild
+        self.interval = interval
+        self.max_changes = max_changes
+        self._seen = None
+        self._checked = 0.0
+        self._lock = asyncio.Lock()
+        self._rebuilding: Optional[asyncio.Task] = None
+        # Local writes no check has confirmed yet, and all of them, for version_tag
+        self._unconfirmed = 0
+        self._writes = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self.rebuilds = 0
+        self.applied = 0
+
+    def synced(self, version: int):
+        """Derived state now reflects every write up to ``version``"""
+        # The next check isn't put off: writes applied to the state a
+        # rebuild replaced are only caught up by checking
+        self._seen = version
+
+    def record_local(self, writes: int = 1):
+        """This process applied its own ``writes`` to the derived state"""
+        self._unconfirmed += writes
+        self._writes += writes
+        self._checked = 0.0
+
+    def version_tag(self) -> str:
+        """Names the state reads are served from.
+
+        Processes synced to the same storage version share the tag. Until a
+        check confirms this process's own writes, the tag is unique to it.
+        """
+        if self._seen is not None and not self._unconfirmed:
+            return str(self._seen)
+        return f"{self._seen}.{self._epoch}.{self._writes}"
+
+    async def check(self):
+        """Catch up with writes since the last sync; throttled to ``interval``"""
+        if time.monotonic() - self._checked < self.interval or self._lock.locked() or self._rebuilding:
+            return
+        async with self._lock:
+            self._checked = time.monotonic()
+            # Counted local writes committed before the reads below, so they cover them
+            unconfirmed = self._unconfirmed
+            try:
+                if self._seen is not None:
+                    if await self.read_version() == self._seen:
+                        self._unconfirmed -= unconfirmed
+                        return
+                    version, changed = await self.read_changes(self._seen)
+                    if changed is not None and len(changed) <= self.max_changes:
+                        await self.apply(changed)
+                        self.applied += len(changed)
+                        self.synced(version)
+                        self._unconfirmed -= unconfirmed
+                        return
+                self.rebuilds += 1
+                self._rebuilding = asyncio.ensure_future(self._rebuild(unconfirmed))
+            except Exception as e:
+                # Keep serving the current state; the next check tries again
+                logger.warning(f"Revalidating derived state failed: {e}")
+
+    async def _rebuild(self, unconfirmed: int):
+        try:
+            await self.rebuild()
+            self._unconfirmed -= unconfirmed
+        except Exception as e:
+            logger.warning(f"Rebuilding derived state failed: {e}")
+        finally:
+            self._rebuilding = None
+            # Writes that landed in the old state are re-applied on the next read
+            self._checked = 0.0
+
+    async def stop(self):
+        """Cancel a rebuild in progress"""
+        if self._rebuilding is not None:
+            self._rebuilding.cancel()
+            try:
+                await self._rebuilding
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "version": self._seen,
+            "unconfirmed_writes": self._unconfirmed,
+            "rebuilds": self.rebuilds,
+            "applied": self.applied,
+            "rebuilding": self._rebuilding is not None,
+        }
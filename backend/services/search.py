@@ -0,0 +1,321 @@
+import bisect
+import heapq
+import html
+import math
+import re
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+TAG_RE = re.compile(r"<[^>]+>")
+SPACE_RE = re.compile(r"\s+")
+
+# Per-field boosts folded into a single BM25 term frequency
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.5, "excerpt": 1.5, "text": 1.0}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were will with".split()
+)
+
+
+def strip_html(markup: str) -> str:
+    """Plain text of an HTML fragment with whitespace collapsed"""
+    return SPACE_RE.sub(" ", html.unescape(TAG_RE.sub(" ", markup or ""))).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """In-memory inverted index over published blog posts ranked with BM25.
+
+    Postings map each term to ``{post_id: impact}``, the length-normalized
+    BM25 term weight, so a query only multiplies by idf. Impacts use a
+    snapshot of the average document length and are refreshed when it drifts.
+    A sorted vocabulary supports prefix expansion of the last query term for
+    search-as-you-type. Posts are added and removed one at a time as the
+    write routes change them.
+
+    Queries walk each term's postings from the highest impact down and stop
+    once no unseen post could still make the top results, so a term found
+    in most posts costs about as much as a rare one. The impact order of a
+    term is sorted on first use after it changes.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_terms: int = 50,
+                 max_avg_drift: float = 0.1):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.max_avg_drift = max_avg_drift
+        self._avg_len = 0.0
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._by_impact: Dict[str, List[Tuple[float, str]]] = {}
+        self._vocabulary: List[str] = []
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._docs: Dict[str, dict] = {}
+        self._total_len = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def clear(self):
+        self._postings.clear()
+        self._by_impact.clear()
+        self._vocabulary.clear()
+        self._doc_terms.clear()
+        self._doc_len.clear()
+        self._docs.clear()
+        self._total_len = 0.0
+        self._avg_len = 0.0
+
+    async def build(self, cursor):
+        """Replace the index with the posts from an async cursor"""
+        self.clear()
+        async for post in cursor:
+            self.add(post)
+        self._reweight()
+
+    def _impact(self, tf: float, length: float) -> float:
+        norm = self.k1 * (1 - self.b + self.b * length / self._avg_len)
+        return tf * (self.k1 + 1) / (tf + norm)
+
+    def _reweight(self):
+        """Recompute every impact against the current average length"""
+        if not self._docs:
+            return
+        self._avg_len = self._total_len / len(self._docs)
+        self._by_impact.clear()
+        for post_id, terms in self._doc_terms.items():
+            length = self._doc_len[post_id]
+            for term, tf in terms.items():
+                self._postings[term][post_id] = self._impact(tf, length)
+
+    def _check_drift(self):
+        if not self._docs:
+            return
+        current = self._total_len / len(self._docs)
+        if not self._avg_len or abs(current - self._avg_len) > self.max_avg_drift * self._avg_len:
+            self._reweight()
+
+    def add(self, post: dict):
+        """Index a post; unpublished posts are ignored"""
+        post_id = post["id"]
+        self.remove(post_id)
+        if not post.get("is_published"):
+            return
+
+        text = post.get("plain_text") or strip_html(post.get("content", ""))
+        fields = {
+            "title": post.get("title", ""),
+            "tags": " ".join(post.get("tags") or []),
+            "excerpt": post.get("excerpt", ""),
+            "text": text,
+        }
+        terms: Counter = Counter()
+        for field, value in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(value):
+                terms[token] += weight
+
+        length = sum(terms.values())
+        self._doc_terms[post_id] = terms
+        self._doc_len[post_id] = length
+        self._total_len += length
+        if not self._avg_len:
+            self._avg_len = length or 1.0
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[post_id] = self._impact(tf, length)
+            self._by_impact.pop(term, None)
+        self._docs[post_id] = {
+            "id": post_id,
+            "title": post.get("title", ""),
+            "excerpt": post.get("excerpt", ""),
+            "tags": list(post.get("tags") or []),
+            "read_time": post.get("read_time", ""),
+            "image": post.get("image", ""),
+            "publish_date": post.get("publish_date"),
+            "text": text,
+        }
+
+    def remove(self, post_id: str):
+        terms = self._doc_terms.pop(post_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[post_id]
+            self._by_impact.pop(term, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+        self._total_len -= self._doc_len.pop(post_id)
+        del self._docs[post_id]
+        if not self._docs:
+            self._avg_len = 0.0
+
+    def update(self, before: Optional[dict], after: Optional[dict]):
+        """Apply a post going from ``before`` to ``after``"""
+        if after is not None:
+            self.add(after)
+        elif before is not None:
+            self.remove(before["id"])
+        self._check_drift()
+
+    def term_counts(self, post_id: str) -> Optional[Counter]:
+        """Field-weighted term counts of an indexed post"""
+        return self._doc_terms.get(post_id)
+
+    @staticmethod
+    def _idf(n_docs: int, doc_freq: int) -> float:
+        return math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + self.max_prefix_terms]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _ranked(self, term: str) -> List[Tuple[float, str]]:
+        """``(impact, post_id)`` postings of ``term``, highest impact first"""
+        ranked = self._by_impact.get(term)
+        if ranked is None:
+            ranked = self._by_impact[term] = sorted(
+                ((impact, post_id) for post_id, impact in self._postings[term].items()), reverse=True
+            )
+        return ranked
+
+    def _descending(self, term: str, idf: float) -> Iterable[Tuple[float, str]]:
+        """``(-score, post_id)`` for every post containing ``term``, best score first"""
+        return ((-idf * impact, post_id) for impact, post_id in self._ranked(term))
+
+    def _top_scores(self, groups: List[Tuple[float, List[Tuple[str, float]]]], limit: int) -> Dict[str, float]:
+        """Scores of the posts that can make the top ``limit``, MaxScore style.
+
+        Each group is a query term, or a prefix's completions of which a post
+        scores its best, with the most it can add to any post. Groups are
+        taken best first. Posts already scored are topped up by lookup, or
+        dropped once even the best of every remaining group can't lift them
+        to the current ``limit``-th best score. Unseen posts are taken from
+        the group's postings in impact order until the same bound cuts them
+        off. The top ``limit`` of the result are exact.
+        """
+        groups = sorted(groups, key=itemgetter(0), reverse=True)
+        rest = sum(bound for bound, _ in groups)
+        scores: Dict[str, float] = {}
+        for bound, terms in groups:
+            rest -= bound
+            if scores:
+                kept = heapq.nlargest(limit, scores.values())
+                threshold = kept[-1] if len(kept) == limit else 0.0
+                topped = {}
+                for post_id, score in scores.items():
+                    if score + bound + rest < threshold:
+                        continue
+                    topped[post_id] = score + max(idf * self._postings[term].get(post_id, 0.0) for term, idf in terms)
+                scores = topped
+
+            # Min-heap of the best ``limit`` scores so far; its root is the bar to clear
+            best = heapq.nlargest(limit, scores.values())
+            heapq.heapify(best)
+            threshold = best[0] if len(best) == limit else 0.0
+            streams = [self._descending(term, idf) for term, idf in terms]
+            for negative, post_id in streams[0] if len(streams) == 1 else heapq.merge(*streams):
+                score = -negative
+                if score + rest < threshold:
+                    break
+                if post_id in scores:
+                    # Scored by lookup, or by a better completion of this prefix
+                    continue
+                scores[post_id] = score
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+                if len(best) == limit:
+                    threshold = best[0]
+        return scores
+
+    def _groups(self, tokens: List[str], prefix: bool) -> Tuple[list, List[str]]:
+        """Scoring groups for ``_top_scores`` and the index terms the query matched"""
+        n_docs = len(self._docs)
+        groups, matched = [], []
+        for i, token in enumerate(tokens):
+            expansions = self._expand(token) if prefix and i == len(tokens) - 1 else [token]
+            terms = [(term, self._idf(n_docs, len(self._postings[term]))) for term in expansions if term in self._postings]
+            if terms:
+                matched.extend(term for term, _ in terms)
+                # A prefix scores each post by its best completion, not the sum of all of them
+                groups.append((max(idf * self._ranked(term)[0][0] for term, idf in terms), terms))
+        return groups, matched
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[dict]:
+        """Top ``limit`` posts for ``query`` with highlighted title and snippet"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._docs or limit <= 0:
+            return []
+
+        groups, matched = self._groups(tokens, prefix)
+        scores = self._top_scores(groups, limit)
+        top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        highlight = _highlighter(matched)
+        results = []
+        for post_id, score in top:
+            doc = self._docs[post_id]
+            # Only look for the matched terms this post contains
+            terms = self._doc_terms[post_id]
+            results.append({
+                "id": post_id,
+                "title": doc["title"],
+                "excerpt": doc["excerpt"],
+                "tags": doc["tags"],
+                "read_time": doc["read_time"],
+                "image": doc["image"],
+                "publish_date": doc["publish_date"],
+                "score": round(score, 4),
+                "highlighted_title": highlight(doc["title"]),
+                "snippet": _snippet(doc["text"] or doc["excerpt"], [t for t in matched if t in terms], highlight),
+            })
+        return results
+
+
+def _highlighter(terms: Iterable[str]):
+    terms = sorted(set(terms), key=len, reverse=True)
+    if not terms:
+        return html.escape
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+
+    def highlight(text: str) -> str:
+        out, last = [], 0
+        for match in pattern.finditer(text):
+            out.append(html.escape(text[last:match.start()]))
+            out.append(f"<mark>{html.escape(match.group(0))}</mark>")
+            last = match.end()
+        out.append(html.escape(text[last:]))
+        return "".join(out)
+
+    return highlight
+
+
+def _snippet(text: str, terms: List[str], highlight, width: int = 160) -> str:
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    if start:
+        # Don't cut a word in half
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < start + 20 else start
+    end = min(len(text), start + width)
+    snippet = highlight(text[start:end])
+    return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
@@ -0,0 +1,41 @@
+from typing import Any, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def fields_for(model: Type[BaseModel]) -> tuple:
+    """Names of the fields a read must fetch to render ``model``"""
+    return tuple(model.model_fields)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode documents straight to JSON bytes.
+
+    Documents read with ``fields_for`` were written by our own models, so
+    they are trusted and skip pydantic validation entirely. Naive datetimes
+    encode the same way pydantic does.
+    """
+    return orjson.dumps(content, default=_default)
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class JSONBytesResponse(Response):
+    """JSON response that accepts pre-encoded bytes.
+
+    Returning a Response directly bypasses FastAPI's response_model
+    validation, while keeping response_model on the route keeps the OpenAPI
+    schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,407 @@
+"""Pre-rendered JSON snapshots of the public blog read API.
+
+``build_snapshot`` writes every published read response to a directory
+tree that mirrors the API paths, with ``.gz`` and ``.br`` siblings in the
+layout nginx's ``gzip_static``/``brotli_static`` and most CDNs expect:
+
+    api/blog/posts/page/{n}.json     GET /api/blog/posts (page 1) and its cursor pages
+    api/blog/posts/{post_id}.json    GET /api/blog/posts/{post_id}
+    api/blog/posts/tag/{tag}.json    GET /api/blog/posts/tag/{tag} (tag URL-quoted)
+    api/blog/tags.json               GET /api/blog/tags
+    manifest.json                    what was built from which post versions
+    stale                            touched by writes made after the build started
+
+A static host needs one rewrite, ``/api/blog/posts`` to page 1.
+Alternatively ``SnapshotMiddleware`` serves the tree from the app itself,
+with the validators the live routes would send: a post's ``post_etag`` and
+update time, and for everything else the collection ETag of the change
+version the build read.
+"""
+import json
+import mmap
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote
+
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+
+from models.blog import BlogPost, BlogPostSummary
+from services.conditional import collection_etag, is_not_modified, post_etag, validator_headers
+from services.pagination import NEXT_CURSOR_HEADER, next_cursor
+from services.payloads import ENCODINGS, build_payload, encode_variants, negotiate
+from services.serialization import dumps, fields_for
+from storage.base import BlogPostRepository
+
+SNAPSHOT_FORMAT = 2
+MANIFEST_NAME = "manifest.json"
+STALE_NAME = "stale"
+
+POST_FIELDS = fields_for(BlogPost)
+SUMMARY_FIELDS = fields_for(BlogPostSummary)
+# Summaries plus what decides whether a post changed since the last build
+SCAN_FIELDS = tuple(dict.fromkeys(SUMMARY_FIELDS + ("version", "updated_at")))
+
+# File suffix of each stored encoding, in ENCODINGS preference order
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+TAGS_PATH = "api/blog/tags.json"
+
+
+def page_path(number: int) -> str:
+    return f"api/blog/posts/page/{number}.json"
+
+
+def post_path(post_id: str) -> str:
+    return f"api/blog/posts/{quote(post_id, safe='')}.json"
+
+
+def tag_path(tag: str) -> str:
+    return f"api/blog/posts/tag/{quote(tag, safe='')}.json"
+
+
+def _replace(path: Path, data: bytes):
+    # Write-then-rename, so readers (and existing mmaps) never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _remove(directory: Path, relpath: str):
+    for suffix in ("",) + tuple(SUFFIXES.values()):
+        try:
+            (directory / (relpath + suffix)).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _write_artifact(directory: Path, relpath: str, variants: Dict[str, bytes],
+                    validators: Optional[dict] = None) -> dict:
+    """Write every encoding of one response; returns its manifest entry, with ``validators`` if given"""
+    _replace(directory / relpath, variants["identity"])
+    encodings = []
+    for encoding, suffix in SUFFIXES.items():
+        if encoding in variants:
+            _replace(directory / (relpath + suffix), variants[encoding])
+            encodings.append(encoding)
+        else:
+            try:
+                (directory / (relpath + suffix)).unlink()
+            except FileNotFoundError:
+                pass
+    return dict(validators or {}, size=len(variants["identity"]), encodings=encodings)
+
+
+def load_manifest(directory: Path) -> Optional[dict]:
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+async def build_snapshot(posts: BlogPostRepository, directory: Path, page_size: int = 20,
+                         tag_limit: int = 10, full: bool = False) -> dict:
+    """Render the public read API into ``directory``.
+
+    Published posts are scanned once without their bodies. Compared with the
+    previous manifest, only artifacts that contain a post whose version or
+    ``updated_at`` changed, or whose membership shifted, are rendered,
+    compressed and written again; artifacts that no longer exist are
+    deleted. ``full`` (or different page sizes) renders everything.
+    """
+    directory = Path(directory)
+    # Writes from here on may be missing from the build; a second of slack
+    # covers file systems whose timestamps lag the clock
+    started_at = time.time() - 1.0
+    # Read before the scan, so everything it finds is at least this version
+    version = await posts.change_version()
+    previous = None if full else load_manifest(directory)
+    if previous is not None and (previous.get("format"), previous.get("page_size"), previous.get("tag_limit")) != (
+            SNAPSHOT_FORMAT, page_size, tag_limit):
+        previous = None
+    old_posts = previous["posts"] if previous else {}
+    old_artifacts = previous["artifacts"] if previous else {}
+
+    scan = [doc async for doc in posts.iter_all(published_only=True, fields=SCAN_FIELDS)]
+    states = {
+        doc["id"]: {"version": doc.get("version", 1), "updated_at": doc["updated_at"].isoformat(), "tags": doc.get("tags", [])}
+        for doc in scan
+    }
+    changed = {post_id for post_id, state in states.items() if old_posts.get(post_id) != state}
+    removed = old_posts.keys() - states.keys()
+
+    artifacts: Dict[str, dict] = {}
+    rendered = 0
+
+    def keep(relpath: str, stale: bool) -> bool:
+        """Carry an unaffected artifact over from the previous build"""
+        if stale or relpath not in old_artifacts or not (directory / relpath).exists():
+            return False
+        artifacts[relpath] = old_artifacts[relpath]
+        return True
+
+    def write(relpath: str, variants: Dict[str, bytes], validators: Optional[dict] = None):
+        nonlocal rendered
+        artifacts[relpath] = _write_artifact(directory, relpath, variants, validators)
+        rendered += 1
+
+    for post_id, state in states.items():
+        relpath = post_path(post_id)
+        if keep(relpath, post_id in changed):
+            continue
+        # Reuse the body the write path already encoded and compressed
+        payload = await posts.get_payload(post_id)
+        if payload is None or payload["version"] != state["version"]:
+            post = await posts.get(post_id, POST_FIELDS)
+            if post is None:
+                continue
+            payload = build_payload(post, POST_FIELDS)
+        validators = {"etag": post_etag(payload), "last_modified": payload["updated_at"].isoformat()}
+        write(relpath, {name: payload[name] for name in ("identity",) + ENCODINGS if name in payload}, validators)
+
+    summaries = [{name: doc[name] for name in SUMMARY_FIELDS if name in doc} for doc in scan]
+
+    # Pages exactly as GET /api/blog/posts returns them, cursors included
+    old_pages = previous["pages"] if previous else []
+    pages: List[dict] = []
+    start, cursor = 0, None
+    while True:
+        docs = summaries[start:start + page_size]
+        token = next_cursor(docs, "publish_date", page_size)
+        page = {"cursor": cursor, "next_cursor": token, "ids": [doc["id"] for doc in docs]}
+        index = len(pages)
+        pages.append(page)
+        stale = index >= len(old_pages) or old_pages[index] != page or any(i in changed for i in page["ids"])
+        if not keep(page_path(index + 1), stale):
+            write(page_path(index + 1), encode_variants(dumps(docs)))
+        if token is None:
+            break
+        start += page_size
+        cursor = token
+
+    old_tags = previous["tags"] if previous else {}
+    tag_docs: Dict[str, List[dict]] = {}
+    for doc in summaries:
+        for tag in dict.fromkeys(doc.get("tags", [])):
+            docs = tag_docs.setdefault(tag, [])
+            if len(docs) < tag_limit:
+                docs.append(doc)
+    tags = {tag: [doc["id"] for doc in docs] for tag, docs in tag_docs.items()}
+    for tag, ids in tags.items():
+        stale = old_tags.get(tag) != ids or any(i in changed for i in ids)
+        if not keep(tag_path(tag), stale):
+            write(tag_path(tag), encode_variants(dumps(tag_docs[tag])))
+
+    if not keep(TAGS_PATH, bool(changed or removed)):
+        write(TAGS_PATH, encode_variants(dumps(await posts.tag_counts())))
+
+    deleted = 0
+    for relpath in old_artifacts.keys() - artifacts.keys():
+        _remove(directory, relpath)
+        deleted += 1
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "built_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "started_at": started_at,
+        "version": version,
+        "page_size": page_size,
+        "tag_limit": tag_limit,
+        "posts": states,
+        "pages": pages,
+        "tags": tags,
+        "artifacts": artifacts,
+    }
+    # Written last: a manifest only ever describes files that are in place
+    _replace(directory / MANIFEST_NAME, json.dumps(manifest, indent=1).encode())
+
+    return {
+        "posts": len(states),
+        "changed": len(changed),
+        "removed": len(removed),
+        "rendered": rendered,
+        "kept": len(artifacts) - rendered,
+        "deleted": deleted,
+        "full": previous is None,
+    }
+
+
+class SnapshotStore:
+    """A snapshot directory served from memory-mapped files.
+
+    Files are mapped on first use and shared with every other worker
+    through the page cache, and bodies are sent as views of the mapping
+    without copying. The manifest is re-checked at most once per
+    ``recheck_interval`` seconds, so a rebuild is picked up without a
+    restart. A write through the API calls ``invalidate``, which touches
+    the ``stale`` marker; every worker checks it on each lookup, so the
+    live routes answer everywhere until a build that started later.
+    """
+
+    def __init__(self, directory: str, recheck_interval: float = 1.0):
+        self.directory = Path(directory)
+        self.recheck_interval = recheck_interval
+        self.manifest: Optional[dict] = None
+        self.collection_etag: Optional[str] = None
+        self.stale = False
+        self.hits = 0
+        self._mtime = None
+        self._checked = 0.0
+        self._pages: Dict[Optional[str], Tuple[str, Optional[str]]] = {}
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def invalidate(self):
+        self.stale = True
+        try:
+            (self.directory / STALE_NAME).touch()
+        except OSError:
+            # Read-only snapshot directory: at least this process stops serving it
+            pass
+
+    def _marked_stale(self) -> bool:
+        try:
+            marked_at = (self.directory / STALE_NAME).stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return marked_at >= self.manifest.get("started_at", 0.0)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.recheck_interval:
+            return
+        self._checked = now
+        try:
+            mtime = (self.directory / MANIFEST_NAME).stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        manifest = load_manifest(self.directory) if mtime is not None else None
+        # Not closed: responses in flight may still hold views of the old
+        # mappings, which are unmapped once the last view is released
+        self._maps = {}
+        self._mtime = mtime
+        self.manifest = manifest
+        self.stale = False
+        if manifest is None:
+            self._pages = {}
+            return
+        self.collection_etag = collection_etag(str(manifest["version"]))
+        self._pages = {
+            page["cursor"]: (page_path(number), page["next_cursor"])
+            for number, page in enumerate(manifest["pages"], start=1)
+        }
+
+    def lookup(self, path: str, query_string: bytes) -> Optional[Tuple[str, dict, dict]]:
+        """``(relpath, artifact, extra headers)`` answering a GET, or None to fall through"""
+        self._refresh()
+        if self.manifest is None or self.stale:
+            return None
+        if self._marked_stale():
+            self.stale = True
+            return None
+
+        extra = {}
+        if path == "/api/blog/posts":
+            query = parse_qsl(query_string.decode("latin-1"))
+            if any(name != "cursor" for name, _ in query) or len(query) > 1:
+                return None
+            page = self._pages.get(query[0][1] if query else None)
+            if page is None:
+                return None
+            relpath, token = page
+            if token:
+                extra[NEXT_CURSOR_HEADER] = token
+        elif query_string:
+            return None
+        elif path == "/api/blog/tags":
+            relpath = TAGS_PATH
+        elif path.startswith("/api/blog/posts/tag/"):
+            relpath = tag_path(path[len("/api/blog/posts/tag/"):])
+        elif path.startswith("/api/blog/posts/"):
+            relpath = post_path(path[len("/api/blog/posts/"):])
+        else:
+            return None
+
+        # Only files the manifest lists are ever opened
+        artifact = self.manifest["artifacts"].get(relpath)
+        if artifact is None:
+            return None
+        return relpath, artifact, extra
+
+    def validators(self, artifact: dict) -> Tuple[str, Optional[datetime]]:
+        """``(etag, last_modified)`` the live route would send for an artifact"""
+        if "etag" in artifact:
+            return artifact["etag"], datetime.fromisoformat(artifact["last_modified"])
+        return self.collection_etag, None
+
+    def read(self, relpath: str, encoding: str = "identity") -> memoryview:
+        """One encoding of an artifact, as a view of its mapped file"""
+        name = relpath + SUFFIXES.get(encoding, "")
+        mapped = self._maps.get(name)
+        if mapped is None:
+            with open(self.directory / name, "rb") as f:
+                mapped = self._maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.manifest is not None and not self.stale,
+            "stale": self.stale,
+            "built_at": self.manifest["built_at"] if self.manifest else None,
+            "artifacts": len(self.manifest["artifacts"]) if self.manifest else 0,
+            "mapped_files": len(self._maps),
+            "hits": self.hits,
+        }
+
+
+# Metrics label for responses served from a snapshot
+SNAPSHOT_ROUTE = SimpleNamespace(path="snapshot")
+
+
+class SnapshotMiddleware:
+    """Answer snapshot-covered GETs before routing; everything else passes through"""
+
+    def __init__(self, app, store: SnapshotStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        hit = self.store.lookup(scope["path"], scope["query_string"])
+        if hit is None:
+            await self.app(scope, receive, send)
+            return
+
+        relpath, artifact, extra = hit
+        self.store.hits += 1
+        scope["route"] = SNAPSHOT_ROUTE
+        request_headers = Headers(scope=scope)
+        etag, last_modified = self.store.validators(artifact)
+        headers = validator_headers(etag, last_modified)
+        headers["Vary"] = "Accept-Encoding"
+        headers.update(extra)
+        if is_not_modified(request_headers, etag, last_modified):
+            await Response(status_code=304, headers=headers)(scope, receive, send)
+            return
+
+        encoding = negotiate(request_headers.get("accept-encoding"), artifact["encodings"])
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        # Sent as the mapped view itself; Response would copy it into bytes
+        body = self.store.read(relpath, encoding)
+        headers.update({"Content-Type": "application/json", "Content-Length": str(len(body))})
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": body})
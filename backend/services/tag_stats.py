@@ -0,0 +1,36 @@
+from collections import Counter
+from typing import Optional
+
+from storage.base import BlogPostRepository
+
+
+def tag_contribution(post: Optional[dict]) -> Counter:
+    """Tag counts a single post contributes to the materialized counts"""
+    if not post or not post.get("is_published"):
+        return Counter()
+    return Counter(post.get("tags") or [])
+
+
+async def apply_tag_diff(posts: BlogPostRepository, before: Optional[dict], after: Optional[dict]):
+    """Update tag counts for a post going from ``before`` to ``after``"""
+    delta = tag_contribution(after)
+    delta.subtract(tag_contribution(before))
+    changes = {tag: change for tag, change in delta.items() if change}
+    if changes:
+        await posts.increment_tags(changes)
+
+
+async def rebuild_tag_stats(posts: BlogPostRepository, verify_only: bool = False) -> dict:
+    """Recompute tag counts from the posts and report (and fix) any drift"""
+    expected = await posts.compute_tag_counts()
+    actual = {item["tag"]: item["count"] for item in await posts.tag_counts()}
+    drift = {
+        tag: {"expected": expected.get(tag, 0), "actual": actual.get(tag, 0)}
+        for tag in expected.keys() | actual.keys()
+        if expected.get(tag, 0) != actual.get(tag, 0)
+    }
+
+    if drift and not verify_only:
+        await posts.replace_tag_counts(expected)
+
+    return {"tags": len(expected), "drift": drift, "repaired": bool(drift) and not verify_only}
@@ -0,0 +1,304 @@
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Last (sort value, id) seen on a page, decoded from a pagination cursor
+Keyset = Tuple[datetime, str]
+
+# (inserted count, [(batch index, error message), ...]) from a bulk insert
+InsertReport = Tuple[int, List[Tuple[int, str]]]
+
+# (granularity, bucket start, status, has company) of a contact rollup counter
+RollupKey = Tuple[str, datetime, str, bool]
+
+# Rollup granularities kept for contact submissions, finest first
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+# Most recent writes to the posts that ``BlogPostRepository.changes_since`` can report
+CHANGE_LOG_SIZE = 1000
+
+# (version, name, step) of a schema migration; the step gets the backend to migrate
+Migration = Tuple[int, str, Callable[["Storage"], Awaitable[None]]]
+
+
+def rollup_bucket(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the ``granularity`` bucket containing ``timestamp``"""
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_delta(removed: Iterable[dict], added: Iterable[dict]) -> Dict[RollupKey, int]:
+    """Non-zero counter changes for submissions leaving and entering the rollups"""
+    delta: Counter = Counter()
+    for submissions, sign in ((removed, -1), (added, 1)):
+        for submission in submissions:
+            status = submission.get("status", "received")
+            has_company = bool(submission.get("company"))
+            for granularity in ROLLUP_GRANULARITIES:
+                delta[(granularity, rollup_bucket(submission["submitted_at"], granularity), status, has_company)] += sign
+    return {key: change for key, change in delta.items() if change}
+
+
+class VersionConflict(Exception):
+    """A conditional update found a different version than expected"""
+
+    def __init__(self, current: dict):
+        super().__init__(f"expected another version, found {current.get('version')}")
+        self.current = current
+
+
+class BlogPostRepository(ABC):
+    """Blog posts plus the materialized per-tag counts derived from them.
+
+    Documents are plain dicts as produced by ``BlogPost.dict()``. ``fields``
+    limits which keys are returned; ``None`` returns the whole document.
+    Lists are ordered newest first by ``(publish_date, id)``.
+    """
+
+    @abstractmethod
+    async def get(self, post_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list(self, published_only: bool = True, tag: Optional[str] = None,
+                   after: Optional[Keyset] = None, skip: int = 0, limit: int = 20,
+                   fields: Optional[Sequence[str]] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def iter_all(self, published_only: bool = False,
+                 fields: Optional[Sequence[str]] = None) -> AsyncIterator[dict]:
+        """Stream every post in list order without loading them all at once"""
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def change_version(self) -> int:
+        """Counter bumped once by every write to the posts, from any process.
+
+        Processes that derive state from the posts (indexes, caches) poll
+        it to notice writes made elsewhere.
+        """
+
+    @abstractmethod
+    async def changes_since(self, version: int) -> Tuple[int, Optional[List[str]]]:
+        """``(current version, ids of the posts written after change version)``, oldest first.
+
+        Only the last ``CHANGE_LOG_SIZE`` writes are kept, and bulk writes
+        don't record which posts they touched; when the writes since
+        ``version`` aren't all known the ids are None, and the caller must
+        reload everything.
+        """
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, docs: List[dict]) -> InsertReport:
+        """Unordered bulk insert; rejected documents don't stop the rest"""
+
+    @abstractmethod
+    async def update(self, post_id: str, changes: dict, updated_at: datetime,
+                     expected_version: Optional[int] = None) -> Optional[Tuple[dict, dict]]:
+        """Apply ``changes`` in one atomic write, bumping ``version``.
+
+        Returns ``(before, after)``, or None if the post doesn't exist. When
+        every change already matches nothing is written and both are the
+        current document. Raises VersionConflict if ``expected_version`` is
+        given and the stored version differs. A write drops the post's stored
+        payload, so reads never serve the old body if re-encoding it fails.
+        """
+
+    @abstractmethod
+    async def backfill_versions(self) -> int:
+        """Give posts written before versioning ``version: 1``; returns how many"""
+
+    @abstractmethod
+    async def delete(self, post_id: str) -> Optional[dict]:
+        """Delete a post and its stored payload; returns the post, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def get_payload(self, post_id: str) -> Optional[dict]:
+        """Pre-encoded response body stored for a post, if any"""
+
+    @abstractmethod
+    async def put_payload(self, payload: dict) -> None:
+        """Store a post's pre-encoded body unless a newer version is already stored"""
+
+    @abstractmethod
+    async def tag_counts(self) -> List[dict]:
+        """Materialized ``{"tag", "count"}`` rows, most used first"""
+
+    @abstractmethod
+    async def increment_tags(self, delta: Dict[str, int]) -> None:
+        """Add ``delta`` to the materialized counts, dropping tags that reach zero"""
+
+    @abstractmethod
+    async def replace_tag_counts(self, counts: Dict[str, int]) -> None:
+        ...
+
+    @abstractmethod
+    async def compute_tag_counts(self) -> Dict[str, int]:
+        """Tag counts over published posts, computed from the posts themselves"""
+
+
+class ContactSubmissionRepository(ABC):
+    """Contact submissions plus hourly and daily counts derived from them.
+
+    Lists are ordered newest first by ``(submitted_at, id)``. ``insert``,
+    ``insert_many`` and ``set_status`` keep the rollup counters, keyed by
+    ``RollupKey``, in step with the submissions they write.
+    """
+
+    @abstractmethod
+    async def get(self, submission_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list(self, after: Optional[Keyset] = None, skip: int = 0, limit: int = 50,
+                   fields: Optional[Sequence[str]] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def iter_all(self, fields: Optional[Sequence[str]] = None) -> AsyncIterator[dict]:
+        ...
+
+    @abstractmethod
+    async def insert(self, doc: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, docs: List[dict]) -> InsertReport:
+        ...
+
+    @abstractmethod
+    async def set_status(self, submission_id: str, status: str) -> bool:
+        """True if a submission was changed"""
+
+    @abstractmethod
+    async def rollups(self, granularity: str, start: datetime, end: datetime) -> List[dict]:
+        """Non-zero ``{"bucket", "status", "has_company", "count"}`` rows with ``start <= bucket < end``, oldest first"""
+
+    @abstractmethod
+    async def replace_rollups(self, counts: Dict[RollupKey, int]) -> None:
+        ...
+
+    @abstractmethod
+    async def compute_rollups(self) -> Dict[RollupKey, int]:
+        """Rollup counts computed from the submissions themselves"""
+
+
+class EmailOutboxRepository(ABC):
+    """Queue of notification emails awaiting delivery"""
+
+    @abstractmethod
+    async def insert(self, entry: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, now: datetime, locked_until: datetime) -> Optional[dict]:
+        """Atomically lease the oldest due entry, or one whose lease expired"""
+
+    @abstractmethod
+    async def update(self, entry_id: str, changes: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def status_counts(self) -> Dict[str, int]:
+        ...
+
+
+class AdmissionRepository(ABC):
+    """Rate-limit buckets and idempotency keys shared by every worker.
+
+    Times are epoch seconds. Entries expire on their own, so neither kind
+    of key grows without bound.
+    """
+
+    @abstractmethod
+    async def take_tokens(self, keys: Sequence[str], rate: float, burst: int, now: float) -> float:
+        """Spend one token from each of ``keys``' buckets if every one has a token.
+
+        Returns 0.0 if allowed, else the seconds until all of them have one;
+        a rejected request takes nothing from any bucket.
+        """
+
+    @abstractmethod
+    async def reserve_idempotency_key(self, key: str, submission_id: str, fingerprint: str, now: float,
+                                      ttl: float) -> Optional[Tuple[str, str]]:
+        """Claim ``key`` for ``submission_id``, made by a request hashing to ``fingerprint``.
+
+        Returns ``(submission_id, fingerprint)`` of the claim that already
+        holds the key, if any. Claims made before fingerprints were stored
+        have an empty one.
+        """
+
+    @abstractmethod
+    async def release_idempotency_key(self, key: str, submission_id: str) -> None:
+        """Give up a claim whose submission was never stored"""
+
+
+class Storage(ABC):
+    """A storage backend: one repository per kind of document"""
+
+    posts: BlogPostRepository
+    submissions: ContactSubmissionRepository
+    outbox: EmailOutboxRepository
+    admission: AdmissionRepository
+
+    @abstractmethod
+    async def ping(self) -> None:
+        """Raise if the backend is unreachable"""
+
+    # Append-only, in version order; a recorded version is never applied again
+    migrations: Sequence[Migration] = ()
+
+    @abstractmethod
+    async def applied_migrations(self) -> Set[int]:
+        ...
+
+    @abstractmethod
+    async def record_migration(self, version: int, name: str) -> None:
+        ...
+
+    @asynccontextmanager
+    async def migration_lock(self):
+        """Held while migrations run; backends whose steps are each atomic need none"""
+        yield
+
+    async def migrate(self) -> List[int]:
+        """Apply pending migrations; returns the versions applied.
+
+        Against an up-to-date database this is a single read. Otherwise
+        workers booting at the same time take turns under
+        ``migration_lock``, and a worker that waited finds the steps already
+        recorded. A step never races the writes of workers that finished
+        migrating, since none of them serves requests before that.
+        """
+        applied = await self.applied_migrations()
+        if all(version in applied for version, _, _ in self.migrations):
+            return []
+        async with self.migration_lock():
+            applied = await self.applied_migrations()
+            versions = []
+            for version, name, step in self.migrations:
+                if version in applied:
+                    continue
+                await step(self)
+                await self.record_migration(version, name)
+                versions.append(version)
+        return versions
+
+    @abstractmethod
+    async def drop(self) -> None:
+        """Delete all data; used by benchmarks on throwaway databases"""
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
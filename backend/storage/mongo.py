@@ -0,0 +1,555 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from storage.base import (
+    CHANGE_LOG_SIZE,
+    ROLLUP_GRANULARITIES,
+    AdmissionRepository,
+    BlogPostRepository,
+    ContactSubmissionRepository,
+    EmailOutboxRepository,
+    InsertReport,
+    Keyset,
+    RollupKey,
+    Storage,
+    VersionConflict,
+    rollup_bucket,
+    rollup_delta,
+)
+
+logger = logging.getLogger(__name__)
+
+# Aggregation the materialized tag counts must always agree with
+TAG_COUNT_PIPELINE = [
+    {"$match": {"is_published": True}},
+    {"$unwind": "$tags"},
+    {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+]
+
+# Hourly submission counts the contact rollups must agree with; days are summed from hours
+ROLLUP_PIPELINE = [
+    {"$group": {
+        "_id": {
+            "hour": {"$dateFromParts": {
+                "year": {"$year": "$submitted_at"},
+                "month": {"$month": "$submitted_at"},
+                "day": {"$dayOfMonth": "$submitted_at"},
+                "hour": {"$hour": "$submitted_at"},
+            }},
+            "status": "$status",
+            "has_company": {"$ne": [{"$ifNull": ["$company", ""]}, ""]},
+        },
+        "count": {"$sum": 1},
+    }},
+]
+
+
+def _projection(fields: Optional[Sequence[str]]) -> dict:
+    if fields is None:
+        return {"_id": 0}
+    projection = {name: 1 for name in fields}
+    projection["_id"] = 0
+    return projection
+
+
+def keyset_filter(field: str, after: Keyset) -> dict:
+    """Query selecting documents after ``after`` in ``(field desc, id desc)`` order"""
+    sort_value, doc_id = after
+    return {
+        "$or": [
+            {field: {"$lt": sort_value}},
+            {field: sort_value, "id": {"$lt": doc_id}},
+        ]
+    }
+
+
+def keyset_sort(field: str) -> list:
+    """Sort specification matching ``keyset_filter`` and its compound index"""
+    return [(field, -1), ("id", -1)]
+
+
+async def _insert_many(collection, docs: List[dict]) -> InsertReport:
+    if not docs:
+        return 0, []
+    try:
+        result = await collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids), []
+    except BulkWriteError as e:
+        details = e.details
+        errors = [(err["index"], err.get("errmsg", "write error")) for err in details.get("writeErrors", [])]
+        return details.get("nInserted", 0), errors
+
+
+class MongoBlogPostRepository(BlogPostRepository):
+    """Posts plus tag counts, payloads and a change counter.
+
+    The change counter is bumped in a second round trip after each write,
+    so a crash in between hides that write from other processes until the
+    next one. The same update appends the post's id to the counter's
+    ``recent`` array, capped at ``CHANGE_LOG_SIZE``, so the log's last entry
+    is always the counter's current value.
+    """
+
+    def __init__(self, db):
+        self.collection = db.blog_posts
+        self.tag_stats = db.tag_stats
+        self.payloads = db.post_payloads
+        self.changes = db.change_counters
+
+    async def get(self, post_id, fields=None):
+        return await self.collection.find_one({"id": post_id}, _projection(fields))
+
+    def _query(self, published_only: bool, tag: Optional[str], after: Optional[Keyset]) -> dict:
+        query = {}
+        if published_only:
+            query["is_published"] = True
+        if tag is not None:
+            query["tags"] = tag
+        if after is not None:
+            query.update(keyset_filter("publish_date", after))
+        return query
+
+    async def list(self, published_only=True, tag=None, after=None, skip=0, limit=20, fields=None):
+        cursor = self.collection.find(self._query(published_only, tag, after), _projection(fields))
+        cursor = cursor.sort(keyset_sort("publish_date")).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def iter_all(self, published_only=False, fields=None) -> AsyncIterator[dict]:
+        cursor = self.collection.find(self._query(published_only, None, None), _projection(fields))
+        async for doc in cursor.sort(keyset_sort("publish_date")).batch_size(1000):
+            yield doc
+
+    async def count(self):
+        return await self.collection.count_documents({})
+
+    async def change_version(self):
+        counter = await self.changes.find_one({"_id": "blog_posts"})
+        return counter["value"] if counter else 0
+
+    async def changes_since(self, version):
+        counter = await self.changes.find_one({"_id": "blog_posts"}) or {}
+        current, recent = counter.get("value", 0), counter.get("recent", [])
+        missing = current - version
+        # A counter behind the version means the database was dropped since
+        if missing < 0 or missing > len(recent):
+            return current, None
+        changed = recent[len(recent) - missing:]
+        return current, None if None in changed else changed
+
+    async def _changed(self, post_id: Optional[str] = None):
+        await self.changes.update_one(
+            {"_id": "blog_posts"},
+            {"$inc": {"value": 1}, "$push": {"recent": {"$each": [post_id], "$slice": -CHANGE_LOG_SIZE}}},
+            upsert=True,
+        )
+
+    async def insert(self, doc):
+        await self.collection.insert_one(doc)
+        doc.pop("_id", None)
+        await self._changed(doc["id"])
+
+    async def insert_many(self, docs):
+        report = await _insert_many(self.collection, docs)
+        for doc in docs:
+            doc.pop("_id", None)
+        if report[0]:
+            await self._changed(docs[0]["id"] if len(docs) == 1 else None)
+        return report
+
+    async def update(self, post_id, changes, updated_at, expected_version=None) -> Optional[Tuple[dict, dict]]:
+        clauses = [{"id": post_id}]
+        if expected_version is not None:
+            clauses.append({"version": expected_version})
+        if changes:
+            # No-op updates match nothing and never write
+            clauses.append({"$or": [{field: {"$ne": value}} for field, value in changes.items()]})
+
+            # BEFORE gives the tag/search hooks both sides from one round trip;
+            # $set of top-level fields makes the after image exact
+            before = await self.collection.find_one_and_update(
+                {"$and": clauses},
+                {"$set": dict(changes, updated_at=updated_at), "$inc": {"version": 1}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if before is not None:
+                after = dict(before, **changes, updated_at=updated_at, version=before.get("version", 0) + 1)
+                await self.payloads.delete_one({"_id": post_id, "version": {"$lt": after["version"]}})
+                await self._changed(post_id)
+                return before, after
+
+        # Nothing matched: the post is missing, at another version, or unchanged
+        current = await self.collection.find_one({"id": post_id}, _projection(None))
+        if current is None:
+            return None
+        if expected_version is not None and current.get("version") != expected_version:
+            raise VersionConflict(current)
+        return current, current
+
+    async def backfill_versions(self):
+        result = await self.collection.update_many({"version": {"$exists": False}}, {"$set": {"version": 1}})
+        if result.modified_count:
+            await self._changed()
+        return result.modified_count
+
+    async def delete(self, post_id):
+        post = await self.collection.find_one_and_delete({"id": post_id}, projection={"_id": 0})
+        if post is not None:
+            await self.payloads.delete_one({"_id": post_id})
+            await self._changed(post_id)
+        return post
+
+    async def get_payload(self, post_id):
+        return await self.payloads.find_one({"_id": post_id}, {"_id": 0})
+
+    async def put_payload(self, payload):
+        try:
+            await self.payloads.replace_one(
+                {"_id": payload["id"], "version": {"$lt": payload["version"]}},
+                dict(payload, _id=payload["id"]),
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # A concurrent write already stored a newer version
+            pass
+
+    async def tag_counts(self):
+        cursor = self.tag_stats.find({"count": {"$gt": 0}}).sort([("count", -1), ("_id", 1)])
+        return [{"tag": item["_id"], "count": item["count"]} async for item in cursor]
+
+    async def increment_tags(self, delta: Dict[str, int]):
+        ops = [UpdateOne({"_id": tag}, {"$inc": {"count": change}}, upsert=True) for tag, change in delta.items()]
+        if not ops:
+            return
+        await self.tag_stats.bulk_write(ops, ordered=False)
+        if any(change < 0 for change in delta.values()):
+            await self.tag_stats.delete_many({"count": {"$lte": 0}})
+
+    async def replace_tag_counts(self, counts: Dict[str, int]):
+        ops = [UpdateOne({"_id": tag}, {"$set": {"count": count}}, upsert=True) for tag, count in counts.items()]
+        if ops:
+            await self.tag_stats.bulk_write(ops, ordered=False)
+        await self.tag_stats.delete_many({"_id": {"$nin": list(counts)}})
+
+    async def compute_tag_counts(self):
+        return {item["_id"]: item["count"] async for item in self.collection.aggregate(TAG_COUNT_PIPELINE)}
+
+
+class MongoContactSubmissionRepository(ContactSubmissionRepository):
+    """Submissions plus a contact_rollups counter collection.
+
+    Each write costs one extra round trip to bump its counters (a batch
+    shares one), and the two are not atomic: a crash in between, or a
+    failed bump, leaves the rollups off until ``manage.py
+    rebuild-contact-rollups`` runs. A failed bump is logged rather than
+    raised, since the submissions it counts are already stored and a
+    caller retrying them would store them twice.
+    """
+
+    def __init__(self, db):
+        self.collection = db.contact_submissions
+        self.rollup_counts = db.contact_rollups
+
+    async def get(self, submission_id, fields=None):
+        return await self.collection.find_one({"id": submission_id}, _projection(fields))
+
+    async def list(self, after=None, skip=0, limit=50, fields=None):
+        query = keyset_filter("submitted_at", after) if after is not None else {}
+        cursor = self.collection.find(query, _projection(fields))
+        cursor = cursor.sort(keyset_sort("submitted_at")).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def iter_all(self, fields=None) -> AsyncIterator[dict]:
+        cursor = self.collection.find({}, _projection(fields)).sort(keyset_sort("submitted_at"))
+        async for doc in cursor.batch_size(1000):
+            yield doc
+
+    async def _increment_rollups(self, delta: Dict[RollupKey, int]):
+        ops = [
+            UpdateOne(
+                {"granularity": granularity, "bucket": bucket, "status": status, "has_company": has_company},
+                {"$inc": {"count": change}},
+                upsert=True,
+            )
+            for (granularity, bucket, status, has_company), change in delta.items()
+        ]
+        if not ops:
+            return
+        try:
+            await self.rollup_counts.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Updating {len(ops)} contact rollup counters failed; "
+                         f"run manage.py rebuild-contact-rollups to repair them: {e}")
+
+    async def insert(self, doc):
+        await self.collection.insert_one(doc)
+        doc.pop("_id", None)
+        await self._increment_rollups(rollup_delta([], [doc]))
+
+    async def insert_many(self, docs):
+        report = await _insert_many(self.collection, docs)
+        for doc in docs:
+            doc.pop("_id", None)
+        failed = {index for index, _ in report[1]}
+        await self._increment_rollups(rollup_delta([], [doc for index, doc in enumerate(docs) if index not in failed]))
+        return report
+
+    async def set_status(self, submission_id, status):
+        previous = await self.collection.find_one_and_update(
+            {"id": submission_id, "status": {"$ne": status}},
+            {"$set": {"status": status}},
+            projection={"_id": 0, "submitted_at": 1, "status": 1, "company": 1},
+        )
+        if previous is None:
+            return False
+        await self._increment_rollups(rollup_delta([previous], [dict(previous, status=status)]))
+        return True
+
+    async def rollups(self, granularity, start, end):
+        cursor = self.rollup_counts.find(
+            {"granularity": granularity, "bucket": {"$gte": start, "$lt": end}, "count": {"$gt": 0}},
+            {"_id": 0, "bucket": 1, "status": 1, "has_company": 1, "count": 1},
+        ).sort("bucket", 1)
+        return await cursor.to_list(length=None)
+
+    async def replace_rollups(self, counts: Dict[RollupKey, int]):
+        # Tag this rebuild's rows so stale ones can be dropped without an empty window
+        rebuild = uuid.uuid4().hex
+        ops = [
+            UpdateOne(
+                {"granularity": granularity, "bucket": bucket, "status": status, "has_company": has_company},
+                {"$set": {"count": count, "rebuild": rebuild}},
+                upsert=True,
+            )
+            for (granularity, bucket, status, has_company), count in counts.items()
+        ]
+        for start in range(0, len(ops), 1000):
+            await self.rollup_counts.bulk_write(ops[start:start + 1000], ordered=False)
+        await self.rollup_counts.delete_many({"rebuild": {"$ne": rebuild}})
+
+    async def compute_rollups(self):
+        counts: Counter = Counter()
+        async for item in self.collection.aggregate(ROLLUP_PIPELINE):
+            key = item["_id"]
+            for granularity in ROLLUP_GRANULARITIES:
+                counts[(granularity, rollup_bucket(key["hour"], granularity), key["status"], key["has_company"])] += item["count"]
+        return dict(counts)
+
+
+class MongoEmailOutboxRepository(EmailOutboxRepository):
+    def __init__(self, db):
+        self.collection = db.email_outbox
+
+    async def insert(self, entry):
+        await self.collection.insert_one(entry)
+        entry.pop("_id", None)
+
+    async def claim(self, now, locked_until):
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                # Recover entries whose worker died mid-send
+                {"status": "sending", "locked_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": "sending", "locked_until": locked_until, "updated_at": now}},
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def update(self, entry_id, changes):
+        await self.collection.update_one({"id": entry_id}, {"$set": changes})
+
+    async def status_counts(self):
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        return {item["_id"]: item["count"] async for item in self.collection.aggregate(pipeline)}
+
+
+def _expiry(timestamp: float) -> datetime:
+    # TTL indexes need a BSON date; naive UTC like every other stored datetime
+    return datetime.utcfromtimestamp(timestamp)
+
+
+class MongoAdmissionRepository(AdmissionRepository):
+    """Buckets and idempotency keys in TTL collections, shared by all workers.
+
+    Buckets use optimistic read-modify-write: a rejected request costs one
+    read, an admitted one a read and a conditional write.
+    """
+
+    def __init__(self, db):
+        self.buckets = db.rate_limits
+        self.idempotency = db.idempotency_keys
+
+    async def _take(self, key: str, bucket: Optional[dict], tokens: float, rate: float, burst: int,
+                    now: float) -> bool:
+        """Conditionally write ``bucket`` back with one token spent; False if it changed meanwhile"""
+        # Once refilled the bucket is the same as a missing one, so let it expire
+        changes = {"tokens": tokens - 1, "updated": now, "expires_at": _expiry(now + (burst - tokens + 1) / rate)}
+        if bucket is None:
+            try:
+                await self.buckets.insert_one({"_id": key, **changes})
+                return True
+            except DuplicateKeyError:
+                return False
+        result = await self.buckets.update_one(
+            {"_id": key, "tokens": bucket["tokens"], "updated": bucket["updated"]},
+            {"$set": changes},
+        )
+        return bool(result.matched_count)
+
+    async def take_tokens(self, keys, rate, burst, now):
+        pending = list(keys)
+        while pending:
+            buckets = {bucket["_id"]: bucket async for bucket in self.buckets.find({"_id": {"$in": pending}})}
+            levels = {
+                key: burst if key not in buckets else min(burst, buckets[key]["tokens"] + (now - buckets[key]["updated"]) * rate)
+                for key in pending
+            }
+            wait = max(((1 - tokens) / rate for tokens in levels.values() if tokens < 1), default=0.0)
+            if wait:
+                # Past the first pass, only a concurrent request emptied the bucket
+                # after this one took from the others; that token is not returned
+                return wait
+            taken = []
+            for key in pending:
+                if not await self._take(key, buckets.get(key), levels[key], rate, burst, now):
+                    break
+                taken.append(key)
+            # Buckets that changed under a conditional write are read again
+            pending = [key for key in pending if key not in taken]
+        return 0.0
+
+    async def reserve_idempotency_key(self, key, submission_id, fingerprint, now, ttl):
+        claim = {"submission_id": submission_id, "fingerprint": fingerprint, "expires_at": _expiry(now + ttl)}
+        while True:
+            try:
+                await self.idempotency.insert_one({"_id": key, **claim})
+                return None
+            except DuplicateKeyError:
+                pass
+            existing = await self.idempotency.find_one({"_id": key})
+            if existing is None:
+                # Released or expired since the insert
+                continue
+            if existing["expires_at"] > _expiry(now):
+                return existing["submission_id"], existing.get("fingerprint", "")
+            # The TTL monitor only runs about once a minute; a lapsed key is free
+            result = await self.idempotency.update_one(
+                {"_id": key, "expires_at": existing["expires_at"]}, {"$set": claim}
+            )
+            if result.matched_count:
+                return None
+
+    async def release_idempotency_key(self, key, submission_id):
+        await self.idempotency.delete_one({"_id": key, "submission_id": submission_id})
+
+
+def _indexes(*specs: Tuple[str, list, dict]):
+    """Migration step building ``(collection, keys, options)`` indexes concurrently"""
+    async def step(storage: "MongoStorage"):
+        await asyncio.gather(*(
+            storage.db[collection].create_index(keys, **options) for collection, keys, options in specs
+        ))
+    return step
+
+
+async def _backfill_versions(storage: "MongoStorage"):
+    await storage.posts.backfill_versions()
+
+
+async def _backfill_rollups(storage: "MongoStorage"):
+    # Runs under the migration lock, so no worker is incrementing the counters
+    # meanwhile; submissions stored by workers still on the previous release
+    # are not counted until `manage.py rebuild-contact-rollups` runs after the rollout
+    await _indexes(
+        ("contact_rollups", [("granularity", 1), ("bucket", 1), ("status", 1), ("has_company", 1)], {"unique": True}),
+    )(storage)
+    await storage.submissions.replace_rollups(await storage.submissions.compute_rollups())
+
+
+# Append new migrations at the end; never edit one that has been applied
+MIGRATIONS = (
+    (1, "initial indexes", _indexes(
+        ("blog_posts", [("id", 1)], {"unique": True}),
+        ("blog_posts", [("publish_date", -1)], {}),
+        ("blog_posts", [("tags", 1)], {}),
+        ("blog_posts", [("is_published", 1)], {}),
+        # Keyset pagination: (publish_date, id) with and without the published filter
+        ("blog_posts", [("publish_date", -1), ("id", -1)], {}),
+        ("blog_posts", [("is_published", 1), ("publish_date", -1), ("id", -1)], {}),
+        ("contact_submissions", [("id", 1)], {"unique": True}),
+        ("contact_submissions", [("submitted_at", -1)], {}),
+        ("contact_submissions", [("submitted_at", -1), ("id", -1)], {}),
+        ("tag_stats", [("count", -1)], {}),
+        ("email_outbox", [("id", 1)], {"unique": True}),
+        ("email_outbox", [("status", 1), ("next_attempt_at", 1)], {}),
+        ("rate_limits", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+        ("idempotency_keys", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    )),
+    (2, "post versions", _backfill_versions),
+    (3, "contact rollups", _backfill_rollups),
+)
+
+
+class MongoStorage(Storage):
+    """MongoDB through Motor; the default backend"""
+
+    migrations = MIGRATIONS
+
+    def __init__(self, mongo_url: str, db_name: str, **client_options):
+        self.client = AsyncIOMotorClient(mongo_url, **client_options)
+        self.db = self.client[db_name]
+        self.posts = MongoBlogPostRepository(self.db)
+        self.submissions = MongoContactSubmissionRepository(self.db)
+        self.outbox = MongoEmailOutboxRepository(self.db)
+        self.admission = MongoAdmissionRepository(self.db)
+
+    # A holder that died mid-migration gives the lock up after this long
+    MIGRATION_LOCK_SECONDS = 600.0
+
+    async def ping(self):
+        await self.db.command("ping")
+
+    @asynccontextmanager
+    async def migration_lock(self):
+        locks = self.db.migration_locks
+        owner = uuid.uuid4().hex
+        while True:
+            now = datetime.utcnow()
+            lease = {"owner": owner, "expires_at": now + timedelta(seconds=self.MIGRATION_LOCK_SECONDS)}
+            try:
+                await locks.insert_one({"_id": "migrate", **lease})
+                break
+            except DuplicateKeyError:
+                result = await locks.update_one({"_id": "migrate", "expires_at": {"$lte": now}}, {"$set": lease})
+                if result.matched_count:
+                    break
+            await asyncio.sleep(0.5)
+        try:
+            yield
+        finally:
+            await locks.delete_one({"_id": "migrate", "owner": owner})
+
+    async def applied_migrations(self):
+        return {doc["_id"] async for doc in self.db.schema_migrations.find({}, {"_id": 1})}
+
+    async def record_migration(self, version, name):
+        await self.db.schema_migrations.update_one(
+            {"_id": version}, {"$setOnInsert": {"name": name, "applied_at": datetime.utcnow()}}, upsert=True
+        )
+
+    async def drop(self):
+        await self.client.drop_database(self.db.name)
+
+    def close(self):
+        self.client.close()
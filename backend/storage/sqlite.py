@@ -0,0 +1,827 @@
+import asyncio
+import bisect
+import functools
+import json
+import sqlite3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from storage.base import (
+    CHANGE_LOG_SIZE,
+    ROLLUP_GRANULARITIES,
+    AdmissionRepository,
+    BlogPostRepository,
+    ContactSubmissionRepository,
+    EmailOutboxRepository,
+    Keyset,
+    RollupKey,
+    Storage,
+    VersionConflict,
+    rollup_bucket,
+    rollup_delta,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blog_posts (
+    id TEXT PRIMARY KEY,
+    publish_date TEXT NOT NULL,
+    is_published INTEGER NOT NULL,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_payloads (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    identity BLOB NOT NULL,
+    gzip BLOB,
+    br BLOB
+);
+CREATE TABLE IF NOT EXISTS tag_stats (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contact_submissions (
+    id TEXT PRIMARY KEY,
+    submitted_at TEXT NOT NULL,
+    status TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contact_rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    status TEXT NOT NULL,
+    has_company INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, status, has_company)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    next_attempt_at TEXT,
+    locked_until TEXT,
+    doc TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    submission_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL DEFAULT '',
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS change_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS post_changes (
+    version INTEGER PRIMARY KEY,
+    post_id TEXT
+);
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+"""
+
+# The Mongo indexes, translated; "id" uniqueness is each table's primary key
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_blog_posts_publish_date ON blog_posts (publish_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_blog_posts_published ON blog_posts (is_published, publish_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_tag_stats_count ON tag_stats (count DESC);
+CREATE INDEX IF NOT EXISTS idx_contact_submissions_submitted_at ON contact_submissions (submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_rate_limits_expires_at ON rate_limits (expires_at);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+"""
+
+
+def _sort_key(value: Optional[datetime]) -> Optional[str]:
+    """Fixed-width, millisecond ISO string that sorts like the datetime"""
+    return value.isoformat(timespec="milliseconds") if value is not None else None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        # Millisecond precision, like BSON dates
+        return {"$date": _sort_key(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _object_hook(obj: dict):
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def _encode(doc: dict) -> str:
+    return json.dumps(doc, default=_default, separators=(",", ":"))
+
+
+def _decode(raw: str) -> dict:
+    return json.loads(raw, object_hook=_object_hook)
+
+
+def _select(doc: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Copy of ``doc`` limited to ``fields``; lists are copied so callers can't mutate the hot set"""
+    keys = doc.keys() if fields is None else [name for name in fields if name in doc]
+    return {key: list(doc[key]) if isinstance(doc[key], list) else doc[key] for key in keys}
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _changed(conn: sqlite3.Connection, name: str) -> int:
+    """Bump a change counter and return its new value; call inside the transaction making the change"""
+    conn.execute(
+        "INSERT INTO change_counters (name, value) VALUES (?, 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+    return _counter(conn, name)
+
+
+def _post_changed(conn: sqlite3.Connection, post_id: Optional[str]) -> int:
+    """Bump the posts' change counter and log which post changed; None for a bulk write"""
+    version = _changed(conn, "blog_posts")
+    conn.execute("INSERT OR REPLACE INTO post_changes (version, post_id) VALUES (?, ?)", (version, post_id))
+    conn.execute("DELETE FROM post_changes WHERE version <= ?", (version - CHANGE_LOG_SIZE,))
+    return version
+
+
+def _counter(conn: sqlite3.Connection, name: str) -> int:
+    row = conn.execute("SELECT value FROM change_counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+class _Database:
+    """A connection plus the one thread its statements run on.
+
+    Nothing runs on the event loop: a commit can wait up to
+    ``busy_timeout`` for another process's write lock, and the loop must
+    keep serving requests meanwhile. One thread also serializes this
+    process's transactions on the shared connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("PRAGMA busy_timeout = 5000")
+        self.conn.executescript(SCHEMA)
+        # A second connection only for PRAGMA data_version, which changes when
+        # any other connection commits; an in-memory database has no others
+        self.probe = None
+        if path not in ("", ":memory:"):
+            self.probe = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.probe is not None:
+            self.probe.close()
+        self.conn.close()
+
+
+def _threaded(method):
+    """Make a blocking repository method a coroutine running on the database thread"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self.db.run(method, self, *args, **kwargs)
+    return wrapper
+
+
+class SQLiteBlogPostRepository(BlogPostRepository):
+    """Posts persisted in SQLite and served from an in-memory hot set.
+
+    The whole collection is loaded at startup and kept ordered by
+    ``(publish_date, id)``, so reads don't run statements. Before each read
+    ``PRAGMA data_version`` says whether any other connection committed
+    since the last check; if so and the change counter moved past what the
+    hot set holds, another process wrote posts and the hot set is reloaded.
+    Writes read the row they change inside their own transaction, never
+    from the hot set, so they can't act on a stale copy.
+    """
+
+    def __init__(self, db: _Database):
+        self.db = db
+        self.conn = db.conn
+        self._reloading = asyncio.Lock()
+        self._data_version = self._read_data_version()
+        self._install(*self._load())
+
+    def _load(self) -> Tuple[List[dict], int]:
+        """Every post and the change counter, read in one transaction"""
+        self.conn.execute("BEGIN")
+        try:
+            docs = [_decode(raw) for (raw,) in self.conn.execute("SELECT doc FROM blog_posts").fetchall()]
+            return docs, _counter(self.conn, "blog_posts")
+        finally:
+            self.conn.execute("COMMIT")
+
+    def _install(self, docs: List[dict], version: int):
+        self._docs: Dict[str, dict] = {doc["id"]: doc for doc in docs}
+        self._order: List[Tuple[datetime, str]] = sorted((doc["publish_date"], doc["id"]) for doc in docs)
+        self._version = version
+
+    def _read_data_version(self) -> Optional[int]:
+        if self.db.probe is None:
+            return None
+        try:
+            return self.db.probe.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return None
+
+    async def _revalidate(self):
+        """Reload the hot set if another process changed the posts since the last read"""
+        if self.db.probe is None or self._read_data_version() == self._data_version:
+            return
+        async with self._reloading:
+            data_version = self._read_data_version()
+            if data_version == self._data_version:
+                return
+            if await self.db.run(_counter, self.conn, "blog_posts") != self._version:
+                self._install(*await self.db.run(self._load))
+            self._data_version = data_version
+
+    def _written(self, version: int):
+        """Account for a write this process committed and applied to the hot set"""
+        if version == self._version + 1:
+            self._version = version
+        # Otherwise another process wrote in between and the next read reloads
+
+    def _iter_ordered(self, published_only: bool, tag: Optional[str], after: Optional[Keyset]):
+        end = bisect.bisect_left(self._order, after) if after is not None else len(self._order)
+        for i in range(end - 1, -1, -1):
+            doc = self._docs[self._order[i][1]]
+            if published_only and not doc.get("is_published"):
+                continue
+            if tag is not None and tag not in doc.get("tags", ()):
+                continue
+            yield doc
+
+    async def get(self, post_id, fields=None):
+        await self._revalidate()
+        doc = self._docs.get(post_id)
+        return _select(doc, fields) if doc is not None else None
+
+    async def list(self, published_only=True, tag=None, after=None, skip=0, limit=20, fields=None):
+        await self._revalidate()
+        docs = []
+        for doc in self._iter_ordered(published_only, tag, after):
+            if skip:
+                skip -= 1
+                continue
+            if len(docs) >= limit:
+                break
+            docs.append(_select(doc, fields))
+        return docs
+
+    async def iter_all(self, published_only=False, fields=None) -> AsyncIterator[dict]:
+        await self._revalidate()
+        for i, doc in enumerate(list(self._iter_ordered(published_only, None, None))):
+            yield _select(doc, fields)
+            if i % 500 == 499:
+                await asyncio.sleep(0)
+
+    async def count(self):
+        await self._revalidate()
+        return len(self._docs)
+
+    async def change_version(self):
+        return await self.db.run(_counter, self.conn, "blog_posts")
+
+    @_threaded
+    def changes_since(self, version):
+        self.conn.execute("BEGIN")
+        try:
+            current = _counter(self.conn, "blog_posts")
+            rows = self.conn.execute(
+                "SELECT post_id FROM post_changes WHERE version > ? AND version <= ? ORDER BY version",
+                (version, current),
+            ).fetchall()
+        finally:
+            self.conn.execute("COMMIT")
+        # Missing rows were pruned or predate the log
+        if len(rows) != current - version or any(post_id is None for (post_id,) in rows):
+            return current, None
+        return current, [post_id for (post_id,) in rows]
+
+    def _store(self, doc: dict) -> dict:
+        # Round trip so the hot set holds exactly what a cold load would
+        stored = _decode(_encode(doc))
+        current = self._docs.get(stored["id"])
+        if current is not None:
+            if current.get("version", 0) > stored.get("version", 0):
+                # A reload while the write was in flight already has a newer copy
+                return current
+            self._unstore(stored["id"])
+        self._docs[stored["id"]] = stored
+        bisect.insort(self._order, (stored["publish_date"], stored["id"]))
+        return stored
+
+    def _insert_row(self, doc: dict):
+        self.conn.execute(
+            "INSERT INTO blog_posts (id, publish_date, is_published, doc) VALUES (?, ?, ?, ?)",
+            (doc["id"], _sort_key(doc["publish_date"]), int(bool(doc.get("is_published"))), _encode(doc)),
+        )
+
+    def _insert_rows(self, docs: List[dict], stop_on_error: bool):
+        inserted, errors = [], []
+        with _transaction(self.conn):
+            for index, doc in enumerate(docs):
+                try:
+                    self._insert_row(doc)
+                    inserted.append(doc)
+                except sqlite3.IntegrityError as e:
+                    if stop_on_error:
+                        raise
+                    errors.append((index, f"duplicate key: {e}"))
+            version = _post_changed(self.conn, inserted[0]["id"] if len(docs) == 1 else None) if inserted else None
+        return inserted, errors, version
+
+    async def insert(self, doc):
+        _, _, version = await self.db.run(self._insert_rows, [doc], True)
+        self._store(doc)
+        self._written(version)
+
+    async def insert_many(self, docs):
+        inserted, errors, version = await self.db.run(self._insert_rows, docs, False)
+        for doc in inserted:
+            self._store(doc)
+        if version is not None:
+            self._written(version)
+        return len(inserted), errors
+
+    def _unstore(self, post_id: str) -> Optional[dict]:
+        doc = self._docs.pop(post_id, None)
+        if doc is not None:
+            del self._order[bisect.bisect_left(self._order, (doc["publish_date"], post_id))]
+        return doc
+
+    def _update_row(self, post_id: str, changes: dict, updated_at: datetime, expected_version: Optional[int]):
+        with _transaction(self.conn):
+            row = self.conn.execute("SELECT doc FROM blog_posts WHERE id = ?", (post_id,)).fetchone()
+            if row is None:
+                return None
+            before = _decode(row[0])
+            if expected_version is not None and before.get("version") != expected_version:
+                raise VersionConflict(before)
+            if all(before.get(field) == value for field, value in changes.items()):
+                return before, None, None
+            after = {**before, **changes, "updated_at": updated_at, "version": before.get("version", 0) + 1}
+            self.conn.execute(
+                "UPDATE blog_posts SET publish_date = ?, is_published = ?, doc = ? WHERE id = ?",
+                (_sort_key(after["publish_date"]), int(bool(after.get("is_published"))), _encode(after), post_id),
+            )
+            self.conn.execute("DELETE FROM post_payloads WHERE id = ? AND version < ?", (post_id, after["version"]))
+            return before, after, _post_changed(self.conn, post_id)
+
+    async def update(self, post_id, changes, updated_at, expected_version=None):
+        result = await self.db.run(self._update_row, post_id, changes, updated_at, expected_version)
+        if result is None:
+            return None
+        before, after, version = result
+        if after is None:
+            return before, _select(before, None)
+        stored = self._store(after)
+        self._written(version)
+        return before, _select(stored, None)
+
+    def _backfill_rows(self) -> int:
+        with _transaction(self.conn):
+            legacy = [doc for doc in (_decode(raw) for (raw,) in self.conn.execute("SELECT doc FROM blog_posts").fetchall())
+                      if "version" not in doc]
+            for doc in legacy:
+                doc["version"] = 1
+                self.conn.execute("UPDATE blog_posts SET doc = ? WHERE id = ?", (_encode(doc), doc["id"]))
+            if legacy:
+                _post_changed(self.conn, None)
+        return len(legacy)
+
+    async def backfill_versions(self):
+        backfilled = await self.db.run(self._backfill_rows)
+        if backfilled:
+            self._install(*await self.db.run(self._load))
+        return backfilled
+
+    def _delete_row(self, post_id: str):
+        with _transaction(self.conn):
+            row = self.conn.execute("SELECT doc FROM blog_posts WHERE id = ?", (post_id,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("DELETE FROM blog_posts WHERE id = ?", (post_id,))
+            self.conn.execute("DELETE FROM post_payloads WHERE id = ?", (post_id,))
+            return _decode(row[0]), _post_changed(self.conn, post_id)
+
+    async def delete(self, post_id):
+        result = await self.db.run(self._delete_row, post_id)
+        if result is None:
+            return None
+        doc, version = result
+        self._unstore(post_id)
+        self._written(version)
+        return doc
+
+    @_threaded
+    def get_payload(self, post_id):
+        row = self.conn.execute(
+            "SELECT version, updated_at, identity, gzip, br FROM post_payloads WHERE id = ?", (post_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        version, updated_at, identity, gzip, br = row
+        payload = {"id": post_id, "version": version, "updated_at": datetime.fromisoformat(updated_at), "identity": identity}
+        payload.update((name, body) for name, body in (("gzip", gzip), ("br", br)) if body is not None)
+        return payload
+
+    @_threaded
+    def put_payload(self, payload):
+        with _transaction(self.conn):
+            self.conn.execute(
+                "INSERT INTO post_payloads (id, version, updated_at, identity, gzip, br) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET version = excluded.version, updated_at = excluded.updated_at, "
+                "identity = excluded.identity, gzip = excluded.gzip, br = excluded.br "
+                "WHERE excluded.version > post_payloads.version",
+                (payload["id"], payload["version"], _sort_key(payload["updated_at"]),
+                 payload["identity"], payload.get("gzip"), payload.get("br")),
+            )
+
+    @_threaded
+    def tag_counts(self):
+        rows = self.conn.execute("SELECT tag, count FROM tag_stats WHERE count > 0 ORDER BY count DESC, tag")
+        return [{"tag": tag, "count": count} for tag, count in rows]
+
+    @_threaded
+    def increment_tags(self, delta):
+        if not delta:
+            return
+        with _transaction(self.conn):
+            self.conn.executemany(
+                "INSERT INTO tag_stats (tag, count) VALUES (?, ?) "
+                "ON CONFLICT (tag) DO UPDATE SET count = count + excluded.count",
+                list(delta.items()),
+            )
+            self.conn.execute("DELETE FROM tag_stats WHERE count <= 0")
+
+    @_threaded
+    def replace_tag_counts(self, counts):
+        with _transaction(self.conn):
+            self.conn.execute("DELETE FROM tag_stats")
+            self.conn.executemany("INSERT INTO tag_stats (tag, count) VALUES (?, ?)", list(counts.items()))
+
+    async def compute_tag_counts(self):
+        await self._revalidate()
+        counts = Counter()
+        for doc in self._docs.values():
+            if doc.get("is_published"):
+                counts.update(doc.get("tags") or [])
+        return dict(counts)
+
+
+class SQLiteContactSubmissionRepository(ContactSubmissionRepository):
+    """Submissions stay on disk; lists walk the (submitted_at, id) index.
+
+    Rollup counters are updated in the same transaction as the rows they count.
+    """
+
+    def __init__(self, db: _Database):
+        self.db = db
+        self.conn = db.conn
+
+    @_threaded
+    def get(self, submission_id, fields=None):
+        row = self.conn.execute("SELECT doc FROM contact_submissions WHERE id = ?", (submission_id,)).fetchone()
+        return _select(_decode(row[0]), fields) if row else None
+
+    @_threaded
+    def list(self, after=None, skip=0, limit=50, fields=None):
+        if after is not None:
+            rows = self.conn.execute(
+                "SELECT doc FROM contact_submissions WHERE (submitted_at, id) < (?, ?) "
+                "ORDER BY submitted_at DESC, id DESC LIMIT ? OFFSET ?",
+                (_sort_key(after[0]), after[1], limit, skip),
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT doc FROM contact_submissions ORDER BY submitted_at DESC, id DESC LIMIT ? OFFSET ?",
+                (limit, skip),
+            )
+        return [_select(_decode(raw), fields) for (raw,) in rows.fetchall()]
+
+    async def iter_all(self, fields=None) -> AsyncIterator[dict]:
+        after = None
+        while True:
+            page = await self.list(after=after, limit=1000)
+            for doc in page:
+                yield _select(doc, fields)
+            if len(page) < 1000:
+                return
+            after = (page[-1]["submitted_at"], page[-1]["id"])
+
+    def _insert_row(self, doc: dict):
+        self.conn.execute(
+            "INSERT INTO contact_submissions (id, submitted_at, status, doc) VALUES (?, ?, ?, ?)",
+            (doc["id"], _sort_key(doc["submitted_at"]), doc.get("status"), _encode(doc)),
+        )
+
+    def _increment_rollups(self, delta: Dict[RollupKey, int]):
+        self.conn.executemany(
+            "INSERT INTO contact_rollups (granularity, bucket, status, has_company, count) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (granularity, bucket, status, has_company) DO UPDATE SET count = count + excluded.count",
+            [
+                (granularity, _sort_key(bucket), status, int(has_company), change)
+                for (granularity, bucket, status, has_company), change in delta.items()
+            ],
+        )
+
+    @_threaded
+    def insert(self, doc):
+        with _transaction(self.conn):
+            self._insert_row(doc)
+            self._increment_rollups(rollup_delta([], [doc]))
+
+    @_threaded
+    def insert_many(self, docs):
+        inserted, errors = [], []
+        with _transaction(self.conn):
+            for index, doc in enumerate(docs):
+                try:
+                    self._insert_row(doc)
+                    inserted.append(doc)
+                except sqlite3.IntegrityError as e:
+                    errors.append((index, f"duplicate key: {e}"))
+            self._increment_rollups(rollup_delta([], inserted))
+        return len(inserted), errors
+
+    @_threaded
+    def set_status(self, submission_id, status):
+        with _transaction(self.conn):
+            row = self.conn.execute(
+                "SELECT submitted_at, status, json_extract(doc, '$.company') FROM contact_submissions "
+                "WHERE id = ? AND status IS NOT ?",
+                (submission_id, status),
+            ).fetchone()
+            if row is None:
+                return False
+            self.conn.execute(
+                "UPDATE contact_submissions SET status = ?, doc = json_set(doc, '$.status', ?) WHERE id = ?",
+                (status, status, submission_id),
+            )
+            previous = {"submitted_at": datetime.fromisoformat(row[0]), "status": row[1], "company": row[2]}
+            self._increment_rollups(rollup_delta([previous], [dict(previous, status=status)]))
+        return True
+
+    @_threaded
+    def rollups(self, granularity, start, end):
+        rows = self.conn.execute(
+            "SELECT bucket, status, has_company, count FROM contact_rollups "
+            "WHERE granularity = ? AND bucket >= ? AND bucket < ? AND count > 0 ORDER BY bucket",
+            (granularity, _sort_key(start), _sort_key(end)),
+        )
+        return [
+            {"bucket": datetime.fromisoformat(bucket), "status": status, "has_company": bool(has_company), "count": count}
+            for bucket, status, has_company, count in rows
+        ]
+
+    @_threaded
+    def replace_rollups(self, counts: Dict[RollupKey, int]):
+        with _transaction(self.conn):
+            self.conn.execute("DELETE FROM contact_rollups")
+            self._increment_rollups(counts)
+
+    def _recount_rollups(self):
+        # Counted and replaced under one write lock, so no insert lands in between
+        with _transaction(self.conn):
+            counts = self._compute_rollups()
+            self.conn.execute("DELETE FROM contact_rollups")
+            self._increment_rollups(counts)
+
+    @_threaded
+    def compute_rollups(self):
+        return self._compute_rollups()
+
+    def _compute_rollups(self) -> Dict[RollupKey, int]:
+        # submitted_at sort keys start with "YYYY-MM-DDTHH", so hours group on a prefix
+        rows = self.conn.execute(
+            "SELECT substr(submitted_at, 1, 13), status, COALESCE(json_extract(doc, '$.company'), '') != '', "
+            "COUNT(*) FROM contact_submissions GROUP BY 1, 2, 3"
+        )
+        counts: Counter = Counter()
+        for hour, status, has_company, count in rows:
+            start = datetime.fromisoformat(hour + ":00")
+            for granularity in ROLLUP_GRANULARITIES:
+                counts[(granularity, rollup_bucket(start, granularity), status, bool(has_company))] += count
+        return dict(counts)
+
+
+class SQLiteEmailOutboxRepository(EmailOutboxRepository):
+    def __init__(self, db: _Database):
+        self.db = db
+        self.conn = db.conn
+
+    def _write(self, entry: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO email_outbox (id, status, next_attempt_at, locked_until, doc) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (entry["id"], entry["status"], _sort_key(entry.get("next_attempt_at")),
+             _sort_key(entry.get("locked_until")), _encode(entry)),
+        )
+
+    @_threaded
+    def insert(self, entry):
+        with _transaction(self.conn):
+            self._write(entry)
+
+    @_threaded
+    def claim(self, now, locked_until):
+        key = _sort_key(now)
+        with _transaction(self.conn):
+            row = self.conn.execute(
+                "SELECT doc FROM email_outbox "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND locked_until <= ?) "
+                "ORDER BY next_attempt_at LIMIT 1",
+                (key, key),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = _decode(row[0])
+            entry.update(status="sending", locked_until=locked_until, updated_at=now)
+            self._write(entry)
+        return entry
+
+    @_threaded
+    def update(self, entry_id, changes):
+        with _transaction(self.conn):
+            row = self.conn.execute("SELECT doc FROM email_outbox WHERE id = ?", (entry_id,)).fetchone()
+            if row is not None:
+                entry = _decode(row[0])
+                entry.update(changes)
+                self._write(entry)
+
+    @_threaded
+    def status_counts(self):
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+        return {status: count for status, count in rows}
+
+
+class SQLiteAdmissionRepository(AdmissionRepository):
+    """Buckets and idempotency keys for workers sharing one database file"""
+
+    # Expired rows are swept about as often as Mongo's TTL monitor runs
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, db: _Database):
+        self.db = db
+        self.conn = db.conn
+        self._next_purge = 0.0
+
+    def _purge(self, now: float):
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.PURGE_INTERVAL
+        self.conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        self.conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+
+    @_threaded
+    def take_tokens(self, keys, rate, burst, now):
+        with _transaction(self.conn):
+            self._purge(now)
+            levels = {}
+            for key in keys:
+                row = self.conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+                levels[key] = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = max(((1 - tokens) / rate for tokens in levels.values() if tokens < 1), default=0.0)
+            if wait:
+                return wait
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rate_limits (key, tokens, updated, expires_at) VALUES (?, ?, ?, ?)",
+                [(key, tokens - 1, now, now + (burst - tokens + 1) / rate) for key, tokens in levels.items()],
+            )
+        return 0.0
+
+    @_threaded
+    def reserve_idempotency_key(self, key, submission_id, fingerprint, now, ttl):
+        with _transaction(self.conn):
+            row = self.conn.execute(
+                "SELECT submission_id, fingerprint FROM idempotency_keys WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                return row[0], row[1]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO idempotency_keys (key, submission_id, fingerprint, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, submission_id, fingerprint, now + ttl),
+            )
+        return None
+
+    @_threaded
+    def release_idempotency_key(self, key, submission_id):
+        with _transaction(self.conn):
+            self.conn.execute(
+                "DELETE FROM idempotency_keys WHERE key = ? AND submission_id = ?", (key, submission_id)
+            )
+
+
+async def _create_indexes(storage: "SQLiteStorage"):
+    await storage.db.run(storage.conn.executescript, INDEXES)
+
+
+async def _backfill_versions(storage: "SQLiteStorage"):
+    await storage.posts.backfill_versions()
+
+
+async def _backfill_rollups(storage: "SQLiteStorage"):
+    await storage.db.run(storage.submissions._recount_rollups)
+
+
+def _add_idempotency_fingerprints(conn: sqlite3.Connection):
+    # Tables created since have the column already
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(idempotency_keys)").fetchall()}
+    if "fingerprint" not in columns:
+        conn.execute("ALTER TABLE idempotency_keys ADD COLUMN fingerprint TEXT NOT NULL DEFAULT ''")
+
+
+async def _idempotency_fingerprints(storage: "SQLiteStorage"):
+    await storage.db.run(_add_idempotency_fingerprints, storage.conn)
+
+
+# Append new migrations at the end; never edit one that has been applied
+MIGRATIONS = (
+    (1, "initial indexes", _create_indexes),
+    (2, "post versions", _backfill_versions),
+    (3, "contact rollups", _backfill_rollups),
+    (4, "idempotency fingerprints", _idempotency_fingerprints),
+)
+
+
+class SQLiteStorage(Storage):
+    """Embedded single-node backend: SQLite in WAL mode plus an in-memory hot set.
+
+    Statements run on one dedicated thread, off the event loop. With WAL
+    and ``synchronous=NORMAL`` a commit doesn't fsync, so most are a local
+    B-tree operation of a few microseconds; the thread is there for the
+    ones that wait on another process's write lock. Several workers may
+    share the file: the post hot set revalidates against their writes.
+    """
+
+    migrations = MIGRATIONS
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = _Database(path)
+        self.conn = self.db.conn
+        self.posts = SQLiteBlogPostRepository(self.db)
+        self.submissions = SQLiteContactSubmissionRepository(self.db)
+        self.outbox = SQLiteEmailOutboxRepository(self.db)
+        self.admission = SQLiteAdmissionRepository(self.db)
+
+    @_threaded
+    def ping(self):
+        self.conn.execute("SELECT 1").fetchone()
+
+    @_threaded
+    def applied_migrations(self):
+        return {version for (version,) in self.conn.execute("SELECT version FROM schema_migrations")}
+
+    @_threaded
+    def record_migration(self, version, name):
+        with _transaction(self.conn):
+            self.conn.execute(
+                "INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, _sort_key(datetime.utcnow())),
+            )
+
+    def _delete_all(self):
+        with _transaction(self.conn):
+            for table in ("blog_posts", "post_payloads", "tag_stats", "contact_submissions", "contact_rollups",
+                          "email_outbox", "rate_limits", "idempotency_keys"):
+                self.conn.execute(f"DELETE FROM {table}")
+            _post_changed(self.conn, None)
+
+    async def drop(self):
+        await self.db.run(self._delete_all)
+        self.posts._install(*await self.db.run(self.posts._load))
+
+    def close(self):
+        self.db.close()
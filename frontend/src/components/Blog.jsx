@@ -6,6 +6,7 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const Blog = () => {
   const [blogPosts, setBlogPosts] = useState([]);
   const [selectedPost, setSelectedPost] = useState(null);
+  const [relatedPosts, setRelatedPosts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [isVisible, setIsVisible] = useState(false);
 
@@ -27,11 +28,20 @@ const Blog = () => {
   };
 
   const openPost = async (postId) => {
+    setRelatedPosts([]);
     try {
       const response = await axios.get(`${BACKEND_URL}/api/blog/posts/${postId}`);
       setSelectedPost(response.data);
     } catch (error) {
       console.error("Error loading blog post:", error);
+      return;
+    }
+    try {
+      const response = await axios.get(`${BACKEND_URL}/api/blog/posts/${postId}/related`, { params: { limit: 3 } });
+      setRelatedPosts(response.data);
+    } catch (error) {
+      // Related posts are optional; the post itself is already shown
+      console.error("Error loading related posts:", error);
     }
   };
 
@@ -265,6 +275,33 @@ const Blog = () => {
                 className="prose prose-lg max-w-none text-muted-foreground leading-relaxed"
                 dangerouslySetInnerHTML={{ __html: selectedPost.content }}
               />
+
+              {relatedPosts.length > 0 && (
+                <div className="mt-12 pt-8 border-t border-border">
+                  <h2 className="text-2xl font-bold text-foreground mb-6">Keep Reading</h2>
+                  <div className="grid md:grid-cols-3 gap-6">
+                    {relatedPosts.map((post) => (
+                      <button
+                        key={post.id}
+                        onClick={() => openPost(post.id)}
+                        className="text-left group"
+                      >
+                        <div className="h-32 overflow-hidden rounded-xl mb-3">
+                          <img
+                            src={post.image}
+                            alt={post.title}
+                            className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
+                          />
+                        </div>
+                        <h3 className="font-semibold text-foreground group-hover:text-primary transition-colors duration-200 line-clamp-2">
+                          {post.title}
+                        </h3>
+                        <span className="text-sm text-muted-foreground">{post.read_time}</span>
+                      </button>
+                    ))}
+                  </div>
+                </div>
+              )}
             </div>
           </div>
         </div>
@@ -17,7 +17,6 @@ const BlogAdmin = () => {
     excerpt: '',
     content: '',
     tags: [],
-    read_time: '',
     image: '',
     is_published: true
   });
@@ -66,13 +65,27 @@ const BlogAdmin = () => {
       excerpt: '',
       content: '',
       tags: [],
-      read_time: '',
       image: '',
       is_published: true
     });
   };
 
-  const handleEdit = (post) => {
+  const handleEdit = async (summary) => {
+    let post;
+    try {
+      // List responses are summaries; fetch the full post for its content, and
+      // keep its ETag to send back as If-Match when saving
+      const response = await axios.get(`${BACKEND_URL}/api/blog/posts/${summary.id}`);
+      post = { ...response.data, etag: response.headers.etag };
+    } catch (error) {
+      toast({
+        title: "Error",
+        description: "Failed to load blog post",
+        variant: "destructive"
+      });
+      return;
+    }
+
     setIsEditing(true);
     setIsCreating(false);
     setSelectedPost(post);
@@ -81,7 +94,6 @@ const BlogAdmin = () => {
       excerpt: post.excerpt,
       content: post.content,
       tags: post.tags,
-      read_time: post.read_time,
       image: post.image,
       is_published: post.is_published
     });
@@ -90,15 +102,22 @@ const BlogAdmin = () => {
   const handleSubmit = async (e) => {
     e.preventDefault();
     
+    // Read time is computed from the content; a blank excerpt is derived from it
+    // on create and left unchanged on update
+    const payload = formData.excerpt.trim() ? formData : { ...formData, excerpt: undefined };
+
     try {
       if (isCreating) {
-        await axios.post(`${BACKEND_URL}/api/blog/posts`, formData);
+        await axios.post(`${BACKEND_URL}/api/blog/posts`, payload);
         toast({
           title: "Success",
           description: "Blog post created successfully"
         });
       } else if (isEditing && selectedPost) {
-        await axios.put(`${BACKEND_URL}/api/blog/posts/${selectedPost.id}`, formData);
+        // Reject the save if someone else edited the post since it was loaded
+        await axios.put(`${BACKEND_URL}/api/blog/posts/${selectedPost.id}`, payload, {
+          headers: selectedPost.etag ? { 'If-Match': selectedPost.etag } : {}
+        });
         toast({
           title: "Success",
           description: "Blog post updated successfully"
@@ -110,6 +129,14 @@ const BlogAdmin = () => {
       setSelectedPost(null);
       loadPosts();
     } catch (error) {
+      if (error.response?.status === 412) {
+        toast({
+          title: "Error",
+          description: "This post was changed by someone else. Reload it before saving again.",
+          variant: "destructive"
+        });
+        return;
+      }
       toast({
         title: "Error",
         description: `Failed to ${isCreating ? 'create' : 'update'} blog post`,
@@ -148,7 +175,6 @@ const BlogAdmin = () => {
       excerpt: '',
       content: '',
       tags: [],
-      read_time: '',
       image: '',
       is_published: true
     });
@@ -198,14 +224,14 @@ const BlogAdmin = () => {
 
               <div>
                 <label className="block text-sm font-medium text-foreground mb-2">
-                  Excerpt *
+                  Excerpt
                 </label>
                 <textarea
                   name="excerpt"
                   value={formData.excerpt}
                   onChange={handleInputChange}
-                  required
                   rows="3"
+                  placeholder="Leave blank to use the opening of the post"
                   className="w-full px-4 py-3 border border-border rounded-lg focus:ring-2 focus:ring-foreground focus:border-transparent bg-background text-foreground"
                 />
               </div>
@@ -238,21 +264,6 @@ const BlogAdmin = () => {
                     className="w-full px-4 py-3 border border-border rounded-lg focus:ring-2 focus:ring-foreground focus:border-transparent bg-background text-foreground"
                   />
                 </div>
-
-                <div>
-                  <label className="block text-sm font-medium text-foreground mb-2">
-                    Read Time *
-                  </label>
-                  <input
-                    type="text"
-                    name="read_time"
-                    value={formData.read_time}
-                    onChange={handleInputChange}
-                    required
-                    placeholder="5 min read"
-                    className="w-full px-4 py-3 border border-border rounded-lg focus:ring-2 focus:ring-foreground focus:border-transparent bg-background text-foreground"
-                  />
-                </div>
               </div>
 
               <div>
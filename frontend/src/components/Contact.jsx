@@ -3,6 +3,15 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 
+const newIdempotencyKey = () => {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  // randomUUID only exists in secure contexts; getRandomValues works over plain HTTP too
+  const bytes = window.crypto.getRandomValues(new Uint8Array(16));
+  return Array.from(bytes, (byte) => byte.toString(16).padStart(2, '0')).join('');
+};
+
 const Contact = () => {
   const [formData, setFormData] = useState({
     name: '',
@@ -15,6 +24,9 @@ const Contact = () => {
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [submitStatus, setSubmitStatus] = useState('');
   const [isVisible, setIsVisible] = useState(false);
+  // One key per version of the form: retrying it unchanged after an error can't
+  // store it twice, and editing it makes a new submission
+  const [idempotencyKey, setIdempotencyKey] = useState(newIdempotencyKey);
 
   useEffect(() => {
     setIsVisible(true);
@@ -25,6 +37,7 @@ const Contact = () => {
       ...formData,
       [e.target.name]: e.target.value
     });
+    setIdempotencyKey(newIdempotencyKey());
   };
 
   const handleSubmit = async (e) => {
@@ -32,8 +45,11 @@ const Contact = () => {
     setIsSubmitting(true);
     
     try {
-      await axios.post(`${BACKEND_URL}/api/contact/submit`, formData);
+      await axios.post(`${BACKEND_URL}/api/contact/submit`, formData, {
+        headers: { 'Idempotency-Key': idempotencyKey }
+      });
       
+      setIdempotencyKey(newIdempotencyKey());
       setSubmitStatus('success');
       setFormData({
         name: '',
@@ -49,7 +65,14 @@ const Contact = () => {
       
     } catch (error) {
       console.error('Error submitting form:', error);
-      setSubmitStatus('error');
+      // Validation errors are 422s too, but with a list of problems as their detail
+      if (error.response?.status === 422 && typeof error.response.data?.detail === 'string') {
+        // The key went with different details (say, from another tab); the next try gets a fresh one
+        setIdempotencyKey(newIdempotencyKey());
+        setSubmitStatus('conflict');
+      } else {
+        setSubmitStatus('error');
+      }
       setTimeout(() => setSubmitStatus(''), 5000);
     } finally {
       setIsSubmitting(false);
@@ -149,6 +172,19 @@ const Contact = () => {
                 </div>
               )}
 
+              {submitStatus === 'conflict' && (
+                <div className="mb-6 bg-destructive/10 border border-destructive/20 rounded-lg p-4">
+                  <div className="flex items-center">
+                    <svg className="w-5 h-5 text-destructive mr-2" fill="currentColor" viewBox="0 0 24 24">
+                      <path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm-2 15l-5-5 1.41-1.41L10 14.17l7.59-7.59L19 8l-9 9z"/>
+                    </svg>
+                    <p className="text-destructive">
+                      This form was already sent with different details. Please submit it again.
+                    </p>
+                  </div>
+                </div>
+              )}
+
               <form onSubmit={handleSubmit} className="space-y-6">
                 <div className="grid md:grid-cols-2 gap-6">
                   <div>
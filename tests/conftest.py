@@ -0,0 +1,59 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The backend reads its configuration at import time
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "portfolio_test")
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", ":memory:")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+async def storage(request, monkeypatch):
+    """A migrated, empty storage backend; mongo runs against mongomock"""
+    if request.param == "sqlite":
+        from storage.sqlite import SQLiteStorage
+        backend = SQLiteStorage(":memory:")
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        import storage.mongo
+        monkeypatch.setattr(storage.mongo, "AsyncIOMotorClient", AsyncMongoMockClient)
+        backend = storage.mongo.MongoStorage("mongodb://localhost:27017", "portfolio_test")
+    await backend.migrate()
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+async def client(storage, monkeypatch):
+    """An HTTP client for the app, running its lifespan against ``storage``"""
+    import httpx
+
+    import database
+    import server
+    from routes import blog, contact
+    from services.admission import MemoryAdmissionStore
+
+    monkeypatch.setattr(database.storage, "_backend", storage)
+    blog.post_cache.clear()
+    admission_store = MemoryAdmissionStore()
+    monkeypatch.setattr(contact, "admission_store", admission_store)
+    monkeypatch.setattr(contact.submission_limiter, "store", admission_store)
+
+    app = server.create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            yield http
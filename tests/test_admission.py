@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from routes import contact
+from services.admission import MemoryAdmissionStore, RateLimiter, client_address
+from tests.test_contact import FORM
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(params=["memory", "storage"])
+def admission_store(request, storage):
+    return MemoryAdmissionStore() if request.param == "memory" else storage.admission
+
+
+async def test_rejected_request_spends_no_tokens(admission_store):
+    limiter = RateLimiter(admission_store, per_minute=1, burst=2)
+    assert await limiter.check("ip:a", "email:x") == 0.0
+    assert await limiter.check("ip:b", "email:x") == 0.0
+
+    # email:x is empty, so ip:a keeps its last token for another sender
+    assert await limiter.check("ip:a", "email:x") > 0
+    assert await limiter.check("ip:a", "email:y") == 0.0
+    assert await limiter.check("ip:a", "email:z") > 0
+    assert limiter.limited == 2
+
+
+async def test_idempotency_claims_keep_their_fingerprint(admission_store):
+    # Real timestamps: Mongo's TTL index drops claims that expired in the past
+    now = time.time()
+    assert await admission_store.reserve_idempotency_key("key", "first", "hash-1", now, 60) is None
+    assert await admission_store.reserve_idempotency_key("key", "second", "hash-2", now + 1, 60) == ("first", "hash-1")
+    # Expired claims are free again
+    assert await admission_store.reserve_idempotency_key("key", "third", "hash-3", now + 120, 60) is None
+
+
+def test_client_address_uses_only_the_configured_header():
+    headers = {"x-forwarded-for": "203.0.113.9, 198.51.100.7"}
+    assert client_address(("10.0.0.1", 1234), headers) == "10.0.0.1"
+    assert client_address(("10.0.0.1", 1234), headers, "x-forwarded-for") == "198.51.100.7"
+    assert client_address(("10.0.0.1", 1234), {}, "x-forwarded-for") == "10.0.0.1"
+    assert client_address(None) == "unknown"
+
+
+async def test_submissions_are_not_rate_limited_by_default(client):
+    assert contact.submission_limiter.rate == 0
+    for i in range(10):
+        response = await client.post("/api/contact/submit", json=dict(FORM, email=f"user{i}@example.com"))
+        assert response.status_code == 200
+
+
+async def test_rate_limit_follows_the_trusted_proxy_header(client, monkeypatch):
+    monkeypatch.setattr(contact.submission_limiter, "rate", 1 / 60)
+    monkeypatch.setattr(contact.submission_limiter, "burst", 1)
+    monkeypatch.setattr(contact, "TRUSTED_PROXY_HEADER", "X-Forwarded-For")
+
+    async def submit(address: str, i: int) -> int:
+        response = await client.post("/api/contact/submit", json=dict(FORM, email=f"user{i}@example.com"),
+                                     headers={"X-Forwarded-For": address})
+        return response.status_code
+
+    assert await submit("203.0.113.9", 0) == 200
+    assert await submit("203.0.113.9", 1) == 429
+    assert await submit("198.51.100.7", 2) == 200
+
+
+async def test_idempotent_replay_returns_the_original_without_its_contents(client, storage):
+    headers = {"Idempotency-Key": "retry-1"}
+    first = await client.post("/api/contact/submit", json=FORM, headers=headers)
+    assert first.status_code == 200
+
+    replay = await client.post("/api/contact/submit", json=FORM, headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert set(replay.json()) == set(contact.REPLAY_FIELDS)
+    assert replay.json()["id"] == first.json()["id"]
+    assert FORM["email"] not in replay.text and FORM["message"] not in replay.text
+    assert len(await storage.submissions.list()) == 1
+
+
+async def test_reused_idempotency_key_with_another_form_is_a_422(client, storage):
+    headers = {"Idempotency-Key": "retry-2"}
+    assert (await client.post("/api/contact/submit", json=FORM, headers=headers)).status_code == 200
+    response = await client.post("/api/contact/submit", json=dict(FORM, message="Something else"), headers=headers)
+    assert response.status_code == 422
+    assert len(await storage.submissions.list()) == 1
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.batching import GroupCommitter, QueueFull, WriteRejected
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowRepository:
+    """Records batch sizes; each insert_many takes ``latency`` seconds"""
+
+    def __init__(self, latency: float = 0.01, error: Exception = None):
+        self.latency = latency
+        self.error = error
+        self.batches = []
+
+    async def insert_many(self, docs):
+        self.batches.append(len(docs))
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return len(docs), []
+
+
+def _submission(i: int) -> dict:
+    return {"id": f"submission-{i}", "name": "Ada", "email": f"user{i}@example.com", "company": "",
+            "message": "Hello", "submitted_at": datetime.utcnow(), "status": "received"}
+
+
+async def test_idle_submission_is_written_at_once(storage):
+    committer = GroupCommitter(storage.submissions, max_delay=10.0)
+    await asyncio.wait_for(committer.submit(_submission(0)), timeout=1.0)
+    assert (await storage.submissions.get("submission-0"))["email"] == "user0@example.com"
+    assert committer.stats()["batches"] == 1
+
+
+async def test_concurrent_submissions_are_grouped():
+    repository = SlowRepository()
+    committer = GroupCommitter(repository, max_batch=16, max_inflight=2)
+    await asyncio.gather(*(committer.submit(_submission(i)) for i in range(100)))
+
+    assert sum(repository.batches) == 100
+    assert max(repository.batches) <= 16
+    assert len(repository.batches) < 20
+    assert committer.stats()["queued"] == 0
+
+
+async def test_rejected_document_fails_only_its_caller(storage):
+    committer = GroupCommitter(storage.submissions)
+    duplicate = _submission(1)
+    await storage.submissions.insert(dict(duplicate))
+
+    # Queued behind an in-flight write so the three share a batch
+    first = asyncio.ensure_future(committer.submit(_submission(0)))
+    await asyncio.sleep(0)
+    results = await asyncio.gather(committer.submit(duplicate), committer.submit(_submission(2)),
+                                   return_exceptions=True)
+    await first
+
+    assert isinstance(results[0], WriteRejected)
+    assert results[1] is None
+    assert await storage.submissions.get("submission-2") is not None
+
+
+async def test_failed_batch_fails_every_caller():
+    committer = GroupCommitter(SlowRepository(error=ConnectionError("primary stepped down")))
+    results = await asyncio.gather(*(committer.submit(_submission(i)) for i in range(5)), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert committer.stats()["queued"] == 0
+
+
+async def test_queue_is_bounded():
+    committer = GroupCommitter(SlowRepository(latency=0.05), max_queue=3)
+    waiting = [asyncio.ensure_future(committer.submit(_submission(i))) for i in range(3)]
+    await asyncio.sleep(0)
+    with pytest.raises(QueueFull):
+        await committer.submit(_submission(3))
+    await asyncio.gather(*waiting)
+    assert committer.stats()["rejected"] == 1
+
+
+async def test_close_writes_everything_queued():
+    repository = SlowRepository()
+    committer = GroupCommitter(repository, max_delay=10.0)
+    waiting = [asyncio.ensure_future(committer.submit(_submission(i))) for i in range(10)]
+    await asyncio.sleep(0)
+    await committer.close()
+    assert sum(repository.batches) == 10
+    await asyncio.gather(*waiting)
@@ -0,0 +1,126 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+POST = {
+    "title": "Partitioning Large Tables",
+    "excerpt": "When and how to partition tables in a warehouse.",
+    "content": "<p>Partitioning lets the planner skip irrelevant data.</p>",
+    "tags": ["SQL", "Performance"],
+    "read_time": "4 min read",
+    "image": "https://images.unsplash.com/photo-1544383835-bda2bc66a55d?w=800",
+    "is_published": True,
+}
+
+
+async def create_post(client, **fields) -> dict:
+    response = await client.post("/api/blog/posts", json=dict(POST, **fields))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_repeated_reads_are_served_from_the_cache(client):
+    post = await create_post(client)
+    before = (await client.get("/api/blog/cache/stats")).json()
+    for _ in range(3):
+        response = await client.get(f"/api/blog/posts/{post['id']}")
+        assert response.status_code == 200
+    after = (await client.get("/api/blog/cache/stats")).json()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+
+
+async def test_writes_invalidate_cached_reads(client):
+    post = await create_post(client)
+    assert [p["title"] for p in (await client.get("/api/blog/posts")).json()] == [POST["title"]]
+    await client.get(f"/api/blog/posts/{post['id']}")
+
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Partitioning, Revisited"})
+    assert response.status_code == 200
+    assert (await client.get(f"/api/blog/posts/{post['id']}")).json()["title"] == "Partitioning, Revisited"
+    assert [p["title"] for p in (await client.get("/api/blog/posts")).json()] == ["Partitioning, Revisited"]
+
+    assert (await client.delete(f"/api/blog/posts/{post['id']}")).status_code == 200
+    assert (await client.get(f"/api/blog/posts/{post['id']}")).status_code == 404
+    assert (await client.get("/api/blog/posts")).json() == []
+
+
+async def test_list_endpoints_serve_summaries_without_bodies(client, storage):
+    from models.blog import BlogPostSummary
+
+    post = await create_post(client)
+    summary_fields = set(BlogPostSummary.model_fields)
+    for path in ("/api/blog/posts", "/api/blog/posts?published_only=false", "/api/blog/posts/tag/SQL"):
+        [listed] = (await client.get(path)).json()
+        assert set(listed) == summary_fields
+        assert listed["id"] == post["id"]
+
+    # Storage is asked for exactly the summary fields
+    [stored] = await storage.posts.list(limit=1, fields=list(summary_fields))
+    assert "content" not in stored and "plain_text" not in stored
+    assert (await client.get(f"/api/blog/posts/{post['id']}")).json()["content"] == POST["content"]
+
+
+async def test_payloads_are_compressed_off_the_event_loop(client, monkeypatch):
+    import threading
+
+    from routes import blog
+
+    threads = []
+
+    def recording_build_payload(post, fields):
+        threads.append(threading.current_thread())
+        return build_payload(post, fields)
+
+    build_payload = blog.build_payload
+    monkeypatch.setattr(blog, "build_payload", recording_build_payload)
+    post = await create_post(client)
+    assert (await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Revisited"})).status_code == 200
+    assert len(threads) == 2
+    assert threading.current_thread() not in threads
+
+
+async def test_failed_post_write_hook_does_not_fail_the_write(client, storage, monkeypatch, caplog):
+    from routes import blog
+
+    post = await create_post(client)
+    await client.get(f"/api/blog/posts/{post['id']}")
+
+    async def failing_put_payload(payload):
+        raise RuntimeError("payload store unavailable")
+
+    monkeypatch.setattr(storage.posts, "put_payload", failing_put_payload)
+    rebuilds = blog.post_watcher.rebuilds
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Partitioning, Revisited"})
+    assert response.status_code == 200
+    assert "payload store unavailable" in caplog.text
+
+    # The old payload was dropped with the write, so the read rebuilds it
+    monkeypatch.delattr(storage.posts, "put_payload")
+    response = await client.get(f"/api/blog/posts/{post['id']}")
+    assert response.json()["title"] == "Partitioning, Revisited"
+    assert blog.post_watcher.rebuilds == rebuilds
+
+
+async def test_failed_index_update_is_repaired_from_the_change_log(client, monkeypatch, caplog):
+    from routes import blog
+
+    post = await create_post(client, title="Streaming analytics with Kafka")
+    update = blog.search_index.update
+    failures = []
+
+    def failing_once(before, after):
+        if not failures:
+            failures.append(after)
+            raise RuntimeError("index unavailable")
+        update(before, after)
+
+    monkeypatch.setattr(blog.search_index, "update", failing_once)
+    rebuilds = blog.post_watcher.rebuilds
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Batch analytics with Spark"})
+    assert response.status_code == 200
+    assert "index unavailable" in caplog.text
+
+    hits = (await client.get("/api/blog/search", params={"q": "spark"})).json()
+    assert [hit["id"] for hit in hits] == [post["id"]]
+    assert blog.post_watcher.rebuilds == rebuilds
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from services.bulk import iter_lines
+from tests.test_blog import create_post
+from tests.test_contact import FORM
+
+pytestmark = pytest.mark.anyio
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def test_lines_are_split_across_chunk_boundaries():
+    lines = [line async for line in iter_lines(_chunks(b'{"a":', b'1}\n{"b"', b":2}\n\n{", b'"c":3}'))]
+    assert lines == [b'{"a":1}', b'{"b":2}', b"", b'{"c":3}']
+
+
+async def test_posts_round_trip_through_export_and_import(client, storage):
+    created = [await create_post(client, title=f"Post {i}", tags=["SQL", f"tag{i}"]) for i in range(3)]
+    exported = (await client.get("/api/blog/export")).content
+    assert len(exported.splitlines()) == 3
+
+    await storage.drop()
+    await storage.migrate()
+    body = exported + b'{"title": "missing fields"}\n' + exported.splitlines()[0] + b"\n"
+    report = (await client.post("/api/blog/import", content=body)).json()
+    assert report["inserted"] == 3
+    assert report["failed"] == 2
+    assert [error["line"] for error in report["errors"]] == [4, 5]
+
+    listed = (await client.get("/api/blog/posts")).json()
+    assert sorted(post["id"] for post in listed) == sorted(post["id"] for post in created)
+    for post in created:
+        restored = (await client.get(f"/api/blog/posts/{post['id']}")).json()
+        assert restored["content"] == post["content"]
+        assert restored["publish_date"][:23] == post["publish_date"][:23]
+    tags = {item["tag"]: item["count"] for item in (await client.get("/api/blog/tags")).json()}
+    assert tags == {"SQL": 3, "tag0": 1, "tag1": 1, "tag2": 1}
+
+
+async def test_submissions_round_trip_through_export_and_import(client, storage):
+    for i in range(3):
+        await client.post("/api/contact/submit", json=dict(FORM, email=f"user{i}@example.com"))
+    exported = (await client.get("/api/contact/export")).content
+    records = [json.loads(line) for line in exported.splitlines()]
+    assert sorted(record["email"] for record in records) == [f"user{i}@example.com" for i in range(3)]
+
+    await storage.drop()
+    await storage.migrate()
+    report = (await client.post("/api/contact/import", content=exported)).json()
+    assert report == {"inserted": 3, "failed": 0, "errors": []}
+    listed = (await client.get("/api/contact/submissions")).json()
+    assert sorted(item["id"] for item in listed) == sorted(record["id"] for record in records)
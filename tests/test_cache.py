@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from services.cache import ReadCache
+
+pytestmark = pytest.mark.anyio
+
+
+def _loader(value, calls):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+    return load
+
+
+async def test_hits_after_first_load():
+    cache, calls = ReadCache(), []
+    assert await cache.get_or_load(("k",), _loader(1, calls)) == 1
+    assert await cache.get_or_load(("k",), _loader(2, calls)) == 1
+    assert calls == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+async def test_expired_entries_are_reloaded():
+    cache, calls = ReadCache(ttl=0.0), []
+    await cache.get_or_load(("k",), _loader(1, calls))
+    assert await cache.get_or_load(("k",), _loader(2, calls)) == 2
+    assert calls == [1, 2]
+
+
+async def test_least_recently_used_is_evicted():
+    cache, calls = ReadCache(max_entries=2), []
+    for key in ("a", "b"):
+        await cache.get_or_load((key,), _loader(key, calls))
+    await cache.get_or_load(("a",), _loader("a", calls))
+    await cache.get_or_load(("c",), _loader("c", calls))
+    assert cache.evictions == 1
+    await cache.get_or_load(("a",), _loader("a", calls))
+    await cache.get_or_load(("b",), _loader("b", calls))
+    assert calls == ["a", "b", "c", "b"]
+
+
+async def test_concurrent_misses_share_one_load():
+    cache, calls = ReadCache(), []
+    results = await asyncio.gather(*(cache.get_or_load(("k",), _loader(1, calls)) for _ in range(10)))
+    assert results == [1] * 10
+    assert calls == [1]
+    assert cache.coalesced == 9
+
+
+async def test_failed_load_is_not_cached():
+    cache, calls = ReadCache(), []
+
+    async def fail():
+        raise RuntimeError("storage down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load(("k",), fail)
+    assert await cache.get_or_load(("k",), _loader(1, calls)) == 1
+
+
+async def test_invalidation_during_load_discards_the_result():
+    cache, calls = ReadCache(), []
+    load = asyncio.ensure_future(cache.get_or_load(("posts", True, 1), _loader("stale", calls)))
+    await asyncio.sleep(0)
+    cache.invalidate_prefix(("posts",))
+    assert await load == "stale"
+    assert await cache.get_or_load(("posts", True, 1), _loader("fresh", calls)) == "fresh"
+
+
+async def test_prefix_invalidation_only_drops_matching_keys():
+    cache, calls = ReadCache(), []
+    for key in (("tag", "SQL", 10), ("tag", "BI", 10), ("tags",)):
+        await cache.get_or_load(key, _loader(key, calls))
+    cache.invalidate_prefix(("tag", "SQL"))
+    assert cache.stats()["entries"] == 2
+    assert cache.invalidations == 1
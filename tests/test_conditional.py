@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.conditional import parse_if_match, post_etag
+from tests.test_blog import POST, create_post
+
+pytestmark = pytest.mark.anyio
+
+
+def test_parse_if_match_accepts_lists_and_any():
+    assert parse_if_match(' "3" ') == ['"3"']
+    assert parse_if_match('"a", "b",  "c"') == ['"a"', '"b"', '"c"']
+    assert parse_if_match("*") is None
+
+
+@pytest.mark.parametrize("header", ['W/"3"', '"3", W/"4"', "3", '"3', '""3"', "", '"3",'])
+def test_parse_if_match_rejects_weak_and_malformed_tags(header):
+    with pytest.raises(ValueError):
+        parse_if_match(header)
+
+
+def test_post_etag_changes_when_a_post_is_recreated():
+    created = datetime(2024, 5, 1, 12, 0, 0, 123456)
+    post = {"id": "p1", "version": 1, "updated_at": created}
+    assert post_etag(post) == post_etag(dict(post, updated_at=created.replace(microsecond=123000)))
+    assert post_etag(post) != post_etag(dict(post, updated_at=created + timedelta(seconds=1)))
+    assert post_etag(post) != post_etag(dict(post, id="p2"))
+    assert post_etag(post) != post_etag(dict(post, version=2))
+
+
+async def _etag(client, post_id: str) -> str:
+    return (await client.get(f"/api/blog/posts/{post_id}")).headers["ETag"]
+
+
+async def test_recreated_post_does_not_reuse_an_old_etag(client, storage):
+    post = await create_post(client)
+    old = await _etag(client, post["id"])
+    doc = await storage.posts.get(post["id"])
+    assert (await client.delete(f"/api/blog/posts/{post['id']}")).status_code == 200
+    await storage.posts.insert(dict(doc, version=1, updated_at=doc["updated_at"] + timedelta(seconds=1)))
+
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Renamed"},
+                                headers={"If-Match": old})
+    assert response.status_code == 412
+    assert await _etag(client, post["id"]) != old
+
+
+async def test_update_with_current_etag_succeeds(client):
+    post = await create_post(client)
+    etag = await _etag(client, post["id"])
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Renamed"},
+                                headers={"If-Match": f'"stale", {etag}'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.headers["ETag"] == await _etag(client, post["id"])
+
+
+async def test_stale_if_match_is_rejected_with_412(client):
+    post = await create_post(client)
+    stale = await _etag(client, post["id"])
+    assert (await client.put(f"/api/blog/posts/{post['id']}", json={"title": "First"})).status_code == 200
+
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Second"},
+                                headers={"If-Match": stale})
+    assert response.status_code == 412
+    assert response.headers["ETag"] == await _etag(client, post["id"])
+    assert (await client.get(f"/api/blog/posts/{post['id']}")).json()["title"] == "First"
+
+
+@pytest.mark.parametrize("header", ['"not-a-number', 'W/"1"', "garbage"])
+async def test_malformed_or_weak_if_match_is_a_400(client, header):
+    post = await create_post(client)
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Renamed"},
+                                headers={"If-Match": header})
+    assert response.status_code == 400
+    assert "invalid literal" not in response.text
+    assert (await client.get(f"/api/blog/posts/{post['id']}")).json()["title"] == post["title"]
+
+
+async def test_if_match_any_requires_an_existing_post(client):
+    post = await create_post(client)
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Renamed"},
+                                headers={"If-Match": "*"})
+    assert response.status_code == 200
+    response = await client.put("/api/blog/posts/missing", json={"title": "Renamed"}, headers={"If-Match": "*"})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/api/blog/posts", "/api/blog/tags", "/api/blog/posts/tag/SQL"])
+async def test_collection_etags_follow_the_shared_change_counter(client, storage, monkeypatch, path):
+    from routes import blog
+
+    monkeypatch.setattr(blog.post_watcher, "interval", 0.0)
+    await create_post(client)
+    response = await client.get(path)
+    # The same in every worker synced to this version, restarts included
+    etag = response.headers["ETag"]
+    assert etag == f'"c{await storage.posts.change_version()}"'
+    assert "Last-Modified" not in response.headers
+    assert (await client.get(path, headers={"If-None-Match": etag})).status_code == 304
+
+    # Written by another worker
+    other = blog._new_post(dict(POST, title="Remote post"))[1]
+    await storage.posts.insert(other)
+    response = await client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"c{await storage.posts.change_version()}"'
+
+
+async def test_local_writes_change_the_collection_etag_at_once(client, storage, monkeypatch):
+    from routes import blog
+
+    await create_post(client)
+    etag = (await client.get("/api/blog/posts")).headers["ETag"]
+    # Before any check confirms the write, the tag is this process's own
+    monkeypatch.setattr(blog.post_watcher, "interval", float("inf"))
+    await create_post(client, title="Second")
+    response = await client.get("/api/blog/posts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["ETag"] not in (etag, f'"c{await storage.posts.change_version()}"')
+
+
+async def test_admin_editor_saves_with_the_etag_it_loaded(client):
+    # BlogAdmin.handleEdit keeps the GET's ETag header and sends it back verbatim
+    post = await create_post(client)
+    loaded = await client.get(f"/api/blog/posts/{post['id']}")
+    form = {name: loaded.json()[name] for name in ("title", "excerpt", "content", "tags", "image", "is_published")}
+    response = await client.put(f"/api/blog/posts/{post['id']}", json=dict(form, title="Renamed"),
+                                headers={"If-Match": loaded.headers["etag"]})
+    assert response.status_code == 200
+
+    # A quoted bare version, as the editor once sent, never names the current post
+    current = await client.get(f"/api/blog/posts/{post['id']}")
+    response = await client.put(f"/api/blog/posts/{post['id']}", json=form,
+                                headers={"If-Match": f'"{current.json()["version"]}"'})
+    assert response.status_code == 412
@@ -0,0 +1,27 @@
+import pytest
+
+from routes import contact
+
+pytestmark = pytest.mark.anyio
+
+FORM = {
+    "name": "Ada Lovelace",
+    "email": "ada@example.com",
+    "subject": "Analytics engagement",
+    "message": "Could you help us with our reporting pipeline?",
+}
+
+
+async def test_submission_queues_notification_email(client, storage, monkeypatch):
+    monkeypatch.setattr(contact, "smtp_enabled", lambda: True)
+    response = await client.post("/api/contact/submit", json=FORM)
+    assert response.status_code == 200
+    assert await storage.outbox.status_counts() in ({"pending": 1}, {"sending": 1})
+
+
+async def test_submission_without_smtp_is_logged_not_queued(client, storage, caplog):
+    with caplog.at_level("INFO", logger="routes.contact"):
+        response = await client.post("/api/contact/submit", json=FORM)
+    assert response.status_code == 200
+    assert await storage.outbox.status_counts() == {}
+    assert "SMTP not configured" in caplog.text
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.contact_stats import rebuild_rollups
+from tests.test_contact import FORM
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_stats_count_submissions_by_bucket(client):
+    for i in range(3):
+        form = dict(FORM, email=f"user{i}@example.com", company="Acme" if i else "")
+        assert (await client.post("/api/contact/submit", json=form)).status_code == 200
+
+    response = await client.get("/api/contact/stats", params={"granularity": "hour"})
+    assert response.status_code == 200
+    stats = response.json()
+    # The last 48 hours, widened to whole hours
+    assert len(stats["buckets"]) in (48, 49)
+    assert stats["totals"] == {"submissions": 3, "with_company": 2, "by_status": {"received": 3}}
+    assert sum(bucket["submissions"] for bucket in stats["buckets"]) == 3
+
+
+@pytest.mark.parametrize("params", [
+    {"end": "9999-12-31T23:00:00"},
+    {"end": "9999-12-31T23:30:00", "granularity": "hour"},
+    {"end": "0001-01-02T00:00:00"},
+    {"start": "0001-01-01T00:00:00+05:00", "end": "2024-01-01T00:00:00"},
+])
+async def test_ranges_past_the_supported_dates_are_a_400(client, params):
+    response = await client.get("/api/contact/stats", params=params)
+    assert response.status_code == 400
+
+
+async def test_ranges_that_are_empty_or_too_long_are_a_400(client):
+    now = datetime(2024, 5, 1)
+    response = await client.get("/api/contact/stats", params={"start": now.isoformat(), "end": now.isoformat()})
+    assert response.status_code == 400
+    response = await client.get("/api/contact/stats", params={
+        "granularity": "hour", "start": (now - timedelta(days=3650)).isoformat(), "end": now.isoformat(),
+    })
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("storage", ["mongo"], indirect=True)
+async def test_failed_rollup_update_keeps_the_stored_submission(client, storage, monkeypatch, caplog):
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(storage.submissions.rollup_counts, "bulk_write", unavailable)
+    headers = {"Idempotency-Key": "retry-me"}
+    with caplog.at_level("ERROR", logger="storage.mongo"):
+        first = await client.post("/api/contact/submit", json=FORM, headers=headers)
+    assert first.status_code == 200
+    assert "rebuild-contact-rollups" in caplog.text
+
+    retry = await client.post("/api/contact/submit", json=FORM, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    assert len(await storage.submissions.list()) == 1
+
+    monkeypatch.delattr(storage.submissions.rollup_counts, "bulk_write")
+    report = await rebuild_rollups(storage.submissions)
+    assert report["repaired"] and report["submissions"] == 1
@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.loadtest import build_scenarios, compare, percentile, run_scenario, seed
+
+pytestmark = pytest.mark.anyio
+
+
+def test_percentile_picks_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50.0, 95.0, 99.0)
+    assert percentile([], 50) == 0.0
+    assert percentile([7.0], 99) == 7.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"blog.get@1": {"p95_ms": 10.0, "throughput_rps": 100.0},
+                "blog.list@1": {"p95_ms": 10.0, "throughput_rps": 100.0}}
+    results = {"blog.get@1": {"p95_ms": 10.9, "throughput_rps": 91.0},
+               "blog.list@1": {"p95_ms": 11.5, "throughput_rps": 80.0},
+               "blog.new@1": {"p95_ms": 99.0, "throughput_rps": 1.0}}
+    regressions = compare(results, baseline, tolerance=0.1)
+    assert regressions == ["blog.list@1: p95 10.0ms -> 11.5ms", "blog.list@1: throughput 100.0 -> 80.0 rps"]
+
+
+async def test_every_scenario_runs_without_errors(client, storage):
+    from routes import blog
+
+    ctx = await seed(storage, posts=30, content_kb=1, submissions=60)
+    ctx.update(content_kb=1, requests=3)
+    await blog._on_posts_reloaded()
+    for scenario in build_scenarios(ctx):
+        if scenario.setup:
+            await scenario.setup(client, scenario.state)
+        result = await run_scenario(client, scenario, min(3, scenario.requests or 3), concurrency=2)
+        assert result["errors"] == 0, scenario.name
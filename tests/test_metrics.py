@@ -0,0 +1,89 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from services.command_metrics import CommandMetricsListener
+from services.metrics import PROMETHEUS_CONTENT_TYPE, Histogram, MetricsRegistry, RequestContext, current_request
+
+pytestmark = pytest.mark.anyio
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Value of the one exposition line starting with ``prefix``"""
+    [line] = [line for line in text.splitlines() if line.startswith(prefix)]
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert list(histogram.render("latency", 'route="/x"')) == [
+        'latency_bucket{route="/x",le="0.1"} 2',
+        'latency_bucket{route="/x",le="1.0"} 3',
+        'latency_bucket{route="/x",le="+Inf"} 4',
+        'latency_sum{route="/x"} 3.65',
+        'latency_count{route="/x"} 4',
+    ]
+
+
+def _event(name: str, micros: int, request_id: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(command_name=name, database_name="portfolio", duration_micros=micros,
+                           connection_id=("localhost", 27017), request_id=request_id, command={name: "blog_posts"})
+
+
+def test_commands_are_attributed_to_the_current_request():
+    registry = MetricsRegistry()
+    listener = CommandMetricsListener(registry, slow_query_ms=0)
+    ctx = RequestContext("/api/blog/posts")
+    token = current_request.set(ctx)
+    try:
+        listener.succeeded(_event("find", 2000))
+        listener.failed(_event("insert", 1000))
+    finally:
+        current_request.reset(token)
+    listener.succeeded(_event("find", 3000))
+
+    assert (ctx.db_commands, ctx.db_seconds) == (2, pytest.approx(0.003))
+    text = registry.render()
+    assert _sample(text, 'mongodb_command_duration_seconds_count{command="find"}') == 2
+    assert _sample(text, 'mongodb_command_failures_total{command="insert"}') == 1
+
+
+def test_slow_commands_are_logged_and_counted(caplog):
+    registry = MetricsRegistry()
+    listener = CommandMetricsListener(registry, slow_query_ms=50)
+    for request_id, micros in ((1, 10_000), (2, 80_000)):
+        event = _event("aggregate", micros, request_id)
+        listener.started(event)
+        with caplog.at_level(logging.WARNING, logger="metrics.slow_query"):
+            listener.succeeded(event)
+
+    assert registry.slow_queries == 1
+    assert "Slow MongoDB aggregate on portfolio took 80.0 ms" in caplog.text
+    assert listener._pending == {}
+
+
+async def test_requests_are_recorded_by_route_template(client):
+    response = await client.post("/api/blog/posts", json={
+        "title": "Metrics", "excerpt": "Excerpt", "content": "<p>Body</p>", "tags": ["SQL"],
+        "read_time": "1 min read", "image": "https://example.com/a.png",
+    })
+    post_id = response.json()["id"]
+    before = (await client.get("/api/metrics")).text
+    label = 'method="GET",route="/api/blog/posts/{post_id}",status="200"'
+    try:
+        count = _sample(before, f"http_requests_total{{{label}}}")
+    except ValueError:
+        count = 0
+
+    for _ in range(3):
+        assert (await client.get(f"/api/blog/posts/{post_id}")).status_code == 200
+    response = await client.get("/api/metrics")
+
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    assert _sample(response.text, f"http_requests_total{{{label}}}") == count + 3
+    assert post_id not in response.text
+    # Only this request is in flight while the exposition renders
+    assert _sample(response.text, "http_requests_in_flight") == 1
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh, unmigrated Mongo backend on mongomock"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    import storage.mongo
+    monkeypatch.setattr(storage.mongo, "AsyncIOMotorClient", AsyncMongoMockClient)
+    backend = storage.mongo.MongoStorage("mongodb://localhost:27017", "portfolio_migrations")
+    yield backend
+    backend.close()
+
+
+def _recording_steps(runs: list):
+    async def step(storage):
+        runs.append(step)
+        await asyncio.sleep(0.05)
+    return ((1, "first", step), (2, "second", step))
+
+
+async def test_concurrent_workers_apply_each_migration_once(mongo):
+    runs = []
+    mongo.migrations = _recording_steps(runs)
+    applied = await asyncio.gather(mongo.migrate(), mongo.migrate())
+    assert sorted(applied) == [[], [1, 2]]
+    assert len(runs) == 2
+    assert await mongo.db.migration_locks.count_documents({}) == 0
+
+
+async def test_lock_left_by_a_dead_worker_expires(mongo):
+    runs = []
+    mongo.migrations = _recording_steps(runs)
+    await mongo.db.migration_locks.insert_one(
+        {"_id": "migrate", "owner": "dead", "expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    assert await asyncio.wait_for(mongo.migrate(), timeout=2.0) == [1, 2]
+
+
+async def test_up_to_date_database_skips_the_lock(storage, monkeypatch):
+    def fail():
+        raise AssertionError("lock taken with nothing to migrate")
+
+    monkeypatch.setattr(storage, "migration_lock", fail)
+    assert await storage.migrate() == []
+
+
+async def test_rollup_backfill_counts_existing_submissions(storage):
+    submitted_at = datetime(2024, 3, 1, 9, 30)
+    for i in range(3):
+        await storage.submissions.insert({"id": f"s{i}", "name": "Ada", "email": "ada@example.com", "company": "",
+                                          "message": "Hi", "submitted_at": submitted_at, "status": "received"})
+    await storage.submissions.replace_rollups({})
+    step = dict((version, step) for version, _, step in storage.migrations)[3]
+    await step(storage)
+    [row] = await storage.submissions.rollups("hour", submitted_at - timedelta(hours=1), submitted_at + timedelta(hours=1))
+    assert row["count"] == 3
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from services.outbox import DEAD, SENT, EmailOutbox, SmtpTransport
+from storage.sqlite import SQLiteStorage
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingHandler:
+    """Accepts mail, after refusing the first ``failures`` deliveries with ``reply``"""
+
+    def __init__(self, failures: int = 0, reply: str = "451 Try again later"):
+        self.failures = failures
+        self.reply = reply
+        self.attempts = 0
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            return self.reply
+        self.delivered.append(envelope.content.decode("utf8", errors="replace"))
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+async def storage():
+    # mongomock's find_one_and_update re-applies the filter after updating,
+    # so it can't emulate the Mongo claim; the queue logic is the same
+    backend = SQLiteStorage(":memory:")
+    await backend.migrate()
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def smtp():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller
+    controller.stop()
+
+
+def _outbox(storage, smtp, **options) -> EmailOutbox:
+    options = {"workers": 1, "backoff_base": 0.01, "backoff_max": 0.05, "poll_interval": 0.05, **options}
+    return EmailOutbox(
+        storage.outbox,
+        transport_factory=lambda: SmtpTransport(smtp.hostname, smtp.port, use_tls=False, timeout=5),
+        **options,
+    )
+
+
+async def _enqueue(outbox: EmailOutbox, n: int = 1):
+    for i in range(n):
+        await outbox.enqueue(f"submission-{i}", f"Subject {i}", "noreply@example.com",
+                             "owner@example.com", f"Body {i}", f"<p>Body {i}</p>")
+
+
+async def _wait_for_status(outbox: EmailOutbox, status: str, count: int, timeout: float = 10.0) -> dict:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        counts = await outbox.stats()
+        if counts.get(status, 0) >= count:
+            return counts
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError(f"Timed out waiting for {count} {status} entries: {counts}")
+        await asyncio.sleep(0.02)
+
+
+async def test_delivers_queued_messages(storage, smtp):
+    outbox = _outbox(storage, smtp, workers=2, batch_size=2)
+    await _enqueue(outbox, 5)
+    outbox.start()
+    try:
+        counts = await _wait_for_status(outbox, SENT, 5)
+    finally:
+        await outbox.stop()
+
+    assert counts == {SENT: 5}
+    assert len(smtp.handler.delivered) == 5
+    subjects = sorted(line for message in smtp.handler.delivered
+                      for line in message.splitlines() if line.startswith("Subject:"))
+    assert subjects == [f"Subject: Subject {i}" for i in range(5)]
+
+
+async def test_retries_transient_failures(storage, smtp):
+    smtp.handler.failures = 2
+    outbox = _outbox(storage, smtp, max_attempts=5)
+    await _enqueue(outbox)
+    outbox.start()
+    try:
+        counts = await _wait_for_status(outbox, SENT, 1)
+    finally:
+        await outbox.stop()
+
+    assert counts == {SENT: 1}
+    assert smtp.handler.attempts == 3
+    assert len(smtp.handler.delivered) == 1
+
+
+def test_backoff_grows_exponentially_up_to_the_cap():
+    outbox = EmailOutbox(None, backoff_base=5.0, backoff_max=60.0)
+    for attempts, expected in [(1, 5.0), (2, 10.0), (3, 20.0), (4, 40.0), (10, 60.0)]:
+        delay = outbox._backoff(attempts)
+        assert 0.8 * expected <= delay <= 1.2 * expected
+
+
+async def test_failed_attempt_is_not_retried_before_its_backoff(storage, smtp):
+    smtp.handler.failures = 1
+    outbox = _outbox(storage, smtp, backoff_base=30.0, backoff_max=30.0)
+    await _enqueue(outbox)
+    outbox.start()
+    try:
+        await asyncio.sleep(0.5)
+    finally:
+        await outbox.stop()
+
+    assert smtp.handler.attempts == 1
+    assert await outbox.stats() == {"pending": 1}
+    # Once the backoff has passed the entry is claimable again
+    later = datetime.utcnow() + timedelta(seconds=40)
+    entry = await storage.outbox.claim(later, later + timedelta(seconds=60))
+    assert entry is not None and entry["attempts"] == 1
+
+
+async def test_expired_lease_is_reclaimed(storage, smtp):
+    outbox = _outbox(storage, smtp, lease_seconds=0.3)
+    await _enqueue(outbox)
+
+    # A worker claims the entry and dies before recording the result
+    abandoned = await outbox._claim()
+    assert abandoned is not None
+    assert await outbox._claim() is None
+
+    outbox.start()
+    try:
+        await _wait_for_status(outbox, SENT, 1)
+    finally:
+        await outbox.stop()
+    assert len(smtp.handler.delivered) == 1
+
+
+async def test_dead_letters_after_max_attempts(storage, smtp, caplog):
+    smtp.handler.failures = 100
+    smtp.handler.reply = "550 Mailbox unavailable"
+    outbox = _outbox(storage, smtp, max_attempts=3)
+    await _enqueue(outbox)
+    outbox.start()
+    try:
+        with caplog.at_level(logging.ERROR, logger="services.outbox"):
+            counts = await _wait_for_status(outbox, DEAD, 1)
+            # Give a misbehaving worker the chance to try once more
+            await asyncio.sleep(0.2)
+    finally:
+        await outbox.stop()
+
+    assert counts == {DEAD: 1}
+    assert smtp.handler.attempts == 3
+    assert smtp.handler.delivered == []
+    assert "dead-lettered after 3 attempts" in caplog.text
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.pagination import decode_cursor, encode_cursor, next_cursor
+
+pytestmark = pytest.mark.anyio
+
+
+def test_cursor_round_trips():
+    stamp = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    token = encode_cursor(stamp, "post-1")
+    assert "=" not in token
+    assert decode_cursor(token) == (stamp, "post-1")
+
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", "WyJ4Il0", encode_cursor(datetime(2025, 1, 1), "a")[:-3]])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_last_page_has_no_cursor():
+    docs = [{"id": "a", "publish_date": datetime(2025, 1, 2)}, {"id": "b", "publish_date": datetime(2025, 1, 1)}]
+    assert next_cursor(docs, "publish_date", 3) is None
+    assert decode_cursor(next_cursor(docs, "publish_date", 2)) == (datetime(2025, 1, 1), "b")
+
+
+async def _seed_posts(storage, n: int):
+    from routes.blog import _new_post
+    from tests.test_blog import POST
+
+    start = datetime(2025, 1, 1)
+    posts = []
+    for i in range(n):
+        # Pairs share a publish date, so pages must break ties by id
+        fields = dict(POST, title=f"Post {i}", publish_date=start + timedelta(days=i // 2))
+        posts.append(_new_post(fields)[1])
+    await storage.posts.insert_many(posts)
+    return posts
+
+
+async def test_cursor_pages_cover_every_post_once(client, storage):
+    posts = await _seed_posts(storage, 7)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/blog/posts", params=params)
+        assert response.status_code == 200
+        seen.extend(post["id"] for post in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    expected = sorted(posts, key=lambda p: (p["publish_date"], p["id"]), reverse=True)
+    assert seen == [post["id"] for post in expected]
+
+
+async def test_bad_cursor_is_a_client_error(client):
+    assert (await client.get("/api/blog/posts", params={"cursor": "garbage"})).status_code == 400
+    assert (await client.get("/api/contact/submissions", params={"cursor": "garbage"})).status_code == 400
+
+
+async def test_submission_cursor_pages(client):
+    from tests.test_contact import FORM
+
+    for i in range(5):
+        response = await client.post("/api/contact/submit", json=dict(FORM, email=f"user{i}@example.com"))
+        assert response.status_code == 200
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/contact/submissions", params=params)
+        seen.extend(item["email"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    # Stored timestamps may tie, so only coverage is fixed
+    assert sorted(seen) == [f"user{i}@example.com" for i in range(5)]
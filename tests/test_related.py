@@ -0,0 +1,116 @@
+import copy
+import random
+
+import pytest
+
+from routes import blog
+from services.related import RelatedIndex
+from tests.test_blog import POST, create_post
+
+pytestmark = pytest.mark.anyio
+
+WORDS = ["kafka", "spark", "warehouse", "latency", "schema", "index", "replica", "shard", "cache", "queue",
+         "stream", "batch", "column", "planner", "vacuum", "bloom", "raft", "lease", "tenant", "quota"]
+TAGS = ["SQL", "Streaming", "Ops", "Python", "Storage"]
+
+
+def _post(post_id: str, text: str, tags=(), **fields) -> dict:
+    return dict(dict(id=post_id, title=post_id, excerpt="", plain_text=text, tags=list(tags), is_published=True),
+                **fields)
+
+
+def _random_post(rng: random.Random, post_id: str) -> dict:
+    return _post(post_id, " ".join(rng.choices(WORDS, k=12)), rng.sample(TAGS, 2))
+
+
+def _neighbours(index: RelatedIndex) -> dict:
+    return {post_id: [(other, round(score, 4)) for other, score in neighbours]
+            for post_id, neighbours in index._neighbours.items()}
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    rng = random.Random(7)
+    index = RelatedIndex(k=5, max_drift=1.0)
+    for i in range(60):
+        index.ingest(_random_post(rng, f"p{i}"))
+    index.rebuild()
+
+    for i in range(40):
+        post_id = f"p{rng.randrange(70)}"
+        if rng.random() < 0.2:
+            index.update(_post(post_id, ""), None)
+        else:
+            index.update(None, _random_post(rng, post_id))
+
+    # Rescored from scratch against the same vocabulary and idf
+    rebuilt = copy.deepcopy(index)
+    rebuilt._neighbours, rebuilt._referrers = {}, {}
+    rebuilt._rescore(rebuilt._ids)
+    assert _neighbours(index) == _neighbours(rebuilt)
+
+
+def test_unpublished_and_unknown_posts_have_no_neighbours():
+    index = RelatedIndex()
+    index.ingest(_post("draft", "kafka streams", is_published=False))
+    index.ingest(_post("live", "kafka streams"))
+    index.rebuild()
+    assert index.related("draft") is None
+    assert index.related("missing") is None
+    assert index.related("live") == []
+
+
+def test_new_shared_terms_trigger_a_rebuild():
+    index = RelatedIndex(max_drift=0.5)
+    for i in range(20):
+        index.ingest(_post(f"old{i}", "warehouse schema planner"))
+    index.rebuild()
+    assert "raft" not in index._vocabulary
+
+    # Few enough posts not to drift the corpus size, but a new topic of their own
+    for i in range(3):
+        index.update(None, _post(f"new{i}", "raft lease quorum election"))
+
+    assert {"raft", "lease", "quorum", "election"} <= set(index._vocabulary)
+    assert [post["id"] for post in index.related("new0", limit=2)] == ["new1", "new2"]
+    assert index.related("new0")[0]["score"] == pytest.approx(0.6, abs=1e-4)
+
+
+def test_few_new_terms_keep_the_vocabulary():
+    index = RelatedIndex(max_drift=0.5)
+    for i in range(20):
+        index.ingest(_post(f"old{i}", f"warehouse schema planner column batch stream {i}"))
+    index.rebuild()
+    vocabulary = index._vocabulary
+
+    index.update(None, _post("new0", "warehouse raft"))
+    index.update(None, _post("new1", "warehouse raft"))
+    assert index._vocabulary is vocabulary
+    assert index._unindexed == {"raft"}
+    index.update(_post("new1", ""), None)
+    assert index._unindexed == set()
+
+
+async def test_related_route_follows_writes(client):
+    first = await create_post(client, title="Partitioning warehouse tables")
+    second = await create_post(client, title="Partitioning warehouse indexes")
+    related = (await client.get(f"/api/blog/posts/{first['id']}/related")).json()
+    assert [post["id"] for post in related] == [second["id"]]
+
+    await client.delete(f"/api/blog/posts/{second['id']}")
+    assert (await client.get(f"/api/blog/posts/{first['id']}/related")).json() == []
+    assert (await client.get(f"/api/blog/posts/{second['id']}/related")).status_code == 404
+
+
+async def test_related_posts_from_another_process_are_picked_up(client, storage, monkeypatch):
+    monkeypatch.setattr(blog.post_watcher, "interval", 0.0)
+    local = await create_post(client, title="Partitioning warehouse tables")
+    assert (await client.get(f"/api/blog/posts/{local['id']}/related")).json() == []
+
+    # Written straight to storage, as another worker would
+    other = blog._new_post(dict(POST, title="Partitioning warehouse indexes"))[1]
+    await storage.posts.insert(other)
+    related = (await client.get(f"/api/blog/posts/{local['id']}/related")).json()
+    assert [post["id"] for post in related] == [other["id"]]
+
+    await storage.posts.delete(other["id"])
+    assert (await client.get(f"/api/blog/posts/{local['id']}/related")).json() == []
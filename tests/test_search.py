@@ -0,0 +1,180 @@
+import heapq
+import random
+
+import pytest
+
+from routes import blog
+from services.search import SearchIndex, tokenize
+from tests.test_blog import POST, create_post
+
+pytestmark = pytest.mark.anyio
+
+
+def _post(post_id: str, title: str, text: str = "", **fields) -> dict:
+    return dict(dict(id=post_id, title=title, excerpt="", plain_text=text, tags=[], is_published=True), **fields)
+
+
+def _exhaustive(index: SearchIndex, query: str, limit: int) -> list:
+    """Scores every posting of every query term; the last term is a prefix"""
+    tokens = list(dict.fromkeys(tokenize(query)))
+    scores = {}
+    for i, token in enumerate(tokens):
+        best = {}
+        for term in (index._expand(token) if i == len(tokens) - 1 else [token]):
+            postings = index._postings.get(term, {})
+            idf = index._idf(len(index), len(postings))
+            for post_id, impact in postings.items():
+                best[post_id] = max(best.get(post_id, 0.0), idf * impact)
+        for post_id, score in best.items():
+            scores[post_id] = scores.get(post_id, 0.0) + score
+    return heapq.nlargest(limit, scores.values())
+
+
+def test_title_matches_outrank_body_matches():
+    index = SearchIndex()
+    index.add(_post("body", "Weekly notes", "we tuned a slow warehouse query"))
+    index.add(_post("title", "Warehouse query tuning", "notes from the week"))
+    index.add(_post("draft", "Warehouse query drafts", is_published=False))
+    hits = index.search("warehouse query")
+    assert [hit["id"] for hit in hits] == ["title", "body"]
+    assert hits[0]["highlighted_title"] == "<mark>Warehouse</mark> <mark>query</mark> tuning"
+    assert "<mark>warehouse</mark>" in hits[1]["snippet"]
+
+
+def test_last_word_matches_as_a_prefix():
+    index = SearchIndex()
+    index.add(_post("a", "Partitioning large tables"))
+    assert [hit["id"] for hit in index.search("large part")] == ["a"]
+    assert index.search("part", prefix=False) == []
+
+
+def test_updates_and_removals_are_searchable():
+    index = SearchIndex()
+    index.add(_post("a", "Kafka streams"))
+    index.update(_post("a", "Kafka streams"), _post("a", "Spark batches"))
+    assert index.search("kafka") == []
+    assert [hit["id"] for hit in index.search("spark")] == ["a"]
+    index.update(_post("a", "Spark batches"), None)
+    assert index.search("spark") == [] and len(index) == 0
+
+
+def test_pruned_top_k_matches_exhaustive_scoring():
+    rng = random.Random(7)
+    words = [f"w{n}" for n in range(400)]
+    index = SearchIndex()
+    for i in range(600):
+        text = " ".join(words[min(int(rng.paretovariate(0.8)), len(words)) - 1] for _ in range(60))
+        index.add(_post(f"p{i}", " ".join(rng.sample(words[:50], 3)), text))
+    common = sorted(index._postings, key=lambda term: -len(index._postings[term]))
+    queries = [common[0], f"{common[0]} {common[1]}", f"{common[2]} {common[40]} w1", "w2", "w1 w3"]
+    queries += [" ".join(rng.sample(common[:80], 3)) for _ in range(30)]
+    for query in queries:
+        for limit in (1, 5, 10):
+            found = [hit["score"] for hit in index.search(query, limit)]
+            expected = _exhaustive(index, query, limit)
+            assert found == pytest.approx(expected, abs=1e-4), query
+
+
+async def test_search_route_follows_writes(client):
+    post = await create_post(client, title="Streaming analytics with Kafka")
+    hits = (await client.get("/api/blog/search", params={"q": "kafka"})).json()
+    assert [hit["id"] for hit in hits] == [post["id"]]
+
+    await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Batch analytics with Spark"})
+    assert (await client.get("/api/blog/search", params={"q": "kafka"})).json() == []
+    await client.delete(f"/api/blog/posts/{post['id']}")
+    assert (await client.get("/api/blog/search", params={"q": "spark"})).json() == []
+
+
+async def test_writes_from_another_process_are_picked_up(client, storage, monkeypatch):
+    monkeypatch.setattr(blog.post_watcher, "interval", 0.0)
+    await create_post(client, title="Local post about dashboards")
+    rebuilds = blog.post_watcher.rebuilds
+
+    # Our own writes don't count as changes made elsewhere
+    assert len((await client.get("/api/blog/search", params={"q": "dashboards"})).json()) == 1
+    assert blog.post_watcher.rebuilds == rebuilds
+
+    # Written straight to storage, as another worker would
+    other = blog._new_post(dict(POST, title="Remote post about dashboards"))[1]
+    await storage.posts.insert(other)
+    hits = (await client.get("/api/blog/search", params={"q": "remote dashboards"})).json()
+    assert hits[0]["id"] == other["id"]
+    # Applied from the change log, not by rebuilding the indexes
+    assert blog.post_watcher.rebuilds == rebuilds
+    assert (await client.get(f"/api/blog/posts/{other['id']}/related")).status_code == 200
+
+
+async def test_change_log_lists_the_posts_each_write_touched(storage):
+    version = await storage.posts.change_version()
+    first = blog._new_post(dict(POST, title="First"))[1]
+    second = blog._new_post(dict(POST, title="Second"))[1]
+    await storage.posts.insert(first)
+    await storage.posts.insert(second)
+    await storage.posts.update(first["id"], {"title": "First, again"}, first["updated_at"])
+    await storage.posts.delete(second["id"])
+    touched = [first["id"], second["id"], first["id"], second["id"]]
+    assert await storage.posts.changes_since(version) == (version + 4, touched)
+    assert await storage.posts.changes_since(version + 4) == (version + 4, [])
+
+    # Bulk writes don't itemize their posts
+    await storage.posts.insert_many([blog._new_post(dict(POST, title=f"Bulk {i}"))[1] for i in range(2)])
+    assert await storage.posts.changes_since(version) == (version + 5, None)
+    assert await storage.posts.changes_since(version + 5) == (version + 5, [])
+
+
+async def test_change_log_forgets_old_writes(storage, monkeypatch):
+    from storage import mongo, sqlite
+
+    monkeypatch.setattr(sqlite, "CHANGE_LOG_SIZE", 2)
+    monkeypatch.setattr(mongo, "CHANGE_LOG_SIZE", 2)
+    version = await storage.posts.change_version()
+    posts = [blog._new_post(dict(POST, title=f"Post {i}"))[1] for i in range(3)]
+    for post in posts:
+        await storage.posts.insert(post)
+    assert await storage.posts.changes_since(version) == (version + 3, None)
+    assert await storage.posts.changes_since(version + 1) == (version + 3, [post["id"] for post in posts[1:]])
+
+
+async def test_local_write_during_a_rebuild_is_not_lost(client, monkeypatch):
+    import asyncio
+    import threading
+
+    post = await create_post(client, title="Streaming analytics with Kafka")
+    scanned, release = threading.Event(), threading.Event()
+
+    class PausedRelatedIndex(blog.RelatedIndex):
+        def rebuild(self):
+            # Runs on a worker thread once the scan is done, before the swap
+            scanned.set()
+            release.wait(5)
+            super().rebuild()
+
+    monkeypatch.setattr(blog, "RelatedIndex", PausedRelatedIndex)
+    rebuild = asyncio.ensure_future(blog.build_post_indexes())
+    while not scanned.is_set():
+        await asyncio.sleep(0.01)
+
+    # Applied to the indexes being replaced, and recorded after the scan
+    response = await client.put(f"/api/blog/posts/{post['id']}", json={"title": "Batch analytics with Spark"})
+    assert response.status_code == 200
+    release.set()
+    await rebuild
+
+    hits = (await client.get("/api/blog/search", params={"q": "spark"})).json()
+    assert [hit["id"] for hit in hits] == [post["id"]]
+    assert (await client.get("/api/blog/search", params={"q": "kafka"})).json() == []
+
+
+async def test_bulk_writes_elsewhere_rebuild_in_the_background(client, storage, monkeypatch):
+    monkeypatch.setattr(blog.post_watcher, "interval", 0.0)
+    await create_post(client, title="Local post about dashboards")
+    rebuilds = blog.post_watcher.rebuilds
+
+    await storage.posts.insert_many([blog._new_post(dict(POST, title=f"Imported dashboards {i}"))[1]
+                                     for i in range(2)])
+    assert (await client.get("/api/blog/search", params={"q": "dashboards"})).status_code == 200
+    assert blog.post_watcher.rebuilds == rebuilds + 1
+    if blog.post_watcher._rebuilding is not None:
+        await blog.post_watcher._rebuilding
+    assert len((await client.get("/api/blog/search", params={"q": "dashboards"})).json()) == 3
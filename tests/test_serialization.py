@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from models.blog import BlogPost, BlogPostSummary, ContactSubmission
+from services.serialization import JSONBytesResponse, dumps, fields_for
+from tests.test_blog import create_post
+
+pytestmark = pytest.mark.anyio
+
+
+def test_fields_follow_the_model():
+    assert fields_for(BlogPostSummary) == tuple(BlogPostSummary.model_fields)
+    assert "content" in fields_for(BlogPost) and "content" not in fields_for(BlogPostSummary)
+
+
+@pytest.mark.parametrize("stamp", [datetime(2025, 1, 2, 3, 4, 5), datetime(2025, 1, 2, 3, 4, 5, 678000)])
+def test_documents_encode_like_pydantic(stamp):
+    post = BlogPost(title="T", excerpt="E", content="<p>x</p>", read_time="1 min read", image="i",
+                    publish_date=stamp, created_at=stamp, updated_at=stamp)
+    submission = ContactSubmission(name="N", email="n@example.com", subject="S", message="M", submitted_at=stamp)
+    for model in (post, submission):
+        assert json.loads(dumps(model.model_dump())) == jsonable_encoder(model)
+        assert json.loads(dumps(model)) == jsonable_encoder(model)
+
+
+def test_response_passes_bytes_through():
+    assert JSONBytesResponse(b'{"a":1}').body == b'{"a":1}'
+    assert JSONBytesResponse({"a": [1, 2]}).body == b'{"a":[1,2]}'
+
+
+async def test_read_responses_match_the_response_models(client):
+    post = await create_post(client)
+    full = (await client.get(f"/api/blog/posts/{post['id']}")).json()
+    assert full == jsonable_encoder(BlogPost(**full))
+    [summary] = (await client.get("/api/blog/posts")).json()
+    assert summary == jsonable_encoder(BlogPostSummary(**summary))
@@ -0,0 +1,77 @@
+import os
+import time
+
+import httpx
+import pytest
+
+from services.snapshots import STALE_NAME, SnapshotMiddleware, SnapshotStore, build_snapshot, post_path
+from tests.test_blog import create_post
+
+pytestmark = pytest.mark.anyio
+
+
+async def _fallback(scope, receive, send):
+    await send({"type": "http.response.start", "status": 599, "headers": []})
+    await send({"type": "http.response.body", "body": b"live route"})
+
+
+@pytest.fixture
+async def snapshot(client, storage, tmp_path):
+    """A snapshot of two posts plus two stores on it, like two workers"""
+    posts = [await create_post(client, title=f"Post {i}") for i in range(2)]
+    await build_snapshot(storage.posts, tmp_path)
+    return posts, SnapshotStore(str(tmp_path), recheck_interval=0), SnapshotStore(str(tmp_path), recheck_interval=0)
+
+
+async def test_artifacts_are_served_from_the_mapping_without_copying(snapshot, tmp_path):
+    posts, store, _ = snapshot
+    relpath = post_path(posts[0]["id"])
+    assert store.lookup(f"/api/blog/posts/{posts[0]['id']}", b"") is not None
+    body = store.read(relpath)
+    assert isinstance(body, memoryview)
+    assert body == (tmp_path / relpath).read_bytes()
+
+    app = SnapshotMiddleware(_fallback, store)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        response = await http.get(f"/api/blog/posts/{posts[0]['id']}", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert response.json()["title"] == "Post 0"
+        assert int(response.headers["Content-Length"]) == len(body)
+        assert (await http.get(f"/api/blog/posts/{posts[0]['id']}",
+                               headers={"If-None-Match": response.headers["ETag"]})).status_code == 304
+        assert (await http.get("/api/blog/posts/missing")).status_code == 599
+
+
+async def test_invalidation_reaches_every_worker(snapshot, storage, tmp_path):
+    posts, first, second = snapshot
+    path = f"/api/blog/posts/{posts[0]['id']}"
+    assert first.lookup(path, b"") is not None and second.lookup(path, b"") is not None
+
+    first.invalidate()
+    assert first.lookup(path, b"") is None
+    assert second.lookup(path, b"") is None
+    assert second.stats()["stale"]
+
+    # The write predates the next build, which both workers serve again
+    marked = time.time() - 10
+    os.utime(tmp_path / STALE_NAME, (marked, marked))
+    await build_snapshot(storage.posts, tmp_path)
+    assert first.lookup(path, b"") is not None
+    assert second.lookup(path, b"") is not None
+
+
+async def test_validators_match_the_live_routes(snapshot, client):
+    posts, store, _ = snapshot
+    app = SnapshotMiddleware(_fallback, store)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        for path in (f"/api/blog/posts/{posts[0]['id']}", "/api/blog/posts", "/api/blog/tags"):
+            served, live = await http.get(path), await client.get(path)
+            assert served.status_code == 200
+            assert served.headers["ETag"] == live.headers["ETag"]
+            assert served.headers.get("Last-Modified") == live.headers.get("Last-Modified")
+        etag = (await http.get(f"/api/blog/posts/{posts[0]['id']}")).headers["ETag"]
+
+    # A tag from the snapshot is good for a conditional update through the API
+    response = await client.put(f"/api/blog/posts/{posts[0]['id']}", json={"title": "Renamed"},
+                                headers={"If-Match": etag})
+    assert response.status_code == 200
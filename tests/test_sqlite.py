@@ -0,0 +1,100 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage.base import VersionConflict
+from storage.sqlite import SQLiteStorage
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def workers(tmp_path):
+    """Two storages on one database file, like two server processes"""
+    path = str(tmp_path / "portfolio.db")
+    first = SQLiteStorage(path)
+    await first.migrate()
+    second = SQLiteStorage(path)
+    await second.migrate()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def _post(post_id: str, **fields) -> dict:
+    return {
+        "id": post_id, "title": f"Post {post_id}", "excerpt": "", "content": "<p>Body</p>", "tags": ["SQL"],
+        "read_time": "1 min read", "image": "", "publish_date": datetime(2024, 1, 1) + timedelta(days=len(post_id)),
+        "is_published": True, "version": 1, **fields,
+    }
+
+
+async def test_other_workers_writes_show_up(workers):
+    first, second = workers
+    await first.posts.insert(_post("a"))
+    assert (await second.posts.get("a"))["title"] == "Post a"
+    assert [doc["id"] for doc in await second.posts.list()] == ["a"]
+
+    await first.posts.update("a", {"title": "Renamed"}, datetime.utcnow())
+    assert (await second.posts.get("a"))["title"] == "Renamed"
+    assert await second.posts.compute_tag_counts() == {"SQL": 1}
+
+    await first.posts.delete("a")
+    assert await second.posts.get("a") is None
+    assert await second.posts.count() == 0
+
+
+async def test_update_does_not_overwrite_a_newer_row(workers):
+    first, second = workers
+    await first.posts.insert(_post("a"))
+    assert (await second.posts.get("a"))["version"] == 1
+    await first.posts.update("a", {"title": "From first"}, datetime.utcnow())
+
+    # The second worker's copy is version 1; the write must see version 2
+    with pytest.raises(VersionConflict) as conflict:
+        await second.posts.update("a", {"title": "From second"}, datetime.utcnow(), expected_version=1)
+    assert conflict.value.current["title"] == "From first"
+
+    before, after = await second.posts.update("a", {"excerpt": "Edited"}, datetime.utcnow())
+    assert before["title"] == "From first"
+    assert (after["title"], after["excerpt"], after["version"]) == ("From first", "Edited", 3)
+    assert (await first.posts.get("a"))["excerpt"] == "Edited"
+
+
+async def test_own_writes_need_no_reload(workers):
+    first, _ = workers
+    await first.posts.insert(_post("a"))
+    await first.posts.insert(_post("bb"))
+    assert first.posts._version == await first.posts.change_version()
+    assert [doc["id"] for doc in await first.posts.list()] == ["bb", "a"]
+
+
+async def test_statements_run_off_the_event_loop(workers, monkeypatch):
+    first, _ = workers
+    threads = []
+    original = first.posts._insert_rows
+    monkeypatch.setattr(first.posts, "_insert_rows",
+                        lambda *args: threads.append(threading.current_thread().name) or original(*args))
+    await first.posts.insert(_post("a"))
+    assert threads and threads[0].startswith("sqlite")
+    assert threads[0] != threading.current_thread().name
+
+
+async def test_idempotency_fingerprints_are_added_to_existing_databases(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE idempotency_keys (key TEXT PRIMARY KEY, submission_id TEXT NOT NULL, "
+                 "expires_at REAL NOT NULL)")
+    conn.execute("INSERT INTO idempotency_keys VALUES ('key', 'first', 2000.0)")
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(path)
+    try:
+        assert 4 in await storage.migrate()
+        assert await storage.admission.reserve_idempotency_key("key", "second", "hash", 1000.0, 60) == ("first", "")
+    finally:
+        storage.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from services.tag_stats import rebuild_tag_stats, tag_contribution
+from tests.test_blog import create_post
+
+pytestmark = pytest.mark.anyio
+
+
+def test_drafts_contribute_no_tags():
+    assert tag_contribution({"is_published": False, "tags": ["SQL"]}) == {}
+    assert tag_contribution(None) == {}
+    assert tag_contribution({"is_published": True, "tags": ["SQL", "BI"]}) == {"SQL": 1, "BI": 1}
+
+
+async def _tags(client) -> dict:
+    return {item["tag"]: item["count"] for item in (await client.get("/api/blog/tags")).json()}
+
+
+async def test_writes_keep_tag_counts_current(client, storage):
+    first = await create_post(client, tags=["SQL", "BI"])
+    await create_post(client, tags=["SQL"])
+    draft = await create_post(client, tags=["Python"], is_published=False)
+    assert await _tags(client) == {"SQL": 2, "BI": 1}
+
+    await client.put(f"/api/blog/posts/{first['id']}", json={"tags": ["BI", "Cloud"]})
+    await client.put(f"/api/blog/posts/{draft['id']}", json={"is_published": True})
+    assert await _tags(client) == {"SQL": 1, "BI": 1, "Cloud": 1, "Python": 1}
+
+    await client.delete(f"/api/blog/posts/{first['id']}")
+    assert await _tags(client) == {"SQL": 1, "Python": 1}
+    assert (await rebuild_tag_stats(storage.posts, verify_only=True))["drift"] == {}
+
+
+async def test_rebuild_reports_and_repairs_drift(client, storage):
+    await create_post(client, tags=["SQL"])
+    await storage.posts.increment_tags({"SQL": 2, "Ghost": 1})
+
+    report = await rebuild_tag_stats(storage.posts, verify_only=True)
+    assert report["drift"] == {"SQL": {"expected": 1, "actual": 3}, "Ghost": {"expected": 0, "actual": 1}}
+    assert not report["repaired"]
+
+    assert (await rebuild_tag_stats(storage.posts))["repaired"]
+    assert {item["tag"]: item["count"] for item in await storage.posts.tag_counts()} == {"SQL": 1}